@@ -0,0 +1 @@
+"""Benchmarks of how PythiaPlotter scales with event size, using synthetic events."""
@@ -0,0 +1,556 @@
+"""Measure how the time & memory taken by each stage of PythiaPlotter scale with event size.
+
+Synthetic events (see synthetic.py) of each size are written in each input format,
+then run through the same steps as PythiaPlotter:
+
+- parse: read the event from the input file
+- graph: assign the particles to a graph
+- convert: convert the graph to the other representation (the result is not used later)
+- redundants: remove redundant particles
+- attrs: add the Graphviz display attributes
+- layout: calculate the node positions with Graphviz (skipped for large events)
+- write: write the Graphviz file and the webpage data
+
+Each stage is timed over several repeats. The peak memory allocated by each stage
+is measured with tracemalloc in a separate pass (python >= 3.4 only),
+as tracing slows everything down.
+
+Results can be saved as a baseline, and later runs compared against it.
+A stage is flagged as a regression if it is slower by more than some fraction,
+and Welch's t-test says the slowdown is significant.
+
+Run with ``python -m benchmarks.run_benchmarks`` from the top directory (see ``--help``).
+"""
+
+
+from __future__ import absolute_import, division, print_function
+import os
+import gc
+import sys
+import json
+import math
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+from timeit import default_timer
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import pythiaplotter
+import pythiaplotter.default_config as config
+import pythiaplotter.parsers as parsers
+from pythiaplotter.PythiaPlotter import choose_parser
+from pythiaplotter.utils.common import check_program_exists, check_module_exists
+from pythiaplotter.graphers import (assign_particles_nodes, assign_particles_edges,
+                                    remove_redundant_nodes, remove_redundant_edges,
+                                    node_to_edge, edge_to_node)
+from pythiaplotter.printers.dot_printer import DotPrinter, iter_gv_lines, write_gv
+from pythiaplotter.printers.web_printer import (construct_gv_only_edges, get_dot_json,
+                                                get_node_positions, add_node_positions,
+                                                create_vis_data, encode_vis_data,
+                                                write_vis_data_file)
+from pythiaplotter.printers.web_clustering import find_clusters
+from benchmarks.synthetic import make_event, write_events, WRITERS
+
+
+STAGES = ["parse", "graph", "convert", "redundants", "attrs", "layout", "write"]
+
+FILE_EXTENSIONS = {"PYTHIA": "txt", "HEPMC": "hepmc", "LHE": "lhe", "CMSSW": "txt"}
+
+# Same as the default for --webMaxElements
+WEB_MAX_ELEMENTS = 5000
+
+# Ignore smaller changes in peak memory, as they are just noise for the fastest stages
+MIN_MEMORY_CHANGE = 1024 ** 2
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".baseline.json")
+
+GREEN = '\033[92m'
+RED = '\033[91m'
+ENDC = '\033[0m'
+
+
+class Pipeline(object):
+
+    def __init__(self, filename, input_format, output_dir, renderer="dot"):
+        """Run the stages of PythiaPlotter one by one, keeping the results for the next stage.
+
+        Each stage is a method named as in STAGES, and must be run in that order.
+
+        Parameters
+        ----------
+        filename : str
+            Input file
+        input_format : str
+            Input format, as in parsers.parser_opts
+        output_dir : str
+            Directory for output files
+        renderer : str, optional
+            Graphviz program for the layout
+        """
+        self.filename = filename
+        self.input_format = input_format
+        self.output_dir = output_dir
+        self.renderer = renderer
+        self.representation = parsers.parser_opts[input_format].default_representation
+        self.opts = argparse.Namespace(input=filename, inputFormat=input_format, eventNumber=0,
+                                       output="", layout=renderer, outputFormat="pdf",
+                                       noOutput=True, saveGraphviz=False, **config.__dict__)
+        self.event = None
+        self.particles = None
+
+    def parse(self):
+        self.event, self.particles = choose_parser(self.opts).parse()
+
+    def graph(self):
+        if self.representation == "NODE":
+            self.event.graph = assign_particles_nodes(self.particles)
+        else:
+            self.event.graph = assign_particles_edges(self.particles)
+
+    def convert(self):
+        if self.representation == "NODE":
+            node_to_edge(self.event.graph)
+        else:
+            edge_to_node(self.event.graph)
+
+    def redundants(self):
+        if self.representation == "NODE":
+            remove_redundant_nodes(self.event.graph)
+        else:
+            remove_redundant_edges(self.event.graph)
+
+    def attrs(self):
+        DotPrinter(self.opts).add_display_attr(self.event, fancy=True)
+
+    def layout(self):
+        gv_str = construct_gv_only_edges(self.event.graph, self.opts.GRAPH_OPTS)
+        positions = get_node_positions(get_dot_json(gv_str, self.renderer))
+        add_node_positions(self.event.graph, positions)
+
+    def skip_layout(self):
+        """Put all the nodes in the same place, so the later stages can run without a layout."""
+        for _, node_data in self.event.graph.nodes_iter(data=True):
+            node_data['pos'] = (0., 0.)
+
+    def write(self):
+        stem = os.path.join(self.output_dir, "event")
+        write_gv(iter_gv_lines(self.event), stem + ".gv")
+        clusters = find_clusters(self.event.graph, WEB_MAX_ELEMENTS)
+        write_vis_data_file(encode_vis_data(create_vis_data(self.event.graph, clusters)),
+                            stem + "_data.js")
+
+
+def run_pipeline(filename, input_format, output_dir, stages, renderer, do_layout,
+                 trace_memory=False):
+    """Run all the stages on an input file, timing the requested ones.
+
+    Parameters
+    ----------
+    filename : str
+    input_format : str
+    output_dir : str
+    stages : list[str]
+        Stages to measure. Earlier stages are always run, since later ones need their results.
+    renderer : str
+    do_layout : bool
+        If False, the layout stage is skipped.
+    trace_memory : bool, optional
+        If True, measure the peak memory allocated by each stage instead of the time.
+
+    Returns
+    -------
+    dict
+        Time in seconds (or peak memory in bytes) for each measured stage.
+    """
+    pipeline = Pipeline(filename, input_format, output_dir, renderer)
+    last_stage = max(STAGES.index(stage) for stage in stages)
+    measurements = {}
+    for stage in STAGES[:last_stage + 1]:
+        if stage == "layout" and not do_layout:
+            pipeline.skip_layout()
+            continue
+        method = getattr(pipeline, stage)
+        gc.collect()
+        if trace_memory:
+            # Restarting clears the traces, so the peak only counts this stage's allocations
+            tracemalloc.start()
+            method()
+            measurements[stage] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            start = default_timer()
+            method()
+            measurements[stage] = default_timer() - start
+    return {stage: value for stage, value in measurements.items() if stage in stages}
+
+
+def run_benchmarks(sizes, input_formats, stages, repeats=3, seed=1, renderer="dot",
+                   max_layout_size=5000, work_dir=None):
+    """Run the pipeline for each event size & input format.
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of particles in each synthetic event.
+    input_formats : list[str]
+    stages : list[str]
+    repeats : int, optional
+        Number of timed runs of each stage.
+    seed : int, optional
+        Random number seed for the synthetic events.
+    renderer : str, optional
+        Graphviz program for the layout.
+    max_layout_size : int, optional
+        Largest event to run the layout for, since it gets very slow.
+    work_dir : str, optional
+        Directory for input & output files. Defaults to a temporary directory,
+        which is removed afterwards.
+
+    Returns
+    -------
+    list[dict]
+        Results for each format, stage & size, with keys "format", "stage", "size",
+        "times" (list[float], in seconds) and "peak_memory" (int, in bytes, or None
+        if it can't be measured).
+    """
+    can_layout = check_program_exists(renderer)
+    if "layout" in stages and not can_layout:
+        print("Cannot find %s, skipping the layout stage" % renderer)
+
+    tmp_dir = work_dir or tempfile.mkdtemp(prefix="pythiaplotter_benchmark")
+    results = []
+    try:
+        for size in sizes:
+            events = [make_event(size, seed=seed)]
+            for input_format in input_formats:
+                print("Running %s event with %d particles" % (input_format, size))
+                filename = os.path.join(tmp_dir, "event_%d.%s"
+                                        % (size, FILE_EXTENSIONS[input_format]))
+                write_events(events, filename, input_format)
+                do_layout = can_layout and size <= max_layout_size
+                args = (filename, input_format, tmp_dir, stages, renderer, do_layout)
+
+                # Warm up first, so one-off work like building the event index,
+                # loading the PDGID table or filling the file cache isn't measured
+                run_pipeline(*args)
+                peak_memory = run_pipeline(*args, trace_memory=True) if tracemalloc else {}
+                times = [run_pipeline(*args) for _ in range(repeats)]
+
+                for stage in stages:
+                    if stage not in times[0]:
+                        continue
+                    results.append({"format": input_format, "stage": stage, "size": size,
+                                    "times": [t[stage] for t in times],
+                                    "peak_memory": peak_memory.get(stage)})
+                os.remove(filename)
+    finally:
+        if not work_dir:
+            shutil.rmtree(tmp_dir)
+    return results
+
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def get_scaling_exponent(sizes, values):
+    """Fit ``value = a * size^b`` with least squares in log-log space, and return b.
+
+    Returns None if there are fewer than 2 sizes, or any value is not positive.
+    """
+    if len(sizes) < 2 or min(values) <= 0:
+        return None
+    log_sizes = [math.log(size) for size in sizes]
+    log_values = [math.log(value) for value in values]
+    mean_size = sum(log_sizes) / len(log_sizes)
+    mean_value = sum(log_values) / len(log_values)
+    cov = sum((s - mean_size) * (v - mean_value) for s, v in zip(log_sizes, log_values))
+    var = sum((s - mean_size) ** 2 for s in log_sizes)
+    return cov / var
+
+
+def incomplete_beta(x, a, b):
+    """Regularised incomplete beta function I_x(a, b), from its continued fraction.
+
+    See Numerical Recipes, section 6.4.
+    """
+    if x <= 0:
+        return 0.
+    if x >= 1:
+        return 1.
+    if x > (a + 1) / (a + b + 2):
+        # The continued fraction converges quickly only for small x
+        return 1. - incomplete_beta(1. - x, b, a)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log(1. - x)) / a
+    # Modified Lentz's method
+    tiny = 1e-300
+    c, d = 1., 1. - (a + b) * x / (a + 1)
+    d = 1. / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 200):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1. + numerator * d
+            d = 1. / (d if abs(d) > tiny else tiny)
+            c = 1. + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.) < 1e-12:
+            break
+    return front * result
+
+
+def welch_t_test(old, new):
+    """One-sided Welch's t-test that the mean of `new` is larger than the mean of `old`.
+
+    Parameters
+    ----------
+    old, new : list[float]
+        Samples, each with at least 2 values.
+
+    Returns
+    -------
+    float
+        p-value: the chance of a difference at least this large if the means are the same.
+    """
+    n_old, n_new = len(old), len(new)
+    mean_old, mean_new = sum(old) / n_old, sum(new) / n_new
+    var_old = sum((x - mean_old) ** 2 for x in old) / (n_old - 1) / n_old
+    var_new = sum((x - mean_new) ** 2 for x in new) / (n_new - 1) / n_new
+    if var_old + var_new == 0:
+        return 0. if mean_new > mean_old else 1.
+    t = (mean_new - mean_old) / math.sqrt(var_old + var_new)
+    dof = (var_old + var_new) ** 2 / (var_old ** 2 / (n_old - 1) + var_new ** 2 / (n_new - 1))
+    tail = 0.5 * incomplete_beta(dof / (dof + t ** 2), dof / 2, 0.5)
+    return tail if t > 0 else 1. - tail
+
+
+def compare_results(results, baseline, threshold=0.1, alpha=0.01):
+    """Compare results against a baseline, to find significant changes.
+
+    Times are compared in log space, since timing noise is roughly proportional to the time.
+    With fewer than 2 repeats, only the threshold is used.
+
+    Parameters
+    ----------
+    results, baseline : list[dict]
+        From run_benchmarks()
+    threshold : float, optional
+        Minimum fractional change in median time or peak memory to flag.
+    alpha : float, optional
+        Maximum p-value for a change in time to be significant.
+
+    Returns
+    -------
+    list[dict]
+        Each result that is also in the baseline, with extra keys "time_change" &
+        "memory_change" (fractional changes, memory is None if the change is under
+        MIN_MEMORY_CHANGE), "p_value" (can be None),
+        and "status": "slower", "faster", "more memory" or "ok".
+    """
+    baseline_results = {(r["format"], r["stage"], r["size"]): r for r in baseline}
+    comparisons = []
+    for result in results:
+        old = baseline_results.get((result["format"], result["stage"], result["size"]))
+        if not old:
+            continue
+        comparison = dict(result)
+        comparison["time_change"] = median(result["times"]) / median(old["times"]) - 1
+        comparison["memory_change"] = None
+        if (result["peak_memory"] and old["peak_memory"]
+                and abs(result["peak_memory"] - old["peak_memory"]) > MIN_MEMORY_CHANGE):
+            comparison["memory_change"] = result["peak_memory"] / old["peak_memory"] - 1
+
+        old_times = [math.log(t) for t in old["times"]]
+        new_times = [math.log(t) for t in result["times"]]
+        slower = faster = abs(comparison["time_change"]) > threshold
+        comparison["p_value"] = None
+        if len(old_times) > 1 and len(new_times) > 1:
+            comparison["p_value"] = welch_t_test(old_times, new_times)
+            slower = slower and comparison["p_value"] < alpha
+            faster = faster and welch_t_test(new_times, old_times) < alpha
+        if slower and comparison["time_change"] > 0:
+            comparison["status"] = "slower"
+        elif faster and comparison["time_change"] < 0:
+            comparison["status"] = "faster"
+        elif comparison["memory_change"] is not None and comparison["memory_change"] > threshold:
+            comparison["status"] = "more memory"
+        else:
+            comparison["status"] = "ok"
+        comparisons.append(comparison)
+    return comparisons
+
+
+def print_results(results):
+    """Print a table of median time & peak memory for each format & stage, against size."""
+    for input_format in sorted(set(r["format"] for r in results)):
+        format_results = [r for r in results if r["format"] == input_format]
+        sizes = sorted(set(r["size"] for r in format_results))
+        print("\n%s: median time [s] / peak memory [MB]" % input_format)
+        print("{0:<11}".format("stage") + "".join("{0:>20}".format(s) for s in sizes)
+              + "   scaling")
+        for stage in STAGES:
+            stage_results = {r["size"]: r for r in format_results if r["stage"] == stage}
+            if not stage_results:
+                continue
+            cells = []
+            for size in sizes:
+                if size not in stage_results:
+                    cells.append("{0:>20}".format("-"))
+                    continue
+                result = stage_results[size]
+                memory = "-" if result["peak_memory"] is None \
+                    else "%.1f" % (result["peak_memory"] / 1024 ** 2)
+                cells.append("{0:>20}".format("%.3g / %s" % (median(result["times"]), memory)))
+            stage_sizes = sorted(stage_results)
+            exponent = get_scaling_exponent(stage_sizes, [median(stage_results[s]["times"])
+                                                          for s in stage_sizes])
+            scaling = "" if exponent is None else "   n^%.2f" % exponent
+            print("{0:<11}".format(stage) + "".join(cells) + scaling)
+
+
+def print_comparisons(comparisons):
+    """Print the changes in time & memory against the baseline, highlighting significant ones."""
+    print("\nChanges against baseline:")
+    for c in comparisons:
+        colour = {"slower": RED, "more memory": RED, "faster": GREEN}.get(c["status"], "")
+        memory = "" if c["memory_change"] is None \
+            else ", memory %+.0f%%" % (100 * c["memory_change"])
+        p_value = "" if c["p_value"] is None else " (p = %.2g)" % c["p_value"]
+        print("{0}{1:<7} {2:<11} {3:>7}: time {4:+.0f}%{5}{6}{7}{8}".format(
+            colour, c["format"], c["stage"], c["size"], 100 * c["time_change"], p_value,
+            memory, " !!! " + c["status"] if colour else "", ENDC if colour else ""))
+
+
+def plot_results(results, output_filename):
+    """Plot time & peak memory against event size for each stage, one row per input format.
+
+    Needs matplotlib.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    input_formats = sorted(set(r["format"] for r in results))
+    fig, axes = plt.subplots(len(input_formats), 2, squeeze=False,
+                             figsize=(12, 4 * len(input_formats)))
+    for row, input_format in zip(axes, input_formats):
+        for stage in STAGES:
+            stage_results = sorted((r for r in results
+                                    if r["format"] == input_format and r["stage"] == stage),
+                                   key=lambda r: r["size"])
+            if not stage_results:
+                continue
+            sizes = [r["size"] for r in stage_results]
+            row[0].plot(sizes, [median(r["times"]) for r in stage_results], "o-", label=stage)
+            if all(r["peak_memory"] for r in stage_results):
+                row[1].plot(sizes, [r["peak_memory"] / 1024 ** 2 for r in stage_results],
+                            "o-", label=stage)
+        for ax, ylabel in zip(row, ["Time [s]", "Peak memory [MB]"]):
+            ax.set_xscale("log")
+            ax.set_yscale("log")
+            ax.set_xlabel("Number of particles")
+            ax.set_ylabel(ylabel)
+            ax.set_title(input_format)
+            ax.legend(loc="best", fontsize="small")
+    fig.tight_layout()
+    fig.savefig(output_filename)
+    print("Plot saved to", output_filename)
+
+
+def get_args(input_args):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 50000],
+                        help="Number of particles in each event")
+    parser.add_argument("--formats", nargs="+", default=sorted(WRITERS), choices=sorted(WRITERS),
+                        help="Input formats")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES,
+                        help="Stages to measure")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Number of timed runs")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Random number seed for the synthetic events")
+    parser.add_argument("--layout", default="dot",
+                        help="Graphviz program for the layout stage")
+    parser.add_argument("--maxLayoutSize", type=int, default=5000,
+                        help="Largest event (in particles) to run the layout for")
+    parser.add_argument("--output",
+                        help="Save results as JSON to this file")
+    parser.add_argument("--plot",
+                        help="Plot the scaling curves to this file (needs matplotlib)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Baseline results to compare against")
+    parser.add_argument("--saveBaseline", action="store_true",
+                        help="Save these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Minimum fractional change to flag as a regression")
+    parser.add_argument("--alpha", type=float, default=0.01,
+                        help="Significance level for a change in time")
+    parser.add_argument("--workDir",
+                        help="Directory to keep the synthetic events & output files in, "
+                             "instead of a temporary directory")
+    args = parser.parse_args(input_args)
+    if args.plot and not check_module_exists("matplotlib"):
+        parser.error("--plot needs matplotlib")
+    return args
+
+
+def main(in_args=None):
+    """Run the benchmarks, compare to the baseline, and save the results.
+
+    Returns
+    -------
+    int
+        1 if there are any regressions against the baseline, 0 otherwise.
+    """
+    args = get_args(in_args)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    results = run_benchmarks(sizes=args.sizes, input_formats=args.formats, stages=args.stages,
+                             repeats=args.repeats, seed=args.seed, renderer=args.layout,
+                             max_layout_size=args.maxLayoutSize, work_dir=args.workDir)
+    output = {
+        "meta": {
+            "pythiaplotter": pythiaplotter.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+        },
+        "results": results
+    }
+    print_results(results)
+
+    num_regressions = 0
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["seed"] != args.seed:
+            print("\nBaseline used a different seed, so its events are different")
+        comparisons = compare_results(results, baseline["results"], args.threshold, args.alpha)
+        print_comparisons(comparisons)
+        num_regressions = sum(c["status"] in ("slower", "more memory") for c in comparisons)
+        print("\n%d regression(s) against baseline %s" % (num_regressions, args.baseline))
+
+    if args.plot:
+        plot_results(results, args.plot)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+    if args.saveBaseline:
+        with open(args.baseline, "w") as f:
+            json.dump(output, f, indent=2)
+        print("Saved baseline to", args.baseline)
+    return 1 if num_regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
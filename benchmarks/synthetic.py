@@ -0,0 +1,418 @@
+"""Make synthetic events shaped like real parton showers, for benchmarking.
+
+Events can have any number of particles, and can be written in the Pythia 8,
+HepMC, LHE and CMSSW formats. This means each parser, and the rest of PythiaPlotter,
+can be timed on realistic inputs of any size.
+
+Each event is made of:
+
+1. Two beam protons, each giving an incoming parton to a 2 -> 2 hard process.
+2. A final-state parton shower from the outgoing partons. Each parton either
+   has a recoil copy of itself (like the redundant copies MC generators make),
+   or branches into 2 partons.
+3. Hadronisation: the final partons of the shower are copied, then joined in groups
+   into strings (PDGID 92), which each fragment into hadrons.
+4. Decays of unstable hadrons, until the event has the requested number of particles.
+
+Particles are numbered from 1. All the parents of a particle are next to each other,
+since most formats store parents as a range.
+"""
+
+
+from __future__ import absolute_import, division
+import math
+import random
+from collections import deque
+
+
+# Name (as in Pythia 8 output) & mass in GeV for each PDGID used
+PARTICLE_INFO = {
+    1: ("d", 0.33), 2: ("u", 0.33), 3: ("s", 0.5), 4: ("c", 1.5), 5: ("b", 4.8),
+    21: ("g", 0.), 22: ("gamma", 0.), 92: ("string", 0.),
+    111: ("pi0", 0.135), 211: ("pi+", 0.140), 113: ("rho0", 0.775), 213: ("rho+", 0.775),
+    221: ("eta", 0.548), 223: ("omega", 0.783), 130: ("K_L0", 0.498), 310: ("K_S0", 0.498),
+    313: ("K*0", 0.896), 321: ("K+", 0.494), 2112: ("n0", 0.940), 2212: ("p+", 0.938),
+    3122: ("Lambda0", 1.116),
+}
+
+# Names of antiparticles, where they aren't just the particle name with the charge flipped
+ANTIPARTICLE_NAMES = {
+    1: "dbar", 2: "ubar", 3: "sbar", 4: "cbar", 5: "bbar", 213: "rho-", 313: "K*bar0",
+    321: "K-", 2112: "nbar0", 2212: "pbar-", 3122: "Lambdabar0",
+}
+
+# PDGIDs of hadrons made directly from strings, with their relative rates
+STRING_HADRONS = [(211, 8), (-211, 8), (111, 6), (113, 2), (213, 1), (-213, 1), (221, 1),
+                  (223, 1), (321, 1), (-321, 1), (310, 1), (130, 1), (313, 1), (2212, 1),
+                  (-2212, 1), (3122, 1)]
+
+# Decay products of unstable hadrons
+DECAYS = {
+    111: (22, 22), 113: (211, -211), 213: (211, 111), 221: (22, 22), 223: (111, 22),
+    310: (211, -211), 313: (321, -211), 3122: (2212, -211),
+}
+
+# Pythia 8 status codes (without sign) for each step
+STATUS_BEAM = 12
+STATUS_INCOMING = 21
+STATUS_HARD = 23
+STATUS_RECOIL = 44
+STATUS_BRANCH = 51
+STATUS_STRING_COPY = 71
+STATUS_STRING = 11
+STATUS_PRIMARY_HADRON = 83
+STATUS_DECAY = 91
+
+
+class SyntheticParticle(object):
+
+    def __init__(self, barcode, pdgid, status, parents, px, py, pz):
+        """Minimal particle, as written to the event file.
+
+        Parameters
+        ----------
+        barcode : int
+            Unique number in the event, starting at 1.
+        pdgid : int
+        status : int
+            Pythia 8 status code, without sign. The sign is set when writing.
+        parents : list[int]
+            Barcodes of parents, all next to each other.
+        px, py, pz : float
+        """
+        self.barcode = barcode
+        self.pdgid = pdgid
+        self.status = status
+        self.parents = parents
+        self.px = px
+        self.py = py
+        self.pz = pz
+        self.mass = get_mass(pdgid)
+        self.energy = math.sqrt(px ** 2 + py ** 2 + pz ** 2 + self.mass ** 2)
+
+    def __repr__(self):
+        return "SyntheticParticle(barcode={0}, pdgid={1}, status={2}, parents={3})".format(
+            self.barcode, self.pdgid, self.status, self.parents)
+
+
+def get_mass(pdgid):
+    return PARTICLE_INFO[abs(pdgid)][1]
+
+
+def get_name(pdgid):
+    """Get the Pythia 8 style name of a particle."""
+    name = PARTICLE_INFO[abs(pdgid)][0]
+    if pdgid > 0:
+        return name
+    if abs(pdgid) in ANTIPARTICLE_NAMES:
+        return ANTIPARTICLE_NAMES[abs(pdgid)]
+    return name.replace("+", "-")
+
+
+def antiparticle(pdgid):
+    """Get the antiparticle PDGID, for particles that aren't their own antiparticle."""
+    return pdgid if pdgid in (21, 22, 92, 111, 113, 130, 221, 223, 310) else -pdgid
+
+
+def make_event(num_particles, seed=1, string_size=20):
+    """Make a synthetic event with exactly `num_particles` particles.
+
+    Parameters
+    ----------
+    num_particles : int
+        Number of particles in the event. Must be at least 20.
+    seed : int, optional
+        Random number seed. The same seed always gives the same event.
+    string_size : int, optional
+        Number of partons joined into each string.
+
+    Returns
+    -------
+    list[SyntheticParticle]
+        Particles, ordered by barcode.
+
+    Raises
+    ------
+    ValueError
+        If `num_particles` is too small to make a whole event.
+    """
+    if num_particles < 20:
+        raise ValueError("Need at least 20 particles in an event, not %d" % num_particles)
+
+    rng = random.Random(seed)
+    particles = []
+
+    def _add(pdgid, status, parents, px, py, pz):
+        particle = SyntheticParticle(len(particles) + 1, pdgid, status, parents, px, py, pz)
+        particles.append(particle)
+        return particle
+
+    def _split(parent, pdgids, status):
+        """Make children of `parent`, sharing its momentum."""
+        z = rng.uniform(0.1, 0.9) if len(pdgids) == 2 else 1.
+        kx, ky = rng.gauss(0, 1), rng.gauss(0, 1)
+        return [_add(pdgids[0], status, [parent.barcode],
+                     z * parent.px + kx, z * parent.py + ky, z * parent.pz)] + \
+               [_add(pdgid, status, [parent.barcode], (1 - z) * parent.px - kx,
+                     (1 - z) * parent.py - ky, (1 - z) * parent.pz) for pdgid in pdgids[1:]]
+
+    # Beams & hard process
+    beams = [_add(2212, STATUS_BEAM, [], 0, 0, 6500), _add(2212, STATUS_BEAM, [], 0, 0, -6500)]
+    incoming = [_add(21, STATUS_INCOMING, [beam.barcode], 0, 0, beam.pz * rng.uniform(0.01, 0.1))
+                for beam in beams]
+    pt, phi = rng.expovariate(1 / 50.), rng.uniform(-math.pi, math.pi)
+    pz = incoming[0].pz + incoming[1].pz
+    quark = rng.choice([1, 2, 3, 4, 5])
+    hard_parents = [p.barcode for p in incoming]
+    partons = deque([_add(quark, STATUS_HARD, hard_parents,
+                          pt * math.cos(phi), pt * math.sin(phi), pz / 2),
+                     _add(-quark, STATUS_HARD, hard_parents,
+                          -pt * math.cos(phi), -pt * math.sin(phi), pz / 2)])
+
+    # Final-state shower, breadth first
+    while len(particles) < 0.25 * num_particles:
+        parton = partons.popleft()
+        if rng.random() < 0.4:
+            partons.extend(_split(parton, [parton.pdgid], STATUS_RECOIL))
+        elif parton.pdgid != 21:
+            partons.extend(_split(parton, [parton.pdgid, 21], STATUS_BRANCH))
+        elif rng.random() < 0.8:
+            partons.extend(_split(parton, [21, 21], STATUS_BRANCH))
+        else:
+            quark = rng.choice([1, 2, 3])
+            partons.extend(_split(parton, [quark, -quark], STATUS_BRANCH))
+
+    # Hadronisation
+    copies = [_split(parton, [parton.pdgid], STATUS_STRING_COPY)[0] for parton in partons]
+    strings = []
+    for start in range(0, len(copies), string_size):
+        group = copies[start:start + string_size]
+        strings.append(_add(92, STATUS_STRING, [p.barcode for p in group],
+                            sum(p.px for p in group), sum(p.py for p in group),
+                            sum(p.pz for p in group)))
+
+    total_weight = sum(weight for _, weight in STRING_HADRONS)
+
+    def _add_hadron(string, num_hadrons):
+        choice = rng.uniform(0, total_weight)
+        for pdgid, weight in STRING_HADRONS:
+            choice -= weight
+            if choice <= 0:
+                break
+        frac = rng.uniform(0.5, 1.5) / num_hadrons
+        return _add(pdgid, STATUS_PRIMARY_HADRON, [string.barcode],
+                    frac * string.px + rng.gauss(0, 0.3), frac * string.py + rng.gauss(0, 0.3),
+                    frac * string.pz)
+
+    # Leave about a third of the event for decays
+    num_primary = max(int((0.65 * num_particles - len(particles)) / len(strings)), 1)
+    unstable = deque()
+    for string in strings:
+        for _ in range(num_primary):
+            if len(particles) == num_particles:
+                break
+            unstable.append(_add_hadron(string, num_primary))
+
+    # Decays, breadth first. Make extra hadrons if we run out of unstable ones.
+    while len(particles) < num_particles:
+        hadron = unstable.popleft() if unstable else None
+        if hadron is None or num_particles - len(particles) < 2:
+            unstable.append(_add_hadron(rng.choice(strings), num_primary))
+        elif hadron.pdgid in DECAYS or -hadron.pdgid in DECAYS:
+            products = DECAYS[abs(hadron.pdgid)]
+            if hadron.pdgid < 0:
+                products = [antiparticle(pdgid) for pdgid in products]
+            unstable.extend(_split(hadron, list(products), STATUS_DECAY))
+    return particles
+
+
+def get_children(particles):
+    """Get the children's barcodes for each particle barcode."""
+    children = {p.barcode: [] for p in particles}
+    for p in particles:
+        for parent in p.parents:
+            children[parent].append(p.barcode)
+    return children
+
+
+def get_family_range(barcodes):
+    """Get the first & last barcodes in a range, or (0, 0) if there are none."""
+    return (barcodes[0], barcodes[-1]) if barcodes else (0, 0)
+
+
+def write_pythia8(events, f):
+    """Write events as Pythia 8 event listings (``pythia.event.list()``).
+
+    Parameters
+    ----------
+    events : iterable[list[SyntheticParticle]]
+    f : file
+        File object to write to.
+    """
+    line_fmt = ("{0:6d} {1:9d}   {2:<18s} {3:4d} {4:5d} {5:5d} {6:5d} {7:5d} {8:5d} {9:5d} "
+                "{10:10.3f} {11:10.3f} {12:10.3f} {13:10.3f} {14:10.3f}\n")
+    for particles in events:
+        children = get_children(particles)
+        energy = sum(p.energy for p in particles if not p.parents)
+        f.write("\n --------  PYTHIA Event Listing  (complete event)  " + "-" * 80 + "\n\n")
+        f.write("    no        id   name            status     mothers   daughters     "
+                "colours      p_x        p_y        p_z         e          m \n")
+        f.write(line_fmt.format(0, 90, "(system)", -11, 0, 0, 0, 0, 0, 0,
+                                0, 0, 0, energy, energy))
+        for p in particles:
+            name, status = get_name(p.pdgid), p.status
+            if children[p.barcode]:
+                name, status = "(%s)" % name, -status
+            parents = get_family_range(p.parents)
+            daughters = get_family_range(children[p.barcode])
+            f.write(line_fmt.format(p.barcode, p.pdgid, name, status,
+                                    parents[0], parents[1] if len(p.parents) > 1 else 0,
+                                    daughters[0], daughters[1], 0, 0,
+                                    p.px, p.py, p.pz, p.energy, p.mass))
+        f.write("{0:35s}Charge sum:  0.000           Momentum sum:      0.000      0.000"
+                "      0.000 {1:10.3f} {1:10.3f}\n".format("", energy))
+        f.write("\n --------  End PYTHIA Event Listing  " + "-" * 94 + "\n")
+
+
+def write_hepmc(events, f):
+    """Write events in the HepMC2 IO_GenEvent format.
+
+    Particles with the same parents share a production vertex.
+    Particles without parents each get their own production vertex.
+
+    Parameters
+    ----------
+    events : iterable[list[SyntheticParticle]]
+    f : file
+        File object to write to.
+    """
+    f.write("\nHepMC::Version 2.06.08\nHepMC::IO_GenEvent-START_EVENT_LISTING\n")
+    for event_num, particles in enumerate(events):
+        # Vertex barcode for each set of parents, in order of first use
+        vertices = {}
+        vertex_out = []  # outgoing particles of each vertex
+        for p in particles:
+            parents = tuple(p.parents) or ("beam", p.barcode)
+            if parents not in vertices:
+                vertices[parents] = -(len(vertices) + 1)
+                vertex_out.append([])
+            vertex_out[-vertices[parents] - 1].append(p)
+        end_vertex = {}
+        for parents, vertex in vertices.items():
+            if parents[0] != "beam":
+                for parent in parents:
+                    end_vertex[parent] = vertex
+
+        children = get_children(particles)
+        f.write("E {0} -1 1.0e+02 1.0e-01 7.5e-03 0 {1} {2} 1 2 0 0\nU GEV MM\n"
+                .format(event_num, vertices[tuple(particles[4].parents)], len(vertices)))
+        for vertex, outgoing in enumerate(vertex_out):
+            f.write("V {0} 0 0 0 0 0 0 {1} 0\n".format(-(vertex + 1), len(outgoing)))
+            for p in outgoing:
+                if not children[p.barcode]:
+                    status = 1
+                elif p.status in (STATUS_PRIMARY_HADRON, STATUS_DECAY):
+                    status = 2
+                else:
+                    status = p.status
+                f.write("P {0} {1} {2:.8e} {3:.8e} {4:.8e} {5:.8e} {6:.8e} {7} 0 0 {8} 0\n"
+                        .format(p.barcode, p.pdgid, p.px, p.py, p.pz, p.energy, p.mass,
+                                status, end_vertex.get(p.barcode, 0)))
+    f.write("HepMC::IO_GenEvent-END_EVENT_LISTING\n")
+
+
+def write_lhe(events, f):
+    """Write events in the Les Houches Event format.
+
+    Unlike real LHE files, the whole event is written, not just the hard process.
+
+    Parameters
+    ----------
+    events : iterable[list[SyntheticParticle]]
+    f : file
+        File object to write to.
+    """
+    f.write('<LesHouchesEvents version="3.0">\n<init>\n'
+            "2212 2212 6.5E+03 6.5E+03 -1 -1 -1 -1 -4 1\n"
+            "1.0E+00 1.0E-02 1.0E+00 1\n</init>\n")
+    for particles in events:
+        children = get_children(particles)
+        f.write("<event>\n{0} 1 1.0E+00 1.0E+02 7.5E-03 1.0E-01\n".format(len(particles)))
+        for p in particles:
+            if not p.parents:
+                status = -1
+            elif children[p.barcode]:
+                status = 2
+            else:
+                status = 1
+            parents = get_family_range(p.parents)
+            f.write("{0} {1} {2} {3} 0 0 {4:.8E} {5:.8E} {6:.8E} {7:.8E} {8:.8E} 0 9\n"
+                    .format(p.pdgid, status, parents[0], parents[1],
+                            p.px, p.py, p.pz, p.energy, p.mass))
+        f.write("</event>\n")
+    f.write("</LesHouchesEvents>\n")
+
+
+def write_cmssw(events, f):
+    """Write events as CMSSW ParticleListDrawer output.
+
+    Indices (& so barcodes) start at 0. ParticleListDrawer output only holds one event,
+    so only the first event is written.
+
+    Parameters
+    ----------
+    events : iterable[list[SyntheticParticle]]
+    f : file
+        File object to write to.
+    """
+    for particles in events:
+        children = get_children(particles)
+        f.write("[ParticleListDrawer] analysing particle collection genParticles\n"
+                "idx | ID - Name |Stat| Mo1 Mo2 Da1 Da2 |nMo nDa| pt eta phi | px py pz m |\n")
+        for p in particles:
+            if not children[p.barcode]:
+                status = 1
+            elif p.status in (STATUS_PRIMARY_HADRON, STATUS_DECAY):
+                status = 2
+            else:
+                status = p.status
+            parents = [barcode - 1 for barcode in get_family_range(p.parents)] \
+                if p.parents else [-1, -1]
+            daughters = [barcode - 1 for barcode in get_family_range(children[p.barcode])] \
+                if children[p.barcode] else [-1, -1]
+            pt = math.hypot(p.px, p.py)
+            theta = math.atan2(pt, p.pz)
+            eta = -math.log(math.tan(theta / 2)) if 0 < theta < math.pi else \
+                math.copysign(10000, p.pz)
+            f.write("{0} | {1} - {2} | {3} | {4} {5} {6} {7} | {8} {9} | "
+                    "{10:.3f} {11:.3f} {12:.3f} | {13:.3f} {14:.3f} {15:.3f} {16:.3f} |\n"
+                    .format(p.barcode - 1, p.pdgid, get_name(p.pdgid), status,
+                            parents[0], parents[1], daughters[0], daughters[1],
+                            len(p.parents), len(children[p.barcode]),
+                            pt, eta, math.atan2(p.py, p.px), p.px, p.py, p.pz, p.mass))
+        break
+
+
+# Writer for each input format, named as in pythiaplotter.parsers.parser_opts
+WRITERS = {
+    "PYTHIA": write_pythia8,
+    "HEPMC": write_hepmc,
+    "LHE": write_lhe,
+    "CMSSW": write_cmssw,
+}
+
+
+def write_events(events, filename, input_format):
+    """Write events to file in one of the input formats.
+
+    Parameters
+    ----------
+    events : iterable[list[SyntheticParticle]]
+    filename : str
+    input_format : {"PYTHIA", "HEPMC", "LHE", "CMSSW"}
+    """
+    if input_format not in WRITERS:
+        raise KeyError("Cannot write synthetic events in format %s, only %s"
+                       % (input_format, ", ".join(sorted(WRITERS))))
+    with open(filename, "w") as f:
+        WRITERS[input_format](events, f)
@@ -5,11 +5,16 @@
 
 from __future__ import absolute_import
 import sys
+import logging
+import threading
+import cProfile
+import multiprocessing
+from timeit import default_timer
 from pythiaplotter.utils.logging_config import get_logger
+from pythiaplotter.utils.profiling import profiler, record_graph_size
 
 import pythiaplotter.parsers as parsers
 import pythiaplotter.printers as printers
-from pythiaplotter.graphers import assign_particles_to_graph
 import pythiaplotter.cli as cli
 from pythiaplotter.utils.common import open_pdf
 
@@ -17,54 +22,324 @@ from pythiaplotter.utils.common import open_pdf
 log = get_logger(__name__)
 
 
-def choose_parser(opts):
-    """Choose parser & configure"""
+# Holds the options & printer for each worker process when plotting in parallel
+_worker_state = {}
 
-    if opts.inputFormat == "PYTHIA":
-        return parsers.Pythia8Parser(filename=opts.input,
-                                     event_num=opts.eventNumber)
-    elif opts.inputFormat == "HEPMC":
-        return parsers.HepMCParser(filename=opts.input,
-                                   event_num=opts.eventNumber)
-    elif opts.inputFormat == "LHE":
-        return parsers.LHEParser(filename=opts.input,
-                                 event_num=opts.eventNumber)
+
+def choose_parser(opts, event_num=None):
+    """Choose parser & configure
+
+    Unless the user asks not to, parsed events are cached, so that plotting
+    the same event again doesn't need the input file to be parsed again.
+
+    Parameters
+    ----------
+    opts : argparse.Namespace
+        User options
+    event_num : int, optional
+        Event number to parse, overrides the one in `opts`
+    """
+    if event_num is None:
+        event_num = opts.eventNumber
+
+    if opts.inputFormat not in parsers.parser_opts:
+        raise NotImplementedError("Cannot parse input format %s" % opts.inputFormat)
+
+    # Only the chosen parser gets imported
+    parser = parsers.parser_opts[opts.inputFormat].parser
+    if opts.inputFormat in ["PYTHIA", "HEPMC", "LHE"]:
+        parser = parser(filename=opts.input,
+                        event_num=event_num)
     elif opts.inputFormat == "CMSSW":
-        return parsers.CMSSWParticleListParser(filename=opts.input)
+        parser = parser(filename=opts.input)
     elif opts.inputFormat == "HEPPY":
-        return parsers.HeppyParser(filename=opts.input,
-                                   event_num=opts.eventNumber,
-                                   **opts.HEPPY_PARSER_OPTS)
+        # Not cached, since its options can't be part of a cache key
+        return parser(filename=opts.input,
+                      event_num=event_num,
+                      **opts.HEPPY_PARSER_OPTS)
     else:
         raise NotImplementedError("Cannot parse input format %s" % opts.inputFormat)
 
+    if opts.noCache:
+        return parser
+    from pythiaplotter.parsers.event_cache import CachedParser
+    return CachedParser(parser)
+
 
 def main(in_args=None):
     """Main entry point to run the whole thing."""
     opts = cli.get_args(in_args)
+
+    profiler.enabled = bool(opts.profile)
+    stats_profile = None
+    if opts.profileStats:
+        stats_profile = cProfile.Profile()
+        stats_profile.enable()
+    start = default_timer()
+    try:
+        run(opts, in_args)
+    finally:
+        if stats_profile:
+            stats_profile.disable()
+            stats_profile.dump_stats(opts.profileStats)
+            log.info("cProfile stats written to %s", opts.profileStats)
+        if opts.profile:
+            profiler.log_summary()
+            profiler.write_json(opts.profile,
+                                info={"input": opts.input, "inputFormat": opts.inputFormat,
+                                      "printer": opts.printer, "jobs": opts.jobs,
+                                      "wall_time": default_timer() - start})
+
+    return 0
+
+
+def run(opts, in_args=None):
+    """Parse & plot the event(s) requested in the user options.
+
+    Parameters
+    ----------
+    opts : argparse.Namespace
+        User options
+    in_args : list[str], optional
+        Commandline arguments, if not from sys.argv
+    """
     # Parse input into a set of particles
     parser = choose_parser(opts)
-    event, particles = parser.parse()
-    event.source = opts.input
-    event.event_num = opts.eventNumber
-    event.title = opts.title
 
-    # Assign particles to graph
-    default_repr = parsers.parser_opts[opts.inputFormat].default_representation
-    graph = assign_particles_to_graph(particles, default_repr,
-                                      desired_repr=opts.representation,
-                                      remove_redundants=(not opts.redundants))
-    event.graph = graph
-    if opts.stats:
-        event.print_stats()
+    if cli.is_multi_event(opts):
+        if opts.jobs != 1:
+            worker_args = sys.argv[1:] if in_args is None else in_args
+            plotted = plot_events_parallel(opts, parser, worker_args)
+        else:
+            # Single pass over the input file, plotting each event as we go
+            printer = printers.printer_opts_checked[opts.printer].printer(opts)
+            # If possible, render several diagrams at once to save starting the renderer each time
+            batching = hasattr(printer, "start_batch")
+            if batching:
+                printer.start_batch()
+            plotted = []
+            try:
+                for event, particles in iter_parsed_events(parser, opts.events):
+                    output_filename = cli.get_event_output_filename(opts, event.event_num)
+                    plot_event(opts, printer, event, particles, output_filename)
+                    plotted.append(event.event_num)
+            finally:
+                # Render the events already queued, even if a later one failed
+                if batching:
+                    printer.finish_batch()
+        log.info("Plotted %d events", len(plotted))
+        if not plotted:
+            log.warning("No events found in %s matching your selection", opts.input)
+        elif opts.events:
+            missing = set(opts.events).difference(plotted)
+            if missing:
+                log.warning("Events %s not found in %s", cli.format_event_range(missing),
+                            opts.input)
+        return
 
-    # Print the graph
     printer = printers.printer_opts_checked[opts.printer].printer(opts)
-    printer.print_event(event)
+    with profiler.stage("parse", opts.eventNumber) as stage:
+        event, particles = parser.parse()
+        stage.counts["particles"] = len(particles)
+    event.event_num = opts.eventNumber
+    plot_event(opts, printer, event, particles, opts.output)
     if opts.open and not opts.noOutput:
         open_pdf(opts.output)
 
-    return 0
+
+def iter_parsed_events(parser, event_nums=None):
+    """Parse events one at a time, profiling each one as a separate "parse" stage.
+
+    Parameters
+    ----------
+    parser : object
+        Parser for the input file
+    event_nums : iterable[int], optional
+        Event numbers to parse. If None, all events are parsed.
+
+    Yields
+    ------
+    Event, list[NodeParticle] or list[EdgeParticle]
+    """
+    events = parser.iter_events(event_nums)
+    while True:
+        # Reading the rest of the file after the last event is also recorded
+        with profiler.stage("parse") as stage:
+            event, particles = next(events, (None, None))
+            if event is not None:
+                stage.event_num = event.event_num
+                stage.counts["particles"] = len(particles)
+        if event is None:
+            return
+        yield event, particles
+
+
+def plot_events_parallel(opts, parser, worker_args):
+    """Plot several events using a pool of worker processes.
+
+    If the parser has an event index, each worker parses its own events by
+    seeking straight to them. Otherwise the input file is read once in this process,
+    and the parsed particles are sent to the workers to be graphed & printed.
+
+    Parameters
+    ----------
+    opts : argparse.Namespace
+        User options
+    parser : object
+        Parser for the input file
+    worker_args : list[str]
+        Commandline arguments, used to recreate `opts` in each worker.
+
+    Returns
+    -------
+    list[int]
+        Numbers of the events plotted
+    """
+    num_jobs = opts.jobs if opts.jobs > 0 else multiprocessing.cpu_count()
+    log.info("Plotting events using %d processes", num_jobs)
+
+    index = getattr(parser, "index", None)
+    if index:
+        wanted = None if opts.events is None else set(opts.events)
+        tasks = [n for n in index.keys() if wanted is None or n in wanted]
+        # Other names for events, e.g. 0 for the first LHE event
+        for alias, event_num in sorted(getattr(parser, "event_aliases", {}).items()):
+            if wanted is not None and alias in wanted and event_num in index:
+                tasks.append(alias)
+        worker = parse_plot_event_worker
+    else:
+        tasks = iter_parsed_events(parser, opts.events)
+        worker = plot_event_worker
+
+    # Stop the parser from racing ahead of the workers and filling up memory
+    # with parsed events waiting to be plotted
+    slots = threading.Semaphore(2 * num_jobs)
+    stop = threading.Event()
+
+    def _throttle(tasks):
+        for task in tasks:
+            slots.acquire()
+            if stop.is_set():
+                return
+            yield task
+
+    plotted = []
+    pool = multiprocessing.Pool(num_jobs, initializer=init_worker, initargs=(worker_args,))
+    try:
+        for event_num, records in pool.imap_unordered(worker, _throttle(tasks)):
+            slots.release()
+            profiler.records.extend(records)
+            plotted.append(event_num)
+        pool.close()
+    finally:
+        # Make sure the task feeder isn't left waiting for a slot, e.g. if a worker failed
+        stop.set()
+        slots.release()
+        pool.terminate()
+        pool.join()
+    return plotted
+
+
+def init_worker(worker_args):
+    """Setup a worker process by recreating the user options, parser & printer.
+
+    The parser (and so its event index) is only made once per worker,
+    and reused for every event that the worker parses.
+
+    The options are recreated from the commandline arguments, rather than passed
+    from the main process, since the config can hold lambdas which cannot be pickled.
+    """
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.WARNING)  # don't repeat all the option info per worker
+    opts = cli.get_args(worker_args)
+    if not opts.verbose:
+        root.setLevel(level)
+    profiler.enabled = bool(opts.profile)
+    if opts.profileStats:
+        log.warning("cProfile stats only cover the main process, not the workers")
+    _worker_state["opts"] = opts
+    _worker_state["parser"] = choose_parser(opts)
+    _worker_state["printer"] = printers.printer_opts_checked[opts.printer].printer(opts)
+
+
+def plot_event_worker(task):
+    """Plot an event in a worker process, given an (Event, particles) pair.
+
+    Returns
+    -------
+    int
+        Event number
+    list[StageRecord]
+        Profiling records from this worker since its last event
+    """
+    event, particles = task
+    opts = _worker_state["opts"]
+    output_filename = cli.get_event_output_filename(opts, event.event_num)
+    plot_event(opts, _worker_state["printer"], event, particles, output_filename)
+    return event.event_num, profiler.pop_records()
+
+
+def parse_plot_event_worker(event_num):
+    """Parse and plot an event in a worker process, given its event number.
+
+    Returns
+    -------
+    int
+        Event number
+    list[StageRecord]
+        Profiling records from this worker since its last event
+    """
+    parser = _worker_state["parser"]
+    with profiler.stage("parse", event_num) as stage:
+        parser.event_num = event_num
+        event, particles = parser.parse()
+        stage.counts["particles"] = len(particles)
+    return plot_event_worker((event, particles))
+
+
+def plot_event(opts, printer, event, particles, output_filename):
+    """Assign particles to a graph, and print the event diagram.
+
+    Parameters
+    ----------
+    opts : argparse.Namespace
+        User options
+    printer : DotPrinter, VisPrinter
+        Printer to make the diagram
+    event : Event
+        Event to plot
+    particles : list[NodeParticle], list[EdgeParticle]
+        Particles in the event, from the parser
+    output_filename : str
+        Output diagram filename
+    """
+    # Imported here as NetworkX is slow to import, and not needed for e.g. --help
+    from pythiaplotter.graphers import assign_particles_to_graph, focus_graph
+
+    event.source = opts.input
+    event.title = opts.title
+
+    with profiler.stage("plot", event.event_num):
+        # Assign particles to graph
+        default_repr = parsers.parser_opts[opts.inputFormat].default_representation
+        graph = assign_particles_to_graph(particles, default_repr,
+                                          desired_repr=opts.representation,
+                                          remove_redundants=(not opts.redundants))
+        # Only keep the interesting part, to make layout faster
+        if opts.focus or opts.focusPdgid:
+            with profiler.stage("focus") as stage:
+                graph = focus_graph(graph, barcodes=opts.focus, pdgids=opts.focusPdgid,
+                                    ancestors=opts.ancestors, descendants=opts.descendants,
+                                    siblings=opts.siblings)
+                record_graph_size(stage, graph)
+        event.graph = graph
+        if opts.stats:
+            event.print_stats()
+
+        # Print the graph
+        with profiler.stage("print"):
+            printer.print_event(event, output_filename)
 
 
 if __name__ == "__main__":
@@ -12,6 +12,7 @@ from collections import OrderedDict
 from pythiaplotter.utils.logging_config import get_logger
 import pythiaplotter.utils.common as helpr
 from pythiaplotter.parsers import parser_opts
+from pythiaplotter.parsers.compression import strip_compression_extension
 from pythiaplotter.printers import printer_opts_checked, print_printers_requirements
 from pythiaplotter import __version__
 
@@ -47,11 +48,21 @@ def get_args(input_args):
     input_group.add_argument("--inputFormat",
                              help="\n".join(parser_help),
                              choices=list(parser_opts.keys()))
-    input_group.add_argument("-n", "--eventNumber",
+    event_group = input_group.add_mutually_exclusive_group()
+    event_group.add_argument("-n", "--eventNumber",
                              help="Select event number to plot, starts at 1.\n"
                                   "For: HEPMC, LHE input formats.\n",
                              type=int,
                              default=0)
+    event_group.add_argument("--events",
+                             help="Select several events to plot in one go, e.g. 1-10,15.\n"
+                                  "Uses the same numbering as --eventNumber.\n"
+                                  "Each event is plotted to its own output file,\n"
+                                  "with the event number appended to the filename.",
+                             type=parse_event_range)
+    event_group.add_argument("--allEvents",
+                             help="Plot all events in the input file, as for --events",
+                             action="store_true")
 
     #################
     # Output file options
@@ -116,6 +127,44 @@ def get_args(input_args):
                               "or quick style edits)",
                               action="store_true")
 
+    output_group.add_argument("--webDataFile",
+                              help="For the WEB printer, put the event data in a separate file\n"
+                                   "next to the webpage (OUTPUT_data.js), instead of inside it",
+                              action="store_true")
+    output_group.add_argument("--webMaxElements",
+                              help="For the WEB printer, the maximum number of nodes + edges\n"
+                                   "to draw at first (0 = no limit). For larger events, parts of\n"
+                                   "the graph are drawn as clusters, which you can expand.",
+                              type=int,
+                              default=5000)
+
+    #################
+    # Focus options
+    #################
+    focus_group = parser.add_argument_group("Focus Options",
+                                            "Only plot particles related to some particles "
+                                            "of interest.")
+    focus_group.add_argument("--focus",
+                             metavar="BARCODES",
+                             help="Barcodes of particles to focus on, e.g. 12,40-45",
+                             type=parse_number_list)
+    focus_group.add_argument("--focusPdgid",
+                             metavar="PDGIDS",
+                             help="PDGIDs of particles to focus on, e.g. 5,25.\n"
+                                  "Particles & antiparticles both match.",
+                             type=parse_number_list)
+    focus_group.add_argument("--ancestors",
+                             metavar="N",
+                             help="Number of generations of ancestors to keep (default all)",
+                             type=int)
+    focus_group.add_argument("--descendants",
+                             metavar="N",
+                             help="Number of generations of descendants to keep (default all)",
+                             type=int)
+    focus_group.add_argument("--siblings",
+                             help="Also keep the siblings of the focus particles & ancestors",
+                             action="store_true")
+
     #################
     # Miscellaneous options
     #################
@@ -129,9 +178,26 @@ def get_args(input_args):
     misc_group.add_argument("-v", "--verbose",
                             help="Print debug statements to screen",
                             action="store_true")
+    misc_group.add_argument("-j", "--jobs",
+                            help="Number of processes to use when plotting several events\n"
+                                 "(0 = one per CPU core)",
+                            type=int,
+                            default=1)
+    misc_group.add_argument("--noCache",
+                            help="Don't use or update the caches of parsed events\n"
+                                 "and web page layouts",
+                            action="store_true")
     misc_group.add_argument("--stats",
                             help="Print some statistics about the event/graph",
                             action="store_true")
+    misc_group.add_argument("--profile",
+                            metavar="FILE",
+                            help="Write the time & memory taken by each stage\n"
+                                 "to this JSON file, and print a summary")
+    misc_group.add_argument("--profileStats",
+                            metavar="FILE",
+                            help="Profile with cProfile, and save the stats to this file.\n"
+                                 "Look at them with e.g. python -m pstats FILE")
     misc_group.add_argument('--version', action='version', version='%(prog)s ' + __version__)
 
     # Handle the scenario where there are no printers available
@@ -170,10 +236,136 @@ def get_args(input_args):
     return args
 
 
+def parse_event_range(range_str):
+    """Convert a string of event numbers & ranges into a list of event numbers.
+
+    >>> parse_event_range("1-3,7")
+    [1, 2, 3, 7]
+
+    Parameters
+    ----------
+    range_str : str
+        Comma-separated event numbers or inclusive START-END ranges.
+
+    Returns
+    -------
+    list[int]
+        Sorted, unique event numbers.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        If `range_str` is malformed.
+    """
+    event_nums = set()
+    try:
+        for part in range_str.split(","):
+            start, sep, end = part.strip().partition("-")
+            start = int(start)
+            end = int(end) if sep else start
+            if end < start:
+                raise ValueError
+            event_nums.update(range(start, end + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Invalid event range '%s', "
+                                         "should be e.g. 1-10,15" % range_str)
+    return sorted(event_nums)
+
+
+def format_event_range(event_nums):
+    """Convert event numbers into a compact string of numbers & ranges, as for --events.
+
+    >>> format_event_range([7, 1, 2, 3])
+    '1-3,7'
+
+    Parameters
+    ----------
+    event_nums : iterable[int]
+
+    Returns
+    -------
+    str
+    """
+    parts = []
+    for num in sorted(set(event_nums)):
+        if parts and num == parts[-1][1] + 1:
+            parts[-1][1] = num
+        else:
+            parts.append([num, num])
+    return ",".join(str(start) if start == end else "%d-%d" % (start, end)
+                    for start, end in parts)
+
+
+def parse_number_list(numbers_str):
+    """Convert a string of numbers & ranges into a list of numbers.
+
+    >>> parse_number_list("5,-5,10-12")
+    [-5, 5, 10, 11, 12]
+
+    Parameters
+    ----------
+    numbers_str : str
+        Comma-separated integers or inclusive START-END ranges (START >= 0).
+
+    Returns
+    -------
+    list[int]
+        Sorted, unique numbers.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        If `numbers_str` is malformed.
+    """
+    numbers = set()
+    try:
+        for part in numbers_str.split(","):
+            part = part.strip()
+            # Look for a range after the first character, so negative numbers work
+            start, sep, end = part[1:].partition("-")
+            if not sep:
+                numbers.add(int(part))
+                continue
+            start, end = int(part[0] + start), int(end)
+            if end < start:
+                raise ValueError
+            numbers.update(range(start, end + 1))
+    except (ValueError, IndexError):
+        raise argparse.ArgumentTypeError("Invalid number list '%s', "
+                                         "should be e.g. 5,10-12" % numbers_str)
+    return sorted(numbers)
+
+
+def is_multi_event(args):
+    """Whether the user has asked to plot several events."""
+    return bool(args.events or args.allEvents)
+
+
+def get_event_output_filename(args, event_num):
+    """Get the output filename for a given event.
+
+    For multi-event running, the event number is appended to the output filename stem,
+    otherwise the output filename is unchanged.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+    event_num : int
+
+    Returns
+    -------
+    str
+    """
+    if not is_multi_event(args):
+        return args.output
+    stem, ext = os.path.splitext(args.output)
+    return "".join([stem, "_", str(event_num), ext])
+
+
 def set_default_output_settings(args):
     """Set default output filenames and stems/dirs"""
     # TODO: shouldn't be setting args.X here as a side effect!
-    stem_name, _ = os.path.splitext(os.path.basename(args.input))
+    stem_name, _ = os.path.splitext(os.path.basename(strip_compression_extension(args.input)))
     input_dir = helpr.get_directory(args.input)
     # Set default output format if there is an output filename specified
     if args.output:
@@ -188,16 +380,23 @@ def set_default_output_settings(args):
         if not args.outputFormat:
             args.outputFormat = printer_opts_checked[args.printer].default_output_fmt
             log.info("You didn't specify an output format, defaulted to %s", args.outputFormat)
-        filename = "".join([stem_name, "_", str(args.eventNumber), ".", args.outputFormat])
+        if is_multi_event(args):
+            # Event number gets added for each event by get_event_output_filename()
+            filename = "".join([stem_name, ".", args.outputFormat])
+        else:
+            filename = "".join([stem_name, "_", str(args.eventNumber), ".", args.outputFormat])
         args.output = os.path.join(input_dir, filename)
         log.info("You didn't specify an output filename, setting it to %s", args.output)
+    if is_multi_event(args):
+        log.info("Output filenames will have the event number appended, e.g. %s",
+                 get_event_output_filename(args, args.events[0] if args.events else 0))
 
 
 def set_default_input_format(args):
     """Set default input format if the user hasn't."""
     if not args.inputFormat:
         for pname, popt in parser_opts.items():
-            input_extension = os.path.splitext(args.input)[1]
+            input_extension = os.path.splitext(strip_compression_extension(args.input))[1]
             if input_extension.lower() == popt.file_extension:
                 args.inputFormat = pname
                 log.info("You didn't set an input format. Assuming %s", args.inputFormat)
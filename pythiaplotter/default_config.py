@@ -54,6 +54,9 @@ DOT_LABEL_OPTS = {
 # Each entry must be a dict, with 2 fields: "filter" and "attr".
 # "filter" must hold a lambda, that takes in a particle and returns a bool.
 # If this evaluates True, the styling will be used.
+# Filters can use any particle attribute, but are fastest if they only use
+# pdgid, status, initial_state and final_state, as then the style is only
+# worked out once for each combination of those.
 # The "attr"" field must hold a dict, with keys "node" and "edge".
 # The "node" dict is used for NODE particle representation, and similarly
 # the "edge" dict for EDGE representation.
@@ -3,10 +3,12 @@
 
 from __future__ import absolute_import
 from pythiaplotter.utils.logging_config import get_logger
+from pythiaplotter.utils.profiling import profiler, record_graph_size
 from pythiaplotter.graphers.edge_grapher import assign_particles_edges, remove_redundant_edges
 from pythiaplotter.graphers.node_grapher import assign_particles_nodes, remove_redundant_nodes
 from pythiaplotter.utils.common import check_representation_str
 from pythiaplotter.graphers.converters import node_to_edge, edge_to_node
+from pythiaplotter.graphers.focus import focus_graph
 
 
 log = get_logger(__name__)
@@ -31,11 +33,13 @@ def assign_particles_to_graph(particles, default_repr, desired_repr=None, remove
     NetworkX.MultiDiGraph
     """
     check_representation_str(default_repr, "default_repr")
-    if default_repr == "NODE":
-        graph = assign_particles_nodes(particles)
-    elif default_repr == "EDGE":
-        graph = assign_particles_edges(particles)
-        remove_edges_by_pdgid(graph, 22, True)
+    with profiler.stage("graph") as stage:
+        if default_repr == "NODE":
+            graph = assign_particles_nodes(particles)
+        elif default_repr == "EDGE":
+            graph = assign_particles_edges(particles)
+            remove_edges_by_pdgid(graph, 22, True)
+        record_graph_size(stage, graph)
 
     new_repr = default_repr
 
@@ -43,15 +47,19 @@ def assign_particles_to_graph(particles, default_repr, desired_repr=None, remove
         check_representation_str(desired_repr, "desired_repr")
 
         new_repr = desired_repr
-        if (default_repr, desired_repr) == ("NODE", "EDGE"):
-            graph = node_to_edge(graph)
-        elif (default_repr, desired_repr) == ("EDGE", "NODE"):
-            graph = edge_to_node(graph)
+        with profiler.stage("convert") as stage:
+            if (default_repr, desired_repr) == ("NODE", "EDGE"):
+                graph = node_to_edge(graph)
+            elif (default_repr, desired_repr) == ("EDGE", "NODE"):
+                graph = edge_to_node(graph)
+            record_graph_size(stage, graph)
 
     if remove_redundants:
-        if new_repr == "NODE":
-            remove_redundant_nodes(graph)
-        elif new_repr == "EDGE":
-            remove_redundant_edges(graph)
+        with profiler.stage("redundants") as stage:
+            if new_repr == "NODE":
+                remove_redundant_nodes(graph)
+            elif new_repr == "EDGE":
+                remove_redundant_edges(graph)
+            record_graph_size(stage, graph)
 
     return graph
@@ -2,7 +2,7 @@
 
 
 from __future__ import absolute_import
-import copy
+import itertools
 import networkx as nx
 from pythiaplotter.utils.logging_config import get_logger
 from pythiaplotter.parsers.event_classes import NodeParticle, EdgeParticle
@@ -96,58 +96,81 @@ def insert_duplicate_nodes(graph):
     NetworkX.MultiDiGraph
         Copy of input graph but with duplicate parent nodes added.
     """
-    nodes_done = []
-    graph_copy = graph.copy()
+    # Only copy the graph structure and attribute dicts, not the particles themselves
+    # (graph.copy() would deepcopy them all), since duplicates get their own copy below
+    graph_copy = nx.MultiDiGraph(graph)
 
-    for node in graph.nodes_iter():
-        if node in nodes_done or len(graph.successors(node)) == 0:
+    for parents, children in get_parent_child_groups(graph):
+        if not duplication_needed(graph, parents, children):
             continue
 
-        log.debug("Doing node %d", node)
+        # For each shared parent, add a duplicate node between
+        # it and a child with shared parentage
+        for pa in parents:
+            log.debug("Parent %d", pa)
+            these_children = list(graph.succ[pa])
+            # Skip if only 1 child
+            if len(these_children) <= 1:
+                continue
+
+            for ch in these_children:
+                log.debug("Child %d", ch)
+
+                # Skip children with only 1 parent - no shared parentage, no duplication needed
+                if len(graph.pred[ch]) <= 1:
+                    log.debug("Skipping %d", ch)
+                    continue
 
-        parents, children = get_related_parents_children(graph, node)
+                # remove parent - child connection
+                graph_copy.remove_edge(pa, ch)
+                parent_particle = graph.node[pa]['particle']
 
-        if duplication_needed(graph, parents, children):
-            # For each shared parent, add a duplicate node between
-            # it and a child with shared parentage
-            for pa in parents:
-                log.debug("Parent %d", pa)
-                these_children = graph.successors(pa)
-                # Skip if only 1 child
-                if len(these_children) <= 1:
-                    continue
+                # create duplicate particle and add it in with a new unique barcode
+                dupl_particle = parent_particle.copy()
+                new_barcode = 20000 + parent_particle.barcode  # assumes graph has <20K nodes...
+                # do a check for uniqueness
+                while new_barcode in graph_copy:
+                    new_barcode += 1
+                dupl_particle.barcode = new_barcode
 
-                for ch in these_children:
-                    log.debug("Child %d", ch)
+                graph_copy.add_node(new_barcode, particle=dupl_particle,
+                                    initial_state=False, final_state=False)
+                graph_copy.add_edge(pa, new_barcode)
+                graph_copy.add_edge(new_barcode, ch)
 
-                    # Skip children with only 1 parent - no shared parentage, no duplication needed
-                    if len(graph.predecessors(ch)) <= 1:
-                        log.debug("Skipping %d", ch)
-                        continue
+                log.debug("Adding duplicate %d", new_barcode)
+                log.debug("Adding %d -> %d -> %d", pa, new_barcode, ch)
 
-                    # remove parent - child connection
-                    graph_copy.remove_edge(pa, ch)
-                    parent_particle = graph.node[pa]['particle']
+    return graph_copy
 
-                    # create duplicate particle and add it in with a new unique barcode
-                    dupl_particle = copy.deepcopy(parent_particle)
-                    new_barcode = 20000 + parent_particle.barcode  # assumes graph has <20K nodes...
-                    # do a check for uniqueness
-                    while new_barcode in graph_copy:
-                        new_barcode += 1
-                    dupl_particle.barcode = new_barcode
 
-                    graph_copy.add_node(new_barcode, particle=dupl_particle,
-                                        initial_state=False, final_state=False)
-                    graph_copy.add_edge(pa, new_barcode)
-                    graph_copy.add_edge(new_barcode, ch)
+def get_parent_child_groups(graph):
+    """Split the graph into groups of parents and children connected by shared parentage.
 
-                    log.debug("Adding duplicate %d", new_barcode)
-                    log.debug("Adding %d -> %d -> %d", pa, new_barcode, ch)
+    Each node with children belongs to exactly one group of parents, so all groups are
+    found in a single pass over the graph, visiting each node & edge a fixed number of times.
+    Groups are ordered by their first parent in the graph, and parents within a group by the
+    order in which they are reached, starting from that first parent.
 
-        nodes_done.extend(parents)
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+        Graph to analyze
 
-    return graph_copy
+    Returns
+    -------
+    list[(list[int], list[int])]
+        Parent nodes and child nodes in each group.
+    """
+    groups = []
+    nodes_done = set()
+    for node in graph.nodes_iter():
+        if node in nodes_done or not graph.succ[node]:
+            continue
+        parents, children = get_related_parents_children(graph, node)
+        nodes_done.update(parents)
+        groups.append((parents, children))
+    return groups
 
 
 def get_related_parents_children(graph, node):
@@ -161,9 +184,12 @@ def get_related_parents_children(graph, node):
     - all of those parents children
     - ...
 
-    recursviely until we are done. Thus we obtain all nodes in this generation or 1 later, which
+    recursively until we are done. Thus we obtain all nodes in this generation or 1 later, which
     are connected without straying outside of those two generations
-    (ignoring the directionality of edges for a moment)
+    (ignoring the directionality of edges for a moment).
+
+    This is a breadth-first search that alternates between parents and children,
+    so each related node and edge is only visited once.
 
     Parameters
     ----------
@@ -180,54 +206,27 @@ def get_related_parents_children(graph, node):
         All connected children
 
     """
-    all_children = graph.successors(node)
     all_parents = [node]
-    log.debug("start related parents: %s", all_parents)
-    log.debug("start related children: %s", all_children)
-    # iterative algo to get all unique parents and children
-    while (set(all_parents) != set(get_all_parents(graph, all_children))
-           or set(all_children) != set(get_all_children(graph, all_parents))):
-
-        all_parents.extend(list(set(get_all_parents(graph, all_children)) - set(all_parents)))
-        all_children.extend(list(set(get_all_children(graph, all_parents)) - set(all_children)))
-
-    log.debug("end related parents: %s", all_parents)
-    log.debug("end related children: %s", all_children)
+    all_children = []
+    parents_seen = {node}
+    children_seen = set()
+    # all_parents grows as we go, so we also visit the children of newly found parents
+    for parent in all_parents:
+        for child in graph.succ[parent]:
+            if child in children_seen:
+                continue
+            children_seen.add(child)
+            all_children.append(child)
+            for other_parent in graph.pred[child]:
+                if other_parent not in parents_seen:
+                    parents_seen.add(other_parent)
+                    all_parents.append(other_parent)
+
+    log.debug("related parents: %s", all_parents)
+    log.debug("related children: %s", all_children)
     return all_parents, all_children
 
 
-def get_all_parents(graph, children):
-    """Get all unique parents nodes of all specified children nodes in a flattened list.
-
-    Parameters
-    ----------
-    graph : NetworkX.MultiDiGraph
-    children : list[int]
-
-    Returns
-    -------
-    list[int]
-        Parent nodes
-    """
-    return list(set([p for c in children for p in graph.predecessors(c)]))
-
-
-def get_all_children(graph, parents):
-    """Get all unique child nodes of all specified parent nodes in a flattened list.
-
-    Parameters
-    ----------
-    graph : NetworkX.MultiDiGraph
-    parents : list[int]
-
-    Returns
-    -------
-    list[int]
-        Child nodes
-    """
-    return list(set([c for p in parents for c in graph.successors(p)]))
-
-
 def duplication_needed(graph, parents, children):
     """For a set of parent and child nodes in a graph, determine if any duplicate nodes are needed.
 
@@ -251,79 +250,52 @@ def duplication_needed(graph, parents, children):
     -------
     bool
     """
-    return any([len(graph.predecessors(c)) != len(parents) for c in children])
+    return any(len(graph.pred[c]) != len(parents) for c in children)
 
 
 def construct_edges_from_nodes(graph):
     """Convert each node (representing a NodeParticle) into a EdgeParticle, with vertex barcodes.
 
     To do this, we have to ensure that a particle's incoming & outgoing vertices are concistent
-    with its children & parents. Thus we ask them first for a suitable vertex,
-    and if none can be found, create a new vertex barcode.
+    with its children & parents. All parents and children in a group with shared parentage
+    (see get_parent_child_groups()) meet at the same vertex, so each group is given one
+    vertex barcode. Particles without parents or children get a new vertex barcode.
 
     Parameters
     ----------
     graph : NetworkX.MultiDiGraph
+        Graph to convert. Any child with several parents must have the same
+        parents as its siblings, e.g. by using insert_duplicate_nodes() first.
 
     Returns
     -------
     list[EdgeParticle]
-
-    Raises
-    ------
-    IndexError
-        If there is more than one unique candidate in/out vertex barcode.
     """
     edge_particles = []
-    vtx_barcodes = set()
-
-    def _find_outgoing_vtx_barcode(graph, node):
-        """Find a suitable outgoing vertex, using parent's incoming if possible."""
-        parent_nodes = graph.predecessors(node)
-        if len(parent_nodes) != 0:
-            parent_in = set([graph.node[p]['in_vtx'] for p in parent_nodes
-                             if 'in_vtx' in graph.node[p]])
-            sibling_out = set([graph.node[s]['out_vtx']
-                               for s in get_all_children(graph, graph.predecessors(node))
-                               if 'out_vtx' in graph.node[s]])
-            vtx = parent_in | sibling_out
-            if len(vtx) > 1:
-                raise IndexError("Too many possibilities for outgoing barcode")
-            elif len(vtx) == 1:
-                return vtx.pop()
-        return None
-
-    def _find_incoming_vtx_barcode(graph, node):
-        """Find a incoming vertex, using children's outgoing if possible."""
-        child_nodes = graph.successors(node)
-        if len(child_nodes) != 0:
-            children_out = set([graph.node[c]['out_vtx'] for c in child_nodes
-                                if 'out_vtx' in graph.node[c]])
-            sibling_in = set([graph.node[s]['in_vtx']
-                              for s in get_all_parents(graph, graph.successors(node))
-                              if 'in_vtx' in graph.node[s]])
-            vtx = children_out.union(sibling_in)
-            if len(vtx) > 1:
-                raise IndexError("Too many possibilities for incoming barcode")
-            elif len(vtx) == 1:
-                return vtx.pop()
-        return None
+    vtx_barcodes = {}  # vertex barcode for each group, keyed by its first parent
+    group_of = {}  # first parent of the group for each parent node
+    for parents, _ in get_parent_child_groups(graph):
+        for pa in parents:
+            group_of[pa] = parents[0]
+
+    new_vtx_barcode = itertools.count()
+
+    def _group_vtx_barcode(parent):
+        """Get the vertex barcode shared by a parent, its siblings & their children."""
+        group = group_of[parent]
+        if group not in vtx_barcodes:
+            vtx_barcodes[group] = next(new_vtx_barcode)
+        return vtx_barcodes[group]
 
     for node, data in graph.nodes_iter(data=True):
         log.debug("Constructing EP for node %d", node)
-        # Figure out the outgoing vertex barcode, use parent's incoming one if there is a parent,
-        # or any sibling outgoing one. Otherwise create unique one.
-        ob = _find_outgoing_vtx_barcode(graph, node) or len(vtx_barcodes)
-        vtx_barcodes.add(ob)
-
-        # Figure out the incoming vertex barcode, use children's outgoing one if there are any,
-        # or any sibling incoming one. Otherwise create unique one.
-        ib = _find_incoming_vtx_barcode(graph, node) or len(vtx_barcodes)
-        vtx_barcodes.add(ib)
-
-        # store the particles in/out vertex barcode to connect other children to parents later
-        graph.node[node]['out_vtx'] = ob
-        graph.node[node]['in_vtx'] = ib
+        # Outgoing vertex is the one shared with the parents, otherwise create unique one.
+        parents = graph.pred[node]
+        ob = _group_vtx_barcode(next(iter(parents))) if parents else next(new_vtx_barcode)
+
+        # Incoming vertex is the one shared with the children, otherwise create unique one.
+        ib = _group_vtx_barcode(node) if graph.succ[node] else next(new_vtx_barcode)
+
         ep = EdgeParticle(particle=data['particle'], vtx_in_barcode=ib, vtx_out_barcode=ob)
         log.debug("Adding EdgeParticle %s", ep)
         edge_particles.append(ep)
@@ -111,12 +111,43 @@ def remove_particle_edge(graph, edge):
     for out_e, in_e, edge_data in graph.in_edges(in_node, data=True):
         if (out_e, in_e) == (out_node, in_node):
             continue  # ignore the original edge itself!
-        log.debug("Adding %d %d %s", out_e, out_node, **edge_data)
+        log.debug("Adding %d %d %s", out_e, out_node, edge_data)
         graph.add_edge(out_e, out_node, **edge_data)
 
     graph.remove_node(in_node)
 
 
+def is_redundant_edge(graph, out_node, in_node, key):
+    """Check if a particle edge is redundant, see remove_redundant_edges().
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+    out_node, in_node : int
+        Outgoing node, incoming node of the edge.
+    key : int
+        Key of the edge, to distinguish it from others between the same nodes.
+
+    Returns
+    -------
+    bool
+    """
+    # Count edges directly from the adjacency dicts, as graph.in_degree() etc are slow.
+    # Note that these count every edge between a pair of nodes.
+    parents = graph.pred[out_node]
+    if (count_edges(parents) != 1 or count_edges(graph.succ[out_node]) != 1
+            or not graph.succ[in_node]):
+        return False
+    for parent_edges in parents.values():
+        for parent_data in parent_edges.values():
+            return parent_data["particle"].pdgid == graph[out_node][in_node][key]["particle"].pdgid
+
+
+def count_edges(neighbours):
+    """Count the edges in a MultiDiGraph adjacency dict, e.g. ``graph.succ[node]``"""
+    return sum(len(edges) for edges in neighbours.values())
+
+
 def remove_redundant_edges(graph):
     """Remove redundant particle edges from a graph.
 
@@ -141,49 +172,32 @@ def remove_redundant_edges(graph):
     These redundants are useful to keep if considering MC internal workings,
     but otherwise are just confusing and a waste of space.
 
-    Since it loops over the list of graph edges, we can only remove one edge in
-    a loop, otherwise adding extra/replacement edges ruins the sibling counting
-    and doesn't remove redundants. So the method loops through the graph edges
-    until there are no more redundant edges.
+    Removing an edge merges its in node into its out node. This only
+    changes whether the edges outgoing from the merged node are redundant:
+    the rest of the graph is unaffected. So instead of rescanning the whole
+    graph after every removal, the nodes are worked through once, in the same
+    order as ``graph.edges_iter()``, and the outgoing edges of the current node
+    are re-checked until none are redundant. This collapses a whole redundant
+    chain in one go, and removes edges in the same order as a full rescan would,
+    so the result is identical.
 
     Since we are dealing with MultiDiGraph, we have to be careful about siblings
     that actually span the same set of nodes - these shouldn't be removed.
 
-    There is probably a more sensible way to do this, currently brute
-    force and slow.
-
     Parameters
     ----------
     graph : NetworkX.MultiDiGraph
         Graph to remove redundant nodes from.
     """
-
-    done_removing = False
-    while not done_removing:
-
-        done_removing = True
-
-        for out_node, in_node, edge_data in graph.edges_iter(data=True):
-
-            # get all incoming edges to this particle's out node (parents)
-            parent_edges = graph.in_edges(out_node, data=True)
-            # get all outgoing edges from this particle's out node (siblings)
-            sibling_edges = graph.out_edges(out_node)
-            # get all outgoing edges from this particle's in node (children)
-            child_edges = graph.out_edges(in_node)
-
-            if len(parent_edges) == 1 and len(child_edges) != 0 and len(sibling_edges) == 1:
-                parent_out, parent_in, parent_data = parent_edges[0]
-
-                # Do removal if parent PDGID matches
-                if parent_data["particle"].pdgid == edge_data["particle"].pdgid:
-                    log.debug("Doing edge: %d %d", out_node, in_node)
-                    log.debug("Parent edges: %s", parent_edges)
-                    log.debug("Child edges: %s", child_edges)
-
-                    done_removing = False
-
-                    log.debug("Removing redundant edge (%d, %d) %s", out_node, in_node, edge_data)
-                    remove_particle_edge(graph, (out_node, in_node))
-
+    for node in list(graph.adj):
+        while node in graph:
+            out_edges = [(in_node, key) for in_node, edges in graph.succ[node].items()
+                         for key in edges]
+            for in_node, key in out_edges:
+                if is_redundant_edge(graph, node, in_node, key):
+                    log.debug("Removing redundant edge (%d, %d) %s",
+                              node, in_node, graph[node][in_node][key])
+                    remove_particle_edge(graph, (node, in_node))
                     break
+            else:
+                break
@@ -0,0 +1,114 @@
+"""Select only the part of the graph around some particles of interest.
+
+This is done before any layout, since the time taken to lay out the graph
+grows quickly with its size.
+"""
+
+
+from __future__ import absolute_import
+from collections import deque
+from pythiaplotter.utils.logging_config import get_logger
+
+
+log = get_logger(__name__)
+
+
+def focus_graph(graph, barcodes=None, pdgids=None, ancestors=None, descendants=None,
+                siblings=False):
+    """Get the subgraph of particles related to some seed particles.
+
+    Works for both NODE and EDGE representations.
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+        Full event graph.
+    barcodes : list[int], optional
+        Barcodes of seed particles.
+    pdgids : list[int], optional
+        PDGIDs of seed particles. Particles & antiparticles both match.
+    ancestors : int, optional
+        Number of generations of ancestors of the seeds to keep. Default is all.
+    descendants : int, optional
+        Number of generations of descendants of the seeds to keep. Default is all.
+    siblings : bool, optional
+        If True, also keep the siblings of the seeds and their kept ancestors.
+
+    Returns
+    -------
+    NetworkX.MultiDiGraph
+        Subgraph with only the seeds & related particles.
+
+    Raises
+    ------
+    ValueError
+        If no particles match the barcodes or PDGIDs, rather than plotting an empty graph.
+    """
+    barcodes = set(barcodes or [])
+    pdgids = set(abs(pdgid) for pdgid in pdgids or [])
+
+    def _is_seed(data):
+        particle = data.get('particle')
+        return particle is not None and (particle.barcode in barcodes
+                                         or abs(particle.pdgid) in pdgids)
+
+    # Ancestry starts from the node "above" each seed particle, descendants from the one "below".
+    # In NODE representation both are the particle's node,
+    # in EDGE representation they are the start & end node of the particle's edge.
+    upper_nodes, lower_nodes = set(), set()
+    for node, node_data in graph.nodes_iter(data=True):
+        if _is_seed(node_data):
+            upper_nodes.add(node)
+            lower_nodes.add(node)
+    for out_node, in_node, edge_data in graph.edges_iter(data=True):
+        if _is_seed(edge_data):
+            upper_nodes.add(out_node)
+            lower_nodes.add(in_node)
+
+    if not upper_nodes:
+        raise ValueError("No particles with barcodes %s or PDGIDs %s to focus on"
+                         % (sorted(barcodes), sorted(pdgids)))
+
+    ancestor_nodes = get_nearby_nodes(graph.pred, upper_nodes, ancestors)
+    keep = ancestor_nodes | get_nearby_nodes(graph.succ, lower_nodes, descendants)
+    if siblings:
+        for node in ancestor_nodes:
+            if 'particle' in graph.node[node]:
+                # NODE representation: the other children of the particle's parents
+                for parent in graph.pred[node]:
+                    keep.update(graph.succ[parent])
+            else:
+                # EDGE representation: the other particles out of the same vertex
+                keep.update(graph.succ[node])
+
+    log.info("Focusing on %d out of %d nodes", len(keep), graph.number_of_nodes())
+    return graph.subgraph(keep)
+
+
+def get_nearby_nodes(neighbours, start_nodes, max_generations=None):
+    """Get all nodes within some number of generations of the start nodes.
+
+    Parameters
+    ----------
+    neighbours : dict
+        Adjacency dict to follow, e.g. graph.pred for ancestors, graph.succ for descendants.
+    start_nodes : iterable
+        Nodes to start from, which are included in the result.
+    max_generations : int, optional
+        Maximum number of generations to go. Default is no limit.
+
+    Returns
+    -------
+    set
+    """
+    nearby = set(start_nodes)
+    queue = deque((node, 0) for node in nearby)
+    while queue:
+        node, generation = queue.popleft()
+        if max_generations is not None and generation >= max_generations:
+            continue
+        for neighbour in neighbours[node]:
+            if neighbour not in nearby:
+                nearby.add(neighbour)
+                queue.append((neighbour, generation + 1))
+    return nearby
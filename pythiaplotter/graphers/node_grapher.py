@@ -68,8 +68,9 @@ def assign_particles_nodes(node_particles):
 def remove_particle_node(graph, node):
     """Remove a particle node from the graph"""
     # rewire - ensure all it's parents decay to all it's children
-    for child in graph.successors(node):
-        for parent in graph.predecessors(node):
+    parents = list(graph.pred[node])
+    for child in list(graph.succ[node]):
+        for parent in parents:
             graph.add_edge(parent, child)
     graph.remove_node(node)  # also removes the relevant edges
 
@@ -87,6 +88,27 @@ def remove_isolated_nodes(gr):
             gr.remove_node(np)
 
 
+def is_redundant_node(graph, node):
+    """Check if a particle node is redundant, see remove_redundant_nodes().
+
+    Uses the adjacency dicts directly, as graph.successors() etc build new lists.
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+    node : int
+
+    Returns
+    -------
+    bool
+    """
+    parents = graph.pred[node]
+    if len(graph.succ[node]) != 1 or len(parents) != 1:
+        return False
+    parent = next(iter(parents))
+    return graph.node[parent]['particle'].pdgid == graph.node[node]['particle'].pdgid
+
+
 def remove_redundant_nodes(graph):
     """Remove redundant particle nodes from a graph.
 
@@ -100,23 +122,16 @@ def remove_redundant_nodes(graph):
     These are useful to keep if considering Pythia8 internal workings,
     but otherwise are just confusing and a waste of space.
 
+    The graph is modified in place, in a single pass that checks each node
+    once. Removing a node joins its parent directly to its child, so a
+    whole chain of redundant nodes is collapsed within that pass.
+
     Parameters
     ----------
     graph : NetworkX.MultiDiGraph
         Graph to remove redundant nodes from
     """
-    graph_new = graph.copy()  # use copy to avoid modifying the thing we're iterating over
-    removed_nodes = []  # need to keep track of things we've removed
-    for node, data in graph_new.nodes_iter(data=True):
-        if node in removed_nodes:
-            continue
-        children = graph.successors(node)
-        parents = graph.predecessors(node)
-        if len(children) == 1 and len(parents) == 1:
-            p = data['particle']
-            parent = graph.node[parents[0]]['particle']
-            child = graph.node[children[0]]['particle']
-            if parent.pdgid == p.pdgid:
-                log.debug("Removing (%d) %s", node, data['particle'])
-                remove_particle_node(graph, node)
-                removed_nodes.append(node)
+    for node in list(graph.node):
+        if node in graph and is_redundant_node(graph, node):
+            log.debug("Removing (%d) %s", node, graph.node[node]['particle'])
+            remove_particle_node(graph, node)
@@ -1,6 +1,13 @@
 """Parsers read the input file, and convert the information into a set of particles.
 These can then be attached to a graph.
 
+The pure-python parsers can be imported from here, e.g.
+``from pythiaplotter.parsers import HepMCParser``.
+On Python 3.7+ they are only imported when first used, to keep startup (e.g. ``--help``) fast.
+The Heppy parser needs ROOT, which is very slow to import, so it is only imported when needed,
+via the ``parser`` attribute of its ParserOption. To use it directly, import it from its module:
+``from pythiaplotter.parsers.heppy_parser import HeppyParser``
+
 Attributes
 ----------
 parser_opts : dict[str, ParserOption]
@@ -9,17 +16,41 @@ parser_opts : dict[str, ParserOption]
 
 
 from __future__ import absolute_import
+import sys
 from pythiaplotter.utils.logging_config import get_logger
-from pythiaplotter.utils.common import generate_repr_str, check_representation_str
-from .pythia8_parser import Pythia8Parser
-from .hepmc_parser import HepMCParser
-from .lhe_parser import LHEParser
-from .cmssw_particle_list_parser import CMSSWParticleListParser
+from pythiaplotter.utils.common import (generate_repr_str, check_representation_str,
+                                       check_module_exists, load_object)
 
 
 log = get_logger(__name__)
 
 
+# Where to find each of the pure-python parsers exported by this package
+_PARSER_PATHS = {
+    "Pythia8Parser": "pythiaplotter.parsers.pythia8_parser:Pythia8Parser",
+    "HepMCParser": "pythiaplotter.parsers.hepmc_parser:HepMCParser",
+    "LHEParser": "pythiaplotter.parsers.lhe_parser:LHEParser",
+    "CMSSWParticleListParser":
+        "pythiaplotter.parsers.cmssw_particle_list_parser:CMSSWParticleListParser"
+}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        """Import the exported parsers on first use (PEP 562)."""
+        if name in _PARSER_PATHS:
+            return load_object(_PARSER_PATHS[name])
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    def __dir__():
+        return sorted(list(globals()) + list(_PARSER_PATHS))
+else:
+    # Module __getattr__ isn't supported, so import them all now
+    from .pythia8_parser import Pythia8Parser  # noqa: F401
+    from .hepmc_parser import HepMCParser  # noqa: F401
+    from .lhe_parser import LHEParser  # noqa: F401
+    from .cmssw_particle_list_parser import CMSSWParticleListParser  # noqa: F401
+
+
 class ParserOption(object):
 
     def __init__(self, description, parser, default_representation, file_extension):
@@ -30,8 +61,9 @@ class ParserOption(object):
         description : str
             Brief description about parser
 
-        parser : class
-            The Parser class
+        parser : str
+            Where to find the Parser class, as "module:class".
+            It is only imported when the ``parser`` attribute is first used.
 
         default_representation : {'NODE', 'EDGE'}
             Default particle representation of the parser.
@@ -40,13 +72,21 @@ class ParserOption(object):
             Optional file extension to associate with this parser. (no preceeding .)
         """
         self.description = description
-        self.parser = parser
+        self.parser_path = parser
+        self._parser = None
         self.file_extension = file_extension
         check_representation_str(default_representation, "default_representation")
         self.default_representation = default_representation
 
+    @property
+    def parser(self):
+        """The Parser class, imported on first use."""
+        if self._parser is None:
+            self._parser = load_object(self.parser_path)
+        return self._parser
+
     def __repr__(self):
-        return generate_repr_str(self)
+        return generate_repr_str(self, ignore=['_parser'])
 
     def __str__(self):
         return "{0}({1})".format(self.__class__.__name__, self.description)
@@ -57,41 +97,42 @@ parser_opts = {
 
     "PYTHIA": ParserOption(
         description="For screen output from Pythia 8 piped into file",
-        parser=Pythia8Parser,
+        parser="pythiaplotter.parsers.pythia8_parser:Pythia8Parser",
         file_extension=".txt",
         default_representation="NODE"
     ),
 
     "HEPMC": ParserOption(
         description="For HEPMC files",
-        parser=HepMCParser,
+        parser="pythiaplotter.parsers.hepmc_parser:HepMCParser",
         file_extension=".hepmc",
         default_representation="EDGE"
     ),
 
     "LHE": ParserOption(
         description="For LHE files",
-        parser=LHEParser,
+        parser="pythiaplotter.parsers.lhe_parser:LHEParser",
         file_extension=".lhe",
         default_representation="NODE"
     ),
 
     "CMSSW": ParserOption(
         description="For ParticleListDrawer output from CMSSW piped into file",
-        parser=CMSSWParticleListParser,
+        parser="pythiaplotter.parsers.cmssw_particle_list_parser:CMSSWParticleListParser",
         file_extension=None,
         default_representation="NODE"
     )
 }
 
-# Have to wrap the ROOT parts carefully, because it isn't installed easily with pip
-try:
-    from .heppy_parser import HeppyParser
+# Have to check for ROOT carefully, because it isn't installed easily with pip.
+# Only look for it here, since actually importing it is very slow.
+if check_module_exists("ROOT"):
     parser_opts['HEPPY'] = ParserOption(
         description="For Heppy ROOT files",
-        parser=HeppyParser,
+        parser="pythiaplotter.parsers.heppy_parser:HeppyParser",
         file_extension=None,
         default_representation="NODE"
     )
-except ImportError:
+else:
     log.warning("Cannot import PyROOT, no interface to Heppy tree")
+
@@ -11,7 +11,8 @@ TODO: perhaps this needs a name change...
 from __future__ import absolute_import
 from pythiaplotter.utils.logging_config import get_logger
 from pythiaplotter.utils.common import map_columns_to_dict
-from .event_classes import Event, Particle, NodeParticle
+from .event_classes import Event, Particle, ParticleTable, NodeParticle
+from .compression import open_input
 
 
 log = get_logger(__name__)
@@ -45,10 +46,11 @@ class CMSSWParticleListParser(object):
         log.info("Opening event file %s", self.filename)
         event = Event(source=self.filename)
 
-        with open(self.filename, 'r') as f:
+        with open_input(self.filename) as f:
             # Indicates whether to parse current line as a particle or not
             particle_line = False
             node_particles = []
+            table = ParticleTable()
 
             for line in f:
                 line = line.strip()
@@ -66,16 +68,39 @@ class CMSSWParticleListParser(object):
                     # be a number. If it isn't, we've finished the particle
                     # record for the event.
                     if line.split()[0].isdigit():
-                        np = self.parse_particle_line(line)
+                        np = self.parse_particle_line(line, table)
                         node_particles.append(np)
                     else:
                         particle_line = False
                         break
 
+        table.compute_kinematics()
         return event, node_particles
 
-    def parse_particle_line(self, line):
-        """Parse line representing a particle, return a NodeParticle."""
+    def iter_events(self, event_nums=None):
+        """Parse several events from the input file.
+
+        ParticleListDrawer output only ever holds one event, number 0.
+
+        Parameters
+        ----------
+        event_nums : iterable[int], optional
+            Numbers of events to parse. If None, all events are parsed.
+
+        Yields
+        ------
+        Event, list[NodeParticle]
+            Event object containing info about the event, and collection of
+            NodeParticles to be assigned to a graph.
+        """
+        if event_nums is None or 0 in event_nums:
+            yield self.parse()
+
+    def parse_particle_line(self, line, table=None):
+        """Parse line representing a particle, return a NodeParticle.
+
+        The particle data are stored in `table` (a ParticleTable) if given.
+        """
 
         log.debug(line)
 
@@ -100,7 +125,8 @@ class CMSSWParticleListParser(object):
         four_mom_fields = ['px', 'py', 'pz', 'm']
         four_mom_contents = map_columns_to_dict(four_mom_fields, contents_dict['4mom'])
 
-        p = Particle(barcode=int(contents_dict['idx']),
+        p = Particle(table=table,
+                     barcode=int(contents_dict['idx']),
                      pdgid=int(pdgid),
                      status=int(contents_dict['status']),
                      px=float(four_mom_contents['px']),
@@ -0,0 +1,315 @@
+"""Open input files that may be compressed with gzip, bzip2, xz or zstd.
+
+The compression is recognised from the first few bytes of the file, and the
+file is decompressed on the fly as it is read, so it never has to be
+decompressed to disk first. Byte offsets (e.g. in an EventIndex) always refer
+to positions in the *uncompressed* data.
+
+Jumping to an offset in compressed data normally means decompressing
+everything before it. For gzip files, the reader notes *checkpoints* as it goes:
+positions where it could restart decompression from scratch, at least
+``CHECKPOINT_SPACING`` bytes of uncompressed data apart. These are stored in the
+event index, so later reads can start from the nearest checkpoint before an event.
+
+zlib cannot restart in the middle of a compressed stream, so checkpoints can only
+be placed at the start of each gzip *member*. Files made by ``bgzip``
+(or by concatenating several gzip files) are made of many small members,
+and get a checkpoint every few MB. A file made by plain ``gzip`` is a single member,
+so has to be decompressed from the start each time.
+
+xz needs the ``lzma`` module (included with python 3), and zstd needs the
+``zstandard`` package.
+"""
+
+
+from __future__ import absolute_import
+import io
+import os
+import zlib
+import bz2
+from pythiaplotter.utils.logging_config import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Magic bytes at the start of each compressed format
+COMPRESSION_MAGIC = [
+    ("gzip", b"\x1f\x8b"),
+    ("bzip2", b"BZh"),
+    ("xz", b"\xfd7zXZ\x00"),
+    ("zstd", b"\x28\xb5\x2f\xfd")
+]
+
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".bz2": "bzip2", ".xz": "xz", ".zst": "zstd"}
+
+# Minimum number of uncompressed bytes between gzip checkpoints
+CHECKPOINT_SPACING = 4 << 20
+
+# Number of compressed bytes read from the file at once
+CHUNK_SIZE = 1 << 16
+
+
+def get_compression(filename):
+    """Get the compression format of a file, from its first few bytes.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    str
+        One of "gzip", "bzip2", "xz", "zstd", or None if the file is not compressed.
+    """
+    with open(filename, "rb") as f:
+        start = f.read(max(len(magic) for _, magic in COMPRESSION_MAGIC))
+    for name, magic in COMPRESSION_MAGIC:
+        if start.startswith(magic):
+            return name
+    return None
+
+
+def strip_compression_extension(filename):
+    """Remove any compression extension from a filename, e.g. "event.hepmc.gz" -> "event.hepmc"
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    str
+    """
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() in COMPRESSION_EXTENSIONS:
+        return stem
+    return filename
+
+
+class GzipReader(io.RawIOBase):
+    """Seekable reader for gzip files, which notes checkpoints to restart decompression from.
+
+    Handles files with any number of gzip members, which are read one after the other.
+    """
+
+    def __init__(self, filename, checkpoints=None, checkpoint_spacing=None):
+        """
+        Parameters
+        ----------
+        filename : str
+            Input filename.
+        checkpoints : list[(int, int)], optional
+            Known checkpoints, e.g. from a previous reader of the same file.
+        checkpoint_spacing : int, optional
+            Minimum number of uncompressed bytes between checkpoints.
+            Defaults to CHECKPOINT_SPACING.
+
+        Attributes
+        ----------
+        checkpoints : list[(int, int)]
+            Offsets of the start of gzip members in the uncompressed data,
+            and in the file, in order. The first is always (0, 0).
+        """
+        super(GzipReader, self).__init__()
+        self.filename = filename
+        self.checkpoints = [tuple(cp) for cp in checkpoints] if checkpoints else [(0, 0)]
+        self.checkpoint_spacing = checkpoint_spacing or CHECKPOINT_SPACING
+        self._file = open(filename, "rb")
+        self._start_member(0, 0)
+
+    def __repr__(self):
+        return "{0}(filename={1!r}, num_checkpoints={2})".format(self.__class__.__name__,
+                                                                 self.filename,
+                                                                 len(self.checkpoints))
+
+    def _start_member(self, position, file_offset, data=b""):
+        """Start decompressing a new gzip member.
+
+        Parameters
+        ----------
+        position : int
+            Offset of the start of the member in the uncompressed data.
+        file_offset : int
+            Offset of the start of the member in the file.
+        data : bytes, optional
+            Bytes already read from the file at `file_offset`.
+        """
+        if not data:
+            self._file.seek(file_offset)
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._input = data  # bytes read from the file but not yet decompressed
+        self._position = position
+        if position >= self.checkpoints[-1][0] + self.checkpoint_spacing:
+            self.checkpoints.append((position, file_offset))
+
+    def _decompress(self, size):
+        """Decompress up to `size` bytes, or b"" at the end of the data"""
+        while True:
+            if self._decompressor.eof:
+                data = self._input
+                if len(data) < 2:
+                    data += self._file.read(CHUNK_SIZE)
+                # Stop at the end of the file, or at any padding after the last member
+                if not data.startswith(b"\x1f\x8b"):
+                    self._input = b""
+                    return b""
+                self._start_member(self._position, self._file.tell() - len(data), data)
+            if not self._input:
+                self._input = self._file.read(CHUNK_SIZE)
+                if not self._input:
+                    raise EOFError("Compressed file ended before the end-of-stream marker "
+                                   "was reached: %s" % self.filename)
+            out = self._decompressor.decompress(self._input, size)
+            if self._decompressor.eof:
+                self._input = self._decompressor.unused_data
+            else:
+                self._input = self._decompressor.unconsumed_tail
+            if out:
+                self._position += len(out)
+                return out
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        out = self._decompress(len(b))
+        b[:len(out)] = out
+        return len(out)
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Go to a position in the uncompressed data.
+
+        Starts from the nearest checkpoint if that is closer, and decompresses
+        the rest of the way.
+        """
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise ValueError("Cannot seek from the end of a gzip file")
+        position, file_offset = max(cp for cp in self.checkpoints if cp[0] <= offset)
+        if offset < self._position or position > self._position:
+            self._start_member(position, file_offset)
+        while self._position < offset:
+            if not self._decompress(min(offset - self._position, CHUNK_SIZE << 4)):
+                break
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super(GzipReader, self).close()
+
+
+def open_zstd(filename):
+    """Open a zstd-compressed file, using the zstandard package.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    file
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading zstd-compressed files needs the zstandard package "
+                          "(pip install zstandard)")
+    raw = zstandard.ZstdDecompressor().stream_reader(open(filename, "rb"), closefd=True)
+    return io.BufferedReader(raw)
+
+
+def open_xz(filename):
+    """Open an xz-compressed file, using the lzma module.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    file
+    """
+    try:
+        import lzma
+    except ImportError:
+        raise ImportError("Reading xz-compressed files needs the lzma module (python 3)")
+    return lzma.LZMAFile(filename, "rb")
+
+
+def open_input(filename, mode="r", offset=0, checkpoints=None):
+    """Open an input file for reading, decompressing it on the fly if necessary.
+
+    Parameters
+    ----------
+    filename : str
+        Input filename.
+    mode : {"r", "rb"}, optional
+        Read as text or bytes.
+    offset : int, optional
+        Position in the uncompressed data to start reading from.
+    checkpoints : list[(int, int)], optional
+        Checkpoints in a gzip file, from get_checkpoints(), to get to `offset` sooner.
+
+    Returns
+    -------
+    file
+    """
+    if mode not in ("r", "rb"):
+        raise ValueError("Input files can only be opened with mode 'r' or 'rb', not %r" % mode)
+
+    compression = get_compression(filename)
+    if compression is None:
+        f = open(filename, mode)
+        if offset:
+            f.seek(offset)
+        return f
+
+    log.debug("Reading %s-compressed file %s", compression, filename)
+    if compression == "gzip":
+        f = io.BufferedReader(GzipReader(filename, checkpoints), buffer_size=CHUNK_SIZE)
+        if offset:
+            f.seek(offset)
+    else:
+        if compression == "bzip2":
+            f = bz2.BZ2File(filename, "rb")
+        elif compression == "xz":
+            f = open_xz(filename)
+        else:
+            f = open_zstd(filename)
+        # These can only be read from the start, so skip through to the offset
+        while offset > 0:
+            skipped = len(f.read(min(offset, CHUNK_SIZE << 4)))
+            if not skipped:
+                break
+            offset -= skipped
+    if mode == "r":
+        f = io.TextIOWrapper(f)
+    return f
+
+
+def get_checkpoints(f):
+    """Get the checkpoints noted so far while reading a file from open_input().
+
+    Parameters
+    ----------
+    f : file
+
+    Returns
+    -------
+    list[(int, int)]
+        Checkpoints in a gzip file, or [] for any other file.
+    """
+    raw = getattr(f, "buffer", f)  # text files
+    raw = getattr(raw, "raw", raw)
+    if isinstance(raw, GzipReader):
+        return list(raw.checkpoints)
+    return []
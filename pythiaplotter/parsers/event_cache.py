@@ -0,0 +1,325 @@
+"""Cache parsed events on disk, so plotting the same event again skips parsing the input file.
+
+Each event is stored as one cache entry, keyed by the input file path,
+its size & modification time, the parser, and the event number,
+so entries are never used once the input file changes.
+
+Entries are stored in a compact binary layout: a short header, a JSON
+description of the event and of the arrays that follow, then the raw bytes of
+each column of the event's ParticleTable and of the particle relationships
+(parent barcodes for NodeParticles, vertex barcodes for EdgeParticles).
+Loading an entry is then mostly copying bytes straight into the table's arrays.
+
+The cache lives in ``$XDG_CACHE_HOME/pythiaplotter/events`` (default
+``~/.cache/pythiaplotter/events``), and the least recently used events are
+removed once it grows over ``EVENT_CACHE_SIZE`` bytes.
+"""
+
+
+from __future__ import absolute_import
+import os
+import sys
+import json
+import struct
+from array import array
+from pythiaplotter.utils.logging_config import get_logger
+from pythiaplotter.utils.cache import DiskCache, make_key
+from .event_classes import Event, Particle, ParticleTable, NodeParticle, EdgeParticle
+
+
+log = get_logger(__name__)
+
+
+# Bump this whenever the entry layout changes, to invalidate old entries
+CACHE_VERSION = 1
+
+CACHE_MAGIC = b"PPEV"
+
+# Magic bytes, version, and length of the JSON description
+HEADER = struct.Struct("<4sII")
+
+# Maximum total size of all the cached events, in bytes
+EVENT_CACHE_SIZE = 200 * 1024 * 1024
+
+
+def encode_event(event, particles):
+    """Convert a parsed event into bytes.
+
+    Parameters
+    ----------
+    event : Event
+    particles : list[NodeParticle] or list[EdgeParticle]
+        Particles from the parser, all stored in the same ParticleTable.
+
+    Returns
+    -------
+    bytes
+
+    Raises
+    ------
+    ValueError, TypeError
+        If the event cannot be stored, e.g. the event has attributes that
+        can't be converted to JSON, or the particles have extra attributes.
+    """
+    particle_class = particles[0].__class__ if particles else NodeParticle
+    if particle_class not in (NodeParticle, EdgeParticle):
+        raise TypeError("Cannot store particles of type %s" % particle_class.__name__)
+    representation = "EDGE" if particle_class is EdgeParticle else "NODE"
+    table = particles[0].particle.table if particles else ParticleTable()
+    for p in particles:
+        if p.__class__ is not particle_class:
+            raise TypeError("Cannot store a mix of particle types")
+        if p.particle.table is not table:
+            raise ValueError("Cannot store particles from more than one ParticleTable")
+        if p.particle._extra:
+            raise ValueError("Cannot store particles with extra attributes")
+    table.compute_kinematics()
+
+    arrays = [(name, getattr(table, name)) for name in table.column_names]
+    rows = array("l")
+    try:
+        if representation == "EDGE":
+            vtx_in, vtx_out = array("l"), array("l")
+            for edge in particles:
+                rows.append(edge.particle.row)
+                vtx_in.append(edge.vtx_in_barcode)
+                vtx_out.append(edge.vtx_out_barcode)
+            arrays.extend([("rows", rows), ("vtx_in", vtx_in), ("vtx_out", vtx_out)])
+        else:
+            num_parents, parents = array("l"), array("l")
+            for node in particles:
+                rows.append(node.particle.row)
+                num_parents.append(len(node.parent_barcodes))
+                parents.extend(node.parent_barcodes)
+            arrays.extend([("rows", rows), ("num_parents", num_parents), ("parents", parents)])
+    except OverflowError as err:
+        raise ValueError(str(err))
+
+    description = {
+        "event": {k: v for k, v in event.__dict__.items() if k != "graph"},
+        "representation": representation,
+        "byteorder": sys.byteorder,
+        "arrays": [[name, values.typecode, values.itemsize, len(values)]
+                   for name, values in arrays]
+    }
+    description = json.dumps(description).encode("utf-8")
+    data = [HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(description)), description]
+    data.extend(_array_to_bytes(values) for _, values in arrays)
+    return b"".join(data)
+
+
+def decode_event(data):
+    """Convert bytes from encode_event() back into an event.
+
+    Parameters
+    ----------
+    data : bytes
+
+    Returns
+    -------
+    Event
+    list[NodeParticle] or list[EdgeParticle]
+
+    Raises
+    ------
+    ValueError
+        If `data` is not a valid event for this version of PythiaPlotter & this machine.
+    """
+    try:
+        magic, version, description_size = HEADER.unpack_from(data)
+    except struct.error as err:
+        raise ValueError(str(err))
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        raise ValueError("Not a cached event, or from a different version")
+    start = HEADER.size + description_size
+    description = json.loads(data[HEADER.size:start].decode("utf-8"))
+    if description["byteorder"] != sys.byteorder:
+        raise ValueError("Cached event is from a machine with a different byte order")
+
+    arrays = {}
+    for name, typecode, itemsize, length in description["arrays"]:
+        values = array(typecode)
+        if values.itemsize != itemsize:
+            raise ValueError("Cached event is from a machine with different array sizes")
+        end = start + itemsize * length
+        if end > len(data):
+            raise ValueError("Cached event is truncated")
+        _extend_from_bytes(values, data[start:end])
+        arrays[name] = values
+        start = end
+
+    table = ParticleTable()
+    table.extend({name: arrays[name] for name in table.column_names})
+    from_row = Particle.from_row
+    rows = arrays["rows"]
+    if description["representation"] == "EDGE":
+        particles = [EdgeParticle(from_row(table, row), v_in, v_out)
+                     for row, v_in, v_out in zip(rows, arrays["vtx_in"], arrays["vtx_out"])]
+    else:
+        particles = []
+        parents = arrays["parents"].tolist()
+        end = 0
+        for row, num_parents in zip(rows, arrays["num_parents"]):
+            start, end = end, end + num_parents
+            particles.append(NodeParticle(from_row(table, row), parents[start:end]))
+
+    return Event(**description["event"]), particles
+
+
+def _array_to_bytes(values):
+    if hasattr(values, "tobytes"):
+        return values.tobytes()
+    return values.tostring()  # python 2
+
+
+def _extend_from_bytes(values, data):
+    if hasattr(values, "frombytes"):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)  # python 2
+
+
+class EventCache(DiskCache):
+    """Persistent cache of parsed (Event, particles) pairs."""
+
+    extension = ".ppev"
+
+    def __init__(self, max_size=EVENT_CACHE_SIZE, directory=None):
+        """
+        Parameters
+        ----------
+        max_size : int, optional
+            Maximum total size of all the cached events, in bytes.
+        directory : str, optional
+            Top cache directory. Defaults to get_cache_dir()
+        """
+        super(EventCache, self).__init__("events", max_size=max_size, directory=directory)
+
+    def encode(self, value):
+        return encode_event(*value)
+
+    def decode(self, data):
+        return decode_event(data)
+
+
+class CachedParser(object):
+    """Wrap a parser, so that parsed events are taken from an EventCache if possible,
+    and newly parsed events are added to it.
+
+    Has the same parse() & iter_events() methods as the parser it wraps.
+    Any other attributes are those of the wrapped parser.
+    """
+
+    def __init__(self, parser, cache=None):
+        """
+        Parameters
+        ----------
+        parser : object
+            Parser for an input file, with ``filename`` and
+            (optionally) ``event_num`` attributes.
+        cache : EventCache, optional
+            Cache to use. Defaults to an EventCache in the default location.
+        """
+        self.parser = parser
+        self.cache = cache or EventCache()
+
+    def __repr__(self):
+        return "{0}(parser={1!r}, cache={2!r})".format(self.__class__.__name__,
+                                                       self.parser, self.cache)
+
+    def __getattr__(self, name):
+        # Only called for attributes not set in __init__
+        if name == "parser":
+            raise AttributeError(name)
+        return getattr(self.parser, name)
+
+    @property
+    def event_num(self):
+        """Event number that parse() gets, from the wrapped parser"""
+        return getattr(self.parser, "event_num", 0)
+
+    @event_num.setter
+    def event_num(self, value):
+        self.parser.event_num = value
+
+    def make_key(self, event_num):
+        """Make the cache key for an event in the input file.
+
+        Returns None if the input file cannot be found, e.g. it has been removed.
+        """
+        try:
+            st = os.stat(self.parser.filename)
+        except OSError:
+            return None
+        return make_key(str(CACHE_VERSION), os.path.abspath(self.parser.filename),
+                        str(st.st_size), repr(st.st_mtime),
+                        self.parser.__class__.__name__, str(event_num))
+
+    def get_event(self, event_num):
+        """Get an event from the cache, or None if it isn't there."""
+        key = self.make_key(event_num)
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            log.debug("Using cached event %d from %s", event_num, self.cache.directory)
+        return cached
+
+    def set_event(self, event_num, event, particles):
+        """Store an event in the cache."""
+        key = self.make_key(event_num)
+        if key is not None:
+            self.cache.set(key, (event, particles))
+
+    def parse(self):
+        """Get the event requested from the parser, from the cache if possible.
+
+        Returns
+        -------
+        Event
+        list[NodeParticle] or list[EdgeParticle]
+        """
+        event_num = self.event_num
+        cached = self.get_event(event_num)
+        if cached is not None:
+            return cached
+        event, particles = self.parser.parse()
+        self.set_event(event_num, event, particles)
+        return event, particles
+
+    def iter_events(self, event_nums=None):
+        """Get several events, taking those in the cache from there,
+        and parsing the rest in a single pass over the input file.
+
+        Cached events are yielded first, so the events may not be in file order.
+
+        Parameters
+        ----------
+        event_nums : iterable[int], optional
+            Event numbers to parse. If None, all events in the file are parsed,
+            unless the parser has an event index, in which case only those not
+            in the cache are parsed.
+
+        Yields
+        ------
+        Event, list[NodeParticle] or list[EdgeParticle]
+        """
+        index = getattr(self.parser, "index", None)
+        if event_nums is None and index:
+            event_nums = index.keys()
+
+        if event_nums is not None:
+            missing = []
+            for event_num in event_nums:
+                cached = self.get_event(event_num)
+                if cached is None:
+                    missing.append(event_num)
+                else:
+                    yield cached
+            if not missing:
+                return
+            event_nums = missing
+
+        for event, particles in self.parser.iter_events(event_nums):
+            self.set_event(event.event_num, event, particles)
+            yield event, particles
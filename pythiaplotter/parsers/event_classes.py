@@ -3,9 +3,10 @@
 
 from __future__ import absolute_import, division
 import math
-import networkx as nx
+from array import array
+from copy import deepcopy
 from pythiaplotter.utils.logging_config import get_logger
-from pythiaplotter.utils.common import generate_repr_str, get_terminal_width
+from pythiaplotter.utils.common import generate_repr_str, get_terminal_width, get_numpy
 from pythiaplotter.utils.pdgid_converter import pdgid_to_string
 from functools import total_ordering
 
@@ -35,6 +36,7 @@ class Event(object):
 
     def print_stats(self):
         """Print some basic statistics about the event"""
+        import networkx as nx  # slow to import, and only needed here
         log.info("Some statistics:")
         log.info("----------------")
         log.info(nx.info(self.graph))
@@ -51,13 +53,202 @@ class Event(object):
             log.info("{:2d} {}".format(i, "#"*h))
 
 
+class ParticleTable(object):
+    """Struct-of-arrays store for all the particles in an event.
+
+    Each particle property is held in its own compact ``array.array`` column,
+    with one row per particle, rather than in a ``__dict__`` per Particle object.
+    Particle objects are lightweight views onto a row of the table.
+
+    pt, eta, phi for particles added with px, py, pz are not calculated
+    straight away, but for all particles at once by compute_kinematics().
+    """
+
+    # (column name, array typecode)
+    int_columns = [("barcode", "l"), ("pdgid", "l"), ("status", "l"), ("flags", "B")]
+    float_columns = [("px", "d"), ("py", "d"), ("pz", "d"), ("energy", "d"), ("mass", "d"),
+                     ("pt", "d"), ("eta", "d"), ("phi", "d")]
+    columns = int_columns + float_columns
+    column_names = [name for name, _ in columns]
+    column_name_set = frozenset(column_names)
+
+    # Bits in the flags column
+    INITIAL_STATE = 1
+    FINAL_STATE = 2
+    KINEMATICS_PENDING = 4  # pt, eta, phi still need calculating from px, py, pz
+
+    def __init__(self):
+        for name, typecode in self.columns:
+            setattr(self, name, array(typecode))
+        self._float_arrays = [(name, getattr(self, name)) for name, _ in self.float_columns]
+        self._pending = False  # True if any row may have KINEMATICS_PENDING set
+
+    def __len__(self):
+        return len(self.barcode)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.particle(row)
+
+    def __repr__(self):
+        return "{0}(num_particles={1})".format(self.__class__.__name__, len(self))
+
+    def append(self, barcode, pdgid=0, status=0, flags=0, **kwargs):
+        """Add a row to the table.
+
+        Parameters
+        ----------
+        barcode, pdgid, status, flags : int
+        kwargs : dict
+            Values for float columns, any not specified are set to 0.
+
+        Returns
+        -------
+        int
+            Index of the new row.
+        """
+        self.barcode.append(int(barcode))
+        self.pdgid.append(int(pdgid))
+        self.status.append(int(status))
+        self.flags.append(flags)
+        if flags & self.KINEMATICS_PENDING:
+            self._pending = True
+        get = kwargs.get
+        for name, column in self._float_arrays:
+            column.append(float(get(name, 0.0)))
+        return len(self.barcode) - 1
+
+    def extend(self, columns):
+        """Add many rows to the table at once.
+
+        Parameters
+        ----------
+        columns : dict
+            Values for each column, as sequences of equal length, e.g. numpy arrays.
+            Must include barcode, any other columns not specified are set to 0.
+            Without NumPy, values must already be of the column type (int or float).
+
+        Returns
+        -------
+        int
+            Index of the first new row.
+        """
+        np = get_numpy()
+        start = len(self)
+        num_rows = len(columns["barcode"])
+        for name, typecode in self.columns:
+            column = getattr(self, name)
+            values = columns.get(name)
+            if values is None:
+                column.extend(array(typecode, [0]) * num_rows)
+            elif np is not None:
+                # copy the raw bytes, rather than converting each value to a python object
+                data = np.ascontiguousarray(values, dtype=typecode).tobytes()
+                if hasattr(column, "frombytes"):
+                    column.frombytes(data)
+                else:
+                    column.fromstring(data)  # python 2
+            else:
+                column.extend(values)
+        if any(flags & self.KINEMATICS_PENDING for flags in self.flags[start:]):
+            self._pending = True
+        return start
+
+    def copy_row(self, row):
+        """Append a copy of a row to the table, and return the index of the new row."""
+        for name in self.column_names:
+            column = getattr(self, name)
+            column.append(column[row])
+        if self.flags[row] & self.KINEMATICS_PENDING:
+            self._pending = True
+        return len(self.barcode) - 1
+
+    def compute_kinematics(self):
+        """Calculate pt, eta, phi from px, py, pz for all particles that need it,
+        in one batch."""
+        if not self._pending:
+            return
+        self._pending = False
+        pending = self.KINEMATICS_PENDING
+        np = get_numpy()
+        if np is not None:
+            flags = np.frombuffer(self.flags, dtype=np.uint8)
+            rows = np.flatnonzero(flags & pending)
+            columns = [np.frombuffer(getattr(self, name), dtype=np.float64)
+                       for name in ("px", "py", "pz", "pt", "eta", "phi")]
+            px, py, pz, pt, eta, phi = columns
+            pt[rows], eta[rows], phi[rows] = convert_px_py_pz_batch(px[rows], py[rows], pz[rows])
+            flags[rows] &= ~np.uint8(pending)
+            # release the buffers, otherwise the arrays cannot grow
+            del flags, columns, px, py, pz, pt, eta, phi
+        else:
+            rows = [row for row, flags in enumerate(self.flags) if flags & pending]
+            results = convert_px_py_pz_batch([self.px[row] for row in rows],
+                                             [self.py[row] for row in rows],
+                                             [self.pz[row] for row in rows])
+            for row, pt, eta, phi in zip(rows, *results):
+                self.pt[row], self.eta[row], self.phi[row] = pt, eta, phi
+                self.flags[row] &= ~pending
+
+    def particle(self, row):
+        """Get a Particle view onto a row of the table."""
+        return Particle.from_row(self, row)
+
+
+def _column_property(name):
+    """Make a property that gets/sets a column value of the particle's table row."""
+    def fget(self):
+        return getattr(self._table, name)[self._row]
+
+    def fset(self, value):
+        getattr(self._table, name)[self._row] = value
+
+    return property(fget, fset)
+
+
+def _kinematic_property(name):
+    """Make a property for pt/eta/phi, which may need calculating first."""
+    def fget(self):
+        table = self._table
+        if table.flags[self._row] & ParticleTable.KINEMATICS_PENDING:
+            table.compute_kinematics()
+        return getattr(table, name)[self._row]
+
+    def fset(self, value):
+        table = self._table
+        if table.flags[self._row] & ParticleTable.KINEMATICS_PENDING:
+            table.compute_kinematics()  # so the value isn't overwritten later
+        getattr(table, name)[self._row] = value
+
+    return property(fget, fset)
+
+
+def _flag_property(bit):
+    """Make a bool property for a bit in the particle's flags column."""
+    def fget(self):
+        return bool(self._table.flags[self._row] & bit)
+
+    def fset(self, value):
+        if value:
+            self._table.flags[self._row] |= bit
+        else:
+            self._table.flags[self._row] &= ~bit
+
+    return property(fget, fset)
+
+
 @total_ordering
 class Particle(object):
 
+    __slots__ = ("_table", "_row", "_extra")
+
     def __init__(self, barcode, pdgid=0, status=0,
-                 initial_state=False, final_state=False, **kwargs):
+                 initial_state=False, final_state=False, table=None, **kwargs):
         """Hold information about a particle in an event.
 
+        The particle data are stored in a row of a ParticleTable,
+        shared with the other particles in the event.
+
         Parameters
         ----------
         barcode : int
@@ -70,6 +261,8 @@ class Particle(object):
             Flag initial state particle (no parents)
         final_state : bool, optional
             Flag final state particle (no children)
+        table : ParticleTable, optional
+            Table to store the particle in. If None, a new table is made.
         kwargs : dict
             Store any other particle attributes, such as px/py/pz/pt/energy/mass
 
@@ -85,24 +278,111 @@ class Particle(object):
         energy : float
         mass : float
         """
-        self.barcode = int(barcode)
-        self.pdgid = int(pdgid)
-        self.name = pdgid_to_string(self.pdgid)
-        self.status = int(status)
-        self.final_state = final_state
-        self.initial_state = initial_state
-        # some default fields
-        for k in ['pt', 'eta', 'phi', 'px', 'py', 'pz', 'energy', 'mass']:
-            self.__dict__[k] = 0.0
-        self.__dict__.update(**kwargs)
-        if all([k in kwargs for k in ['px', 'py', 'pz']]):
-            pt, eta, phi = convert_px_py_pz(float(self.px), float(self.py), float(self.pz))
-            self.__dict__['pt'] = pt
-            self.__dict__['eta'] = eta
-            self.__dict__['phi'] = phi
+        if table is None:
+            table = ParticleTable()
+        extra = None
+        if not ParticleTable.column_name_set.issuperset(kwargs):
+            extra = {k: kwargs.pop(k) for k in list(kwargs)
+                     if k not in ParticleTable.column_name_set}
+        flags = ((ParticleTable.INITIAL_STATE if initial_state else 0)
+                 | (ParticleTable.FINAL_STATE if final_state else 0))
+        if 'px' in kwargs and 'py' in kwargs and 'pz' in kwargs:
+            flags |= ParticleTable.KINEMATICS_PENDING
+        kwargs.pop('flags', None)
+        object.__setattr__(self, "_table", table)
+        object.__setattr__(self, "_row", table.append(barcode, pdgid, status, flags, **kwargs))
+        object.__setattr__(self, "_extra", extra)
+
+    @classmethod
+    def from_row(cls, table, row):
+        """Make a Particle view onto an existing row of a ParticleTable."""
+        p = cls.__new__(cls)
+        object.__setattr__(p, "_table", table)
+        object.__setattr__(p, "_row", row)
+        object.__setattr__(p, "_extra", None)
+        return p
+
+    barcode = _column_property("barcode")
+    pdgid = _column_property("pdgid")
+    status = _column_property("status")
+    px = _column_property("px")
+    py = _column_property("py")
+    pz = _column_property("pz")
+    energy = _column_property("energy")
+    mass = _column_property("mass")
+    pt = _kinematic_property("pt")
+    eta = _kinematic_property("eta")
+    phi = _kinematic_property("phi")
+    initial_state = _flag_property(ParticleTable.INITIAL_STATE)
+    final_state = _flag_property(ParticleTable.FINAL_STATE)
+
+    @property
+    def name(self):
+        return pdgid_to_string(self.pdgid)
+
+    @property
+    def table(self):
+        """ParticleTable holding this particle's data"""
+        return self._table
+
+    @property
+    def row(self):
+        """Index of this particle's row in its table"""
+        return self._row
+
+    def __getattr__(self, name):
+        # Only called for attributes not stored in the table
+        if not name.startswith("_") and self._extra and name in self._extra:
+            return self._extra[name]
+        raise AttributeError("%r object has no attribute %r" % (self.__class__.__name__, name))
+
+    def __setattr__(self, name, value):
+        if hasattr(self.__class__, name):
+            object.__setattr__(self, name, value)
+        else:
+            if self._extra is None:
+                object.__setattr__(self, "_extra", {})
+            self._extra[name] = value
+
+    def __getstate__(self):
+        return self._table, self._row, self._extra
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.__slots__, state):
+            object.__setattr__(self, attr, value)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        # Copy the whole table once, and point all copied views at it
+        p = self.from_row(deepcopy(self._table, memo), self._row)
+        object.__setattr__(p, "_extra", deepcopy(self._extra, memo))
+        return p
+
+    def copy(self):
+        """Make an independent copy of this particle, in a new row of the same table."""
+        p = self.from_row(self._table, self._table.copy_row(self._row))
+        if self._extra:
+            object.__setattr__(p, "_extra", dict(self._extra))
+        return p
+
+    def as_dict(self):
+        """Get all particle attributes as a dict"""
+        if self._table.flags[self._row] & ParticleTable.KINEMATICS_PENDING:
+            self._table.compute_kinematics()
+        d = {name: getattr(self._table, name)[self._row] for name in ParticleTable.column_names}
+        del d['flags']
+        d['initial_state'] = self.initial_state
+        d['final_state'] = self.final_state
+        d['name'] = self.name
+        if self._extra:
+            d.update(self._extra)
+        return d
 
     def __repr__(self):
-        return generate_repr_str(self)
+        args_str = ["%s=%r" % (k, v) for k, v in sorted(self.as_dict().items())]
+        return "%s(%s)" % (self.__class__.__name__, ", ".join(args_str))
 
     def __str__(self):
         # Properties to print out - we don't want all of them!
@@ -160,6 +440,42 @@ def convert_px_py_pz(px, py, pz):
     return pt, eta, phi
 
 
+def convert_px_py_pz_batch(px, py, pz):
+    """Convert arrays of cartesian momentum components into arrays of :math:`p_T, \\eta, \\phi`
+
+    Batch version of :func:`convert_px_py_pz`, with the same conventions,
+    e.g. :math:`\\eta = \\mathrm{sign}(p_z) * \\infty` if :math:`p_T = 0`.
+    Uses NumPy if it is available.
+
+    Parameters
+    ----------
+    px, py, pz : sequence[float]
+        Cartesian components of momentum along x, y, z axis, for each particle
+
+    Returns
+    -------
+    pt, eta, phi : numpy.ndarray or array.array
+        Transverse momentum, pseudorapidity, and azimuthal angle (in radians), for each particle.
+    """
+    np = get_numpy()
+    if np is None:
+        results = [array('d'), array('d'), array('d')]
+        for vals in map(convert_px_py_pz, px, py, pz):
+            for column, val in zip(results, vals):
+                column.append(val)
+        return tuple(results)
+
+    px = np.asarray(px, dtype=np.float64)
+    py = np.asarray(py, dtype=np.float64)
+    pz = np.asarray(pz, dtype=np.float64)
+    pt = np.sqrt(px * px + py * py)
+    nonzero = pt != 0
+    safe_pt = np.where(nonzero, pt, 1.)
+    eta = np.where(nonzero, np.arcsinh(pz / safe_pt), np.copysign(np.inf, pz))
+    phi = np.where(nonzero, np.arcsin(py / safe_pt), 0.)
+    return pt, eta, phi
+
+
 class NodeParticle(object):
 
     def __init__(self, particle, parent_barcodes):
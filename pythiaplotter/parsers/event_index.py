@@ -0,0 +1,281 @@
+"""Build, store & load byte-offset indices of events in text input files.
+
+An index maps an event key (e.g. the event number on a HepMC ``E`` line)
+onto the byte offset in the file at which that event starts, so that a parser
+can ``seek()`` straight to the event instead of reading every line before it.
+
+Indices are built in a single pass over the raw bytes of the file,
+and are stored in ``$XDG_CACHE_HOME/pythiaplotter/indices`` (default
+``~/.cache/pythiaplotter/indices``), keyed by the path of the input file.
+They are rebuilt automatically whenever the size or modification time
+of the input file changes.
+
+Compressed input files are indexed by their offsets in the uncompressed data.
+For gzip files, the index also stores checkpoints from which decompression
+can restart (see :mod:`pythiaplotter.parsers.compression`), so that getting to
+an event does not mean decompressing the whole file before it.
+"""
+
+
+from __future__ import absolute_import
+import os
+from pythiaplotter.utils.logging_config import get_logger
+from pythiaplotter.utils.cache import DiskCache, make_key
+from .compression import open_input, get_checkpoints
+
+
+log = get_logger(__name__)
+
+
+# Bump this whenever the stored index layout changes, to invalidate old indices
+INDEX_VERSION = 3
+
+# Maximum total size of all the stored indices, in bytes
+INDEX_CACHE_SIZE = 50 * 1024 * 1024
+
+# Number of bytes read per chunk when scanning a file
+CHUNK_SIZE = 1 << 20
+
+
+def scan_marker_offsets(f, marker, chunk_size=CHUNK_SIZE, line_start=True):
+    """Find all lines in a file that start with (or contain) `marker`.
+
+    The file is read in large chunks, and searched using ``bytes.find``,
+    so no per-line objects are created for lines that don't match.
+
+    Parameters
+    ----------
+    f : file
+        File object opened in binary mode, positioned at the start of the file.
+    marker : bytes
+        Byte string that marks the start of a line of interest, e.g. ``b"E "``
+    chunk_size : int, optional
+        Number of bytes to read in at once.
+    line_start : bool, optional
+        If True, `marker` must be at the start of a line. Otherwise it can be
+        anywhere, e.g. after indentation.
+
+    Yields
+    ------
+    int, bytes
+        Byte offset of the start of the marker, and the rest of the line from
+        the marker onwards (without the trailing newline).
+    """
+    # Pretend the file is preceded by a newline, so a marker on the first line is found
+    pattern = b"\n" + marker if line_start else marker
+    skip = 1 if line_start else 0  # number of bytes in pattern before the marker
+    buf = b"\n" + f.read(chunk_size)
+    base = -1  # file offset of buf[0]
+    at_eof = False
+    while True:
+        pos = 0
+        keep = None  # index in buf from which we must keep bytes for the next chunk
+        while True:
+            hit = buf.find(pattern, pos)
+            if hit < 0:
+                break
+            start = hit + skip
+            eol = buf.find(b"\n", start)
+            if eol < 0:
+                if at_eof:
+                    yield base + start, buf[start:].rstrip(b"\r")
+                else:
+                    keep = hit  # line is incomplete, need the next chunk
+                break
+            yield base + start, buf[start:eol].rstrip(b"\r")
+            pos = eol if line_start else start + 1  # the newline can start the next pattern
+
+        if at_eof:
+            return
+
+        if keep is None:
+            # Keep enough of the tail that a pattern straddling chunks is still found
+            keep = max(pos, len(buf) - len(pattern) + 1)
+
+        chunk = f.read(chunk_size)
+        if not chunk:
+            at_eof = True
+        buf = buf[keep:] + chunk
+        base += keep
+
+
+class EventIndex(object):
+    """Byte-offset index of events in a text file, stored in a persistent cache."""
+
+    def __init__(self, filename, marker, key_func=None, accept_func=None, first_key=0,
+                 line_start=True, find_start=None, cache=None, persist=True):
+        """
+        Parameters
+        ----------
+        filename : str
+            Input filename to index.
+        marker : bytes
+            Byte string at the start of the first line of every event.
+        key_func : function, optional
+            Function that takes the marker line (bytes) and returns the event key,
+            or None if the line should not be indexed. If unset, events are keyed
+            by their position in the file, starting at `first_key`.
+        accept_func : function, optional
+            Function that takes the marker line (bytes), and returns False if it
+            is not the start of an event. Only used if `key_func` is unset.
+        first_key : int, optional
+            Key for the first event in the file, if `key_func` is unset.
+        line_start : bool, optional
+            If True, `marker` must be at the start of a line, otherwise it can be anywhere.
+        find_start : function, optional
+            Function that takes the input file (opened in binary mode), and returns
+            the byte offset that events start from, or None if there are no events.
+            Markers before it, e.g. in a file header, are ignored.
+        cache : DiskCache, optional
+            Cache to store the index in. Defaults to the ``indices`` cache
+            in the default location.
+        persist : bool, optional
+            If True, load the index from, and save it to, the cache.
+
+        Attributes
+        ----------
+        offsets : dict{int: int}
+            Maps event key to byte offset in file (in the uncompressed data).
+        checkpoints : list[(int, int)]
+            Checkpoints to restart decompression from, if the file is gzip-compressed.
+        """
+        self.filename = filename
+        self.marker = marker
+        self.key_func = key_func
+        self.accept_func = accept_func
+        self.first_key = first_key
+        self.line_start = line_start
+        self.find_start = find_start
+        self.cache = cache or DiskCache("indices", max_size=INDEX_CACHE_SIZE)
+        self.cache_key = make_key(os.path.abspath(filename), marker.decode("ascii"))
+        self.persist = persist
+        self.offsets = None
+        self.checkpoints = []
+
+    def __repr__(self):
+        return "{0}(filename={1!r}, marker={2!r}, num_events={3})".format(
+            self.__class__.__name__, self.filename, self.marker,
+            None if self.offsets is None else len(self.offsets))
+
+    def __contains__(self, key):
+        return key in self.load()
+
+    def __len__(self):
+        return len(self.load())
+
+    def get_offset(self, key):
+        """Get byte offset for event `key`, or None if there is no such event."""
+        return self.load().get(key)
+
+    def open_at(self, offset, mode="r"):
+        """Open the input file at a byte offset, e.g. from get_offset().
+
+        Parameters
+        ----------
+        offset : int
+            Offset in the (uncompressed) data.
+        mode : {"r", "rb"}, optional
+            Read as text or bytes.
+
+        Returns
+        -------
+        file
+        """
+        self.load()
+        return open_input(self.filename, mode, offset=offset, checkpoints=self.checkpoints)
+
+    def keys(self):
+        """Get all event keys, in file order."""
+        offsets = self.load()
+        return sorted(offsets, key=offsets.get)
+
+    def load(self):
+        """Load the index from the cache if up to date, otherwise (re)build it.
+
+        Returns
+        -------
+        dict{int: int}
+            Event key to byte offset mapping.
+        """
+        if self.offsets is not None:
+            return self.offsets
+
+        if self.persist:
+            self.offsets = self._read_stored()
+            if self.offsets is not None:
+                log.debug("Loaded event index %s", self.cache_key)
+                return self.offsets
+
+        self.offsets = self.build()
+
+        if self.persist:
+            self._write_stored()
+        return self.offsets
+
+    def build(self):
+        """Scan the input file to find the byte offset of each event.
+
+        Returns
+        -------
+        dict{int: int}
+            Event key to byte offset mapping.
+        """
+        log.info("Building event index for %s", self.filename)
+        offsets = {}
+        start = 0
+        if self.find_start:
+            with open_input(self.filename, "rb") as f:
+                start = self.find_start(f)
+            if start is None:
+                log.debug("No start of events found")
+                return offsets
+        with open_input(self.filename, "rb") as f:
+            for offset, line in scan_marker_offsets(f, self.marker, line_start=self.line_start):
+                if offset < start:
+                    continue
+                if self.key_func:
+                    key = self.key_func(line)
+                elif self.accept_func is None or self.accept_func(line):
+                    key = self.first_key + len(offsets)
+                else:
+                    key = None
+                if key is None:
+                    continue
+                # Only keep the first occurrence of any duplicate keys,
+                # to match a parser reading from the start of the file
+                offsets.setdefault(key, offset)
+            self.checkpoints = get_checkpoints(f)
+        log.debug("Indexed %d events", len(offsets))
+        return offsets
+
+    def _file_stamp(self):
+        """Get the properties used to tell if the input file has changed since indexing."""
+        st = os.stat(self.filename)
+        return {"size": st.st_size, "mtime": st.st_mtime}
+
+    def _read_stored(self):
+        """Read in offsets from the cache, if they are there and not stale."""
+        contents = self.cache.get(self.cache_key)
+        if contents is None:
+            return None
+
+        if (contents.get("version") != INDEX_VERSION
+                or contents.get("filename") != os.path.abspath(self.filename)
+                or contents.get("marker") != self.marker.decode("ascii")
+                or contents.get("stamp") != self._file_stamp()):
+            log.debug("Event index %s is stale", self.cache_key)
+            return None
+        self.checkpoints = [tuple(cp) for cp in contents.get("checkpoints", [])]
+        return {key: offset for key, offset in contents["offsets"]}
+
+    def _write_stored(self):
+        """Save offsets to the cache. Failure to do so is not fatal."""
+        contents = {
+            "version": INDEX_VERSION,
+            "filename": os.path.abspath(self.filename),
+            "marker": self.marker.decode("ascii"),
+            "stamp": self._file_stamp(),
+            "offsets": sorted(self.offsets.items(), key=lambda kv: kv[1]),
+            "checkpoints": self.checkpoints
+        }
+        self.cache.set(self.cache_key, contents)
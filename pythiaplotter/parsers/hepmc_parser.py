@@ -7,10 +7,15 @@ See example/example_hepmc.hepmc for example input file.
 
 
 from __future__ import absolute_import, division
+from array import array
+from contextlib import closing
 from pprint import pformat
 from pythiaplotter.utils.logging_config import get_logger
-from pythiaplotter.utils.common import map_columns_to_dict, generate_repr_str
-from .event_classes import Event, Particle, EdgeParticle
+from pythiaplotter.utils.common import map_columns_to_dict, generate_repr_str, get_numpy
+from .event_classes import Event, Particle, ParticleTable, EdgeParticle
+from .event_index import EventIndex
+from .compression import open_input
+from .mapped_input import map_input, iter_marker_offsets, find_marker, get_line, decode_lines
 
 
 log = get_logger(__name__)
@@ -24,7 +29,7 @@ class HepMCParser(object):
     return first event in file.
     """
 
-    def __init__(self, filename, event_num=0):
+    def __init__(self, filename, event_num=0, use_index=True):
         """
         Parameters
         ----------
@@ -32,13 +37,20 @@ class HepMCParser(object):
             Input filename.
         event_num : int, optional
             Index of event to parse in input file. (0 = first event)
+        use_index : bool, optional
+            If True, use a byte-offset index of events in the file to jump
+            straight to the requested event. The index is stored in the cache
+            directory, and is built on first use.
         """
         self.filename = filename
         self.event_num = event_num
         self.events = []
+        self.index = None
+        if use_index:
+            self.index = EventIndex(filename, marker=b"E ", key_func=hepmc_event_key)
 
     def __repr__(self):
-        return generate_repr_str(self, ignore=['events'])
+        return generate_repr_str(self, ignore=['events', 'index'])
 
     def __str__(self):
         return "HepMCParser:\n%s" % pformat(self.filename)
@@ -53,88 +65,139 @@ class HepMCParser(object):
         list[EdgeParticle]
             Collection of EdgeParticles to be assigned to a graph.
         """
+        log.info("Opening event file %s", self.filename)
+        offset = 0
+        if self.index:
+            offset = self.index.get_offset(self.event_num)
+            if offset is None:
+                raise IndexError("Cannot find an event with event number %d" % self.event_num)
+
+        for event, edge_particles in self.read_events([self.event_num], offset):
+            return event, edge_particles
+
+        raise IndexError("Cannot find an event with event number %d" % self.event_num)
+
+    def iter_events(self, event_nums=None):
+        """Parse several events from the input file, in a single pass.
+
+        Parameters
+        ----------
+        event_nums : iterable[int], optional
+            Event numbers to parse. If None, all events in the file are parsed.
+
+        Yields
+        ------
+        Event, list[EdgeParticle]
+            Event object containing info about the event, and collection of
+            EdgeParticles to be assigned to a graph, for each event in turn.
+        """
+        log.info("Opening event file %s", self.filename)
+        for event, edge_particles in self.read_events(event_nums):
+            yield event, edge_particles
+
+    def read_events(self, event_nums=None, offset=0):
+        """Parse the requested events from the input file, starting at a byte offset.
+
+        If possible, the file is memory-mapped, and the GenEvent lines found by
+        searching the raw bytes. Only the lines of the requested events are decoded and
+        passed to parse_lines(). Otherwise (e.g. compressed files), all lines are read.
+
+        Parameters
+        ----------
+        event_nums : iterable[int], optional
+            Event numbers to parse. If None, all events in the file are parsed.
+        offset : int, optional
+            Byte offset to start from, e.g. from the event index.
+
+        Yields
+        ------
+        Event, list[EdgeParticle]
+        """
+        buf = map_input(self.filename)
+        if buf is None:
+            with self.index.open_at(offset) if offset else open_input(self.filename) as f:
+                for event, edge_particles in self.parse_lines(f, event_nums):
+                    yield event, edge_particles
+            return
+
+        remaining = None if event_nums is None else set(event_nums)
+        with closing(buf):
+            for start in iter_marker_offsets(buf, b"E ", offset):
+                if remaining is not None:
+                    if not remaining:
+                        return
+                    event_num = hepmc_event_key(get_line(buf, start))
+                    if event_num not in remaining:
+                        continue
+                    remaining.discard(event_num)
+                lines = decode_lines(buf, start, find_marker(buf, b"E ", start + 1))
+                for event, edge_particles in self.parse_lines(lines):
+                    yield event, edge_particles
+
+    def parse_lines(self, lines, event_nums=None):
+        """Parse an iterable of lines, extracting the particles in the requested events.
+
+        Stops reading lines as soon as all the requested events have been parsed.
+
+        Parameters
+        ----------
+        lines : iterable[str]
+            Lines to parse, e.g. a file object.
+        event_nums : iterable[int], optional
+            Event numbers to parse. If None, all events are parsed.
+
+        Yields
+        ------
+        Event, list[EdgeParticle]
+            Event object containing info about the event, and collection of
+            EdgeParticles to be assigned to a graph, for each event in turn.
+        """
         # Loop through file, line-by-line.
-        # Once we reach an event line with the require line number, then
-        # we start parsing the particle/vertex lines. Otherwise we eat up all the RAM!
+        # Once we reach an event line with a requested event number, then
+        # we start collecting the particle/vertex lines. Otherwise we eat up all the RAM!
+        # These are only converted into particles once the whole event has been read.
 
-        parse_event = False
+        remaining = None if event_nums is None else set(event_nums)
         current_event = None
-        current_vertex = None
-        edge_particles = []
+        block = []  # raw vertex & particle lines of the current event
         # since HepMC can output in either MeV or GeV, but we all prefer GeV,
         # this allows conversion to GeV
         energy_multiplier = 1.
 
-        log.info("Opening event file %s", self.filename)
-        with open(self.filename) as f:
-            for line in f:
-                if line.startswith("E") or "END_EVENT_LISTING" in line:
-                    # General GenEvent information
-                    if current_event:
-                        # Do only having read in all particles in an event
-                        break
-
-                    if line.startswith("E"):
-                        current_event = self.parse_event_line(line)
-                        if current_event.event_num == self.event_num:
-                            parse_event = True
-                        else:
-                            current_event = None
-
-                if not parse_event:
-                    continue
-
-                if line.startswith("V"):
-                    # GenVertex info
-                    current_vertex = self.parse_vertex_line(line)
-                elif line.startswith("P"):
-                    # GenParticle info
-                    edge_particle = self.parse_particle_line(line)
-                    edge_particle.vtx_out_barcode = current_vertex.barcode
-                    log.debug(edge_particle.particle)
-                    # If the particle has vtx_in_barcode = 0,
-                    # then this is a 'dangling' vertex (i.e. not in the list
-                    # of vertices) and we must create one instead.
-                    # Use (10000*|particle.vtx_out_barcode|)+particle.barcode
-                    # for a unique barcode, since we won't have 10000
-                    # particles in an event.
-
-                    def _generate_unique_id(edge_particle):
-                        return 10000 * abs(edge_particle.vtx_out_barcode) + edge_particle.barcode
-
-                    # This is a final-state particle
-                    if edge_particle.vtx_in_barcode == 0:
-                        edge_particle.vtx_in_barcode = _generate_unique_id(edge_particle)
-                        edge_particle.particle.final_state = True
-
-                    # If the vtx_in_barcode = vtx_out_barcode, then we have
-                    # a cyclical edge. This is normally reserved for an
-                    # incoming proton. Need to create a new "out" node, since
-                    # other particles will be outgoing from this node
-                    if edge_particle.vtx_in_barcode == edge_particle.vtx_out_barcode:
-                        edge_particle.vtx_out_barcode = _generate_unique_id(edge_particle)
-                        edge_particle.particle.initial_state = True
-
-                    edge_particles.append(edge_particle)
-                if line.startswith("U"):
-                    # Units info
-                    energy, length = self.parse_units_line(line)
-                    if energy == "MEV":
-                        energy_multiplier = 1. / 1000
-
-        if not current_event:
-            raise IndexError("Cannot find an event with event number %d" % self.event_num)
-
-        # Correct units
-        for p in edge_particles:
-            for attr in ['px', 'py', 'pz', 'mass', 'energy', 'pt']:
-                try:
-                    val = getattr(p.particle, attr)
-                    setattr(p.particle, attr, val * energy_multiplier)
-                except AttributeError:
-                    pass
-
-        return current_event, edge_particles
+        for line in lines:
+            if line.startswith("E") or "END_EVENT_LISTING" in line:
+                # General GenEvent information
+                if current_event:
+                    # Do only having read in all particles in an event
+                    yield current_event, decode_block(block, energy_multiplier)
+                    current_event = None
+                    if remaining is not None and not remaining:
+                        return
+
+                if line.startswith("E"):
+                    event = self.parse_event_line(line)
+                    if remaining is None or event.event_num in remaining:
+                        current_event = event
+                        block = []
+                        energy_multiplier = 1.
+                        if remaining is not None:
+                            remaining.discard(event.event_num)
+
+            if not current_event:
+                continue
+
+            if line.startswith(("V", "P")):
+                # GenVertex & GenParticle info
+                block.append(line)
+            elif line.startswith("U"):
+                # Units info
+                energy, length = self.parse_units_line(line)
+                if energy == "MEV":
+                    energy_multiplier = 1. / 1000
+
+        # File ended without an END_EVENT_LISTING line
+        if current_event:
+            yield current_event, decode_block(block, energy_multiplier)
 
     def parse_event_line(self, line):
         """Parse a HepMC GenEvent line and return an Event object"""
@@ -145,37 +208,6 @@ class HepMCParser(object):
         return Event(event_num=contents["event_num"], source=self.filename,
                      signal_process_vtx_id=contents["signal_process_vtx_id"])
 
-    def parse_vertex_line(self, line):
-        """Parse a HepMC GenVertex line and return a GenVertex object"""
-        fields = ["barcode", "id", "x", "y", "z", "ctau", "n_orphan_in", "n_out"]
-        contents = map_columns_to_dict(fields, line[1:])
-        return GenVertex(barcode=abs(int(contents["barcode"])),
-                         n_orphan_in=contents["n_orphan_in"])
-
-    def parse_particle_line(self, line):
-        """Parse a HepMC GenParticle line and return an EdgeParticle object
-
-        Note that the EdgeParticle does not have vtx_out_barcode assigned here,
-        since we are parsing a line in isolation. The vtx_out_barcode is added
-        in the main pars() method. We just use a dummy value for now.
-        """
-        fields = ["barcode", "pdgid", "px", "py", "pz", "energy", "mass",
-                  "status", "pol_theta", "pol_phi", "vtx_in_barcode"]
-        contents = map_columns_to_dict(fields, line[1:])
-        p = Particle(barcode=int(contents["barcode"]),
-                     pdgid=int(contents["pdgid"]),
-                     status=contents["status"],
-                     px=float(contents["px"]),
-                     py=float(contents["py"]),
-                     pz=float(contents["pz"]),
-                     energy=float(contents["energy"]),
-                     mass=float(contents["mass"]))
-        log.debug(p)
-        ep = EdgeParticle(particle=p,
-                          vtx_in_barcode=abs(int(contents['vtx_in_barcode'])),
-                          vtx_out_barcode=0)
-        return ep
-
     def parse_units_line(self, line):
         """Parse units specification line.
 
@@ -192,20 +224,185 @@ class HepMCParser(object):
         return line.split()[1:]
 
 
-class GenVertex(object):
-    """Helper class to represent a HepMC GenVertex object.
+# Fields in a GenParticle line, after the "P", not including any flow entries
+PARTICLE_FIELDS = ["barcode", "pdgid", "px", "py", "pz", "energy", "mass",
+                   "status", "pol_theta", "pol_phi", "vtx_in_barcode"]
 
-    Vertices have a barcode that is an integer.
+# Columns decoded from a block of lines: the particle fields,
+# plus the barcode of the GenVertex line each particle is listed under
+BLOCK_COLUMNS = PARTICLE_FIELDS + ["vtx_out_barcode"]
 
-    Only exists inside this parser module since it is only used for parsing
-    file and when assigning particles to a NetworkX graph.
+INT_COLUMNS = ["barcode", "pdgid", "status", "vtx_in_barcode", "vtx_out_barcode"]
 
-    Use a namedtuple instead?
-    """
+ENERGY_COLUMNS = ["px", "py", "pz", "energy", "mass"]
 
-    def __init__(self, barcode, n_orphan_in=0):
-        self.barcode = int(barcode)
-        self.n_orphan_in = n_orphan_in
 
-    def __repr__(self):
-        return generate_repr_str(self)
+def decode_columns(lines):
+    """Convert the raw GenVertex & GenParticle lines of an event into columns, in one pass.
+
+    The fields of all the particle lines are gathered up, and converted to numbers
+    all at once, rather than line-by-line.
+
+    Parameters
+    ----------
+    lines : list[str]
+        V & P lines, in the order they appear in the file.
+
+    Returns
+    -------
+    dict
+        A column for each of BLOCK_COLUMNS, with one entry per particle.
+        Vertex barcodes are made positive.
+        Columns are numpy.ndarray if NumPy is available, otherwise array.array.
+
+    Raises
+    ------
+    ValueError
+        If a particle line is malformed.
+    """
+    num_columns = len(BLOCK_COLUMNS)
+    tokens = []
+    vertex_barcode = "0"
+    for line in lines:
+        if line.startswith("V"):
+            vertex_barcode = line.split(None, 2)[1]
+        else:
+            fields = line.split(None, num_columns)
+            if len(fields) < num_columns:
+                raise ValueError("Malformed GenParticle line: %r" % line)
+            tokens.extend(fields[1:num_columns])
+            tokens.append(vertex_barcode)
+
+    np = get_numpy()
+    if np is not None:
+        values = np.fromstring(" ".join(tokens), sep=" ")
+        if len(values) != len(tokens):
+            raise ValueError("Cannot convert all GenParticle fields to numbers")
+        values = values.reshape(-1, num_columns)
+        columns = {name: values[:, i] for i, name in enumerate(BLOCK_COLUMNS)}
+        for name in INT_COLUMNS:
+            columns[name] = columns[name].astype(np.int64)
+        for name in ["vtx_in_barcode", "vtx_out_barcode"]:
+            columns[name] = np.abs(columns[name])
+    else:
+        columns = {}
+        for i, name in enumerate(BLOCK_COLUMNS):
+            if name in INT_COLUMNS:
+                columns[name] = array("l", [abs(int(v)) if name.startswith("vtx") else int(v)
+                                            for v in tokens[i::num_columns]])
+            else:
+                columns[name] = array("d", [float(v) for v in tokens[i::num_columns]])
+    return columns
+
+
+def get_dangling_vertex_multiplier(max_barcode):
+    """Get the multiplier used to make unique barcodes for 'dangling' vertices.
+
+    Dangling vertices (e.g. the end vertex of a final-state particle) aren't listed in the
+    file, so get the barcode (multiplier * |out vertex barcode|) + particle barcode.
+    This is 10000, unless there are any larger barcodes in the event,
+    in which case the next power of 10 above them, so the new barcodes can't clash.
+
+    Parameters
+    ----------
+    max_barcode : int
+        Largest particle or vertex barcode in the event.
+
+    Returns
+    -------
+    int
+    """
+    multiplier = 10000
+    while multiplier <= max_barcode:
+        multiplier *= 10
+    return multiplier
+
+
+def decode_block(lines, energy_multiplier=1.):
+    """Convert the raw GenVertex & GenParticle lines of an event into EdgeParticles.
+
+    The lines are first converted into columns by decode_columns(), which fill a
+    ParticleTable. Vertex barcodes, initial/final-state flags and unit conversion
+    are all worked out on whole columns.
+
+    Parameters
+    ----------
+    lines : list[str]
+        V & P lines, in the order they appear in the file.
+    energy_multiplier : float, optional
+        Factor to multiply energy-dimensioned quantities by, e.g. to convert MeV to GeV.
+
+    Returns
+    -------
+    list[EdgeParticle]
+        Particles to be assigned to a graph, all sharing one ParticleTable.
+    """
+    columns = decode_columns(lines)
+    barcodes = columns["barcode"]
+    vtx_in, vtx_out = columns["vtx_in_barcode"], columns["vtx_out_barcode"]
+    if not len(barcodes):
+        return []
+    pending = ParticleTable.KINEMATICS_PENDING
+
+    # If the particle has vtx_in_barcode = 0,
+    # then this is a final-state particle with a 'dangling' vertex (i.e. not in the list
+    # of vertices) and we must create one instead.
+    # If the vtx_in_barcode = vtx_out_barcode, then we have
+    # a cyclical edge. This is normally reserved for an
+    # incoming proton. Need to create a new "out" node, since
+    # other particles will be outgoing from this node
+    np = get_numpy()
+    if np is not None:
+        multiplier = get_dangling_vertex_multiplier(max(barcodes.max(), vtx_in.max(),
+                                                        vtx_out.max()))
+        final_state = vtx_in == 0
+        initial_state = ~final_state & (vtx_in == vtx_out)
+        unique_ids = multiplier * vtx_out + barcodes
+        vtx_in = np.where(final_state, unique_ids, vtx_in)
+        vtx_out = np.where(initial_state, unique_ids, vtx_out)
+        flags = (pending + ParticleTable.FINAL_STATE * final_state
+                 + ParticleTable.INITIAL_STATE * initial_state)
+        if energy_multiplier != 1.:
+            for name in ENERGY_COLUMNS:
+                columns[name] = columns[name] * energy_multiplier
+        vtx_in, vtx_out = vtx_in.tolist(), vtx_out.tolist()
+    else:
+        multiplier = get_dangling_vertex_multiplier(max(max(barcodes), max(vtx_in),
+                                                        max(vtx_out)))
+        flags = array("B")
+        for row, (barcode, v_in, v_out) in enumerate(zip(barcodes, vtx_in, vtx_out)):
+            if v_in == 0:
+                vtx_in[row] = multiplier * v_out + barcode
+                flags.append(pending | ParticleTable.FINAL_STATE)
+            elif v_in == v_out:
+                vtx_out[row] = multiplier * v_out + barcode
+                flags.append(pending | ParticleTable.INITIAL_STATE)
+            else:
+                flags.append(pending)
+        if energy_multiplier != 1.:
+            for name in ENERGY_COLUMNS:
+                columns[name] = array("d", [v * energy_multiplier for v in columns[name]])
+
+    table = ParticleTable()
+    columns["flags"] = flags
+    start = table.extend(columns)
+    table.compute_kinematics()
+    log.debug("Decoded %d particles", len(table))
+    from_row = Particle.from_row
+    return [EdgeParticle(particle=from_row(table, row), vtx_in_barcode=v_in, vtx_out_barcode=v_out)
+            for row, v_in, v_out in zip(range(start, len(table)), vtx_in, vtx_out)]
+
+
+def hepmc_event_key(line):
+    """Get the event number from a HepMC GenEvent line, for use as an index key.
+
+    Parameters
+    ----------
+    line : bytes
+        GenEvent line
+
+    Returns
+    -------
+    int
+    """
+    return int(line.split()[1])
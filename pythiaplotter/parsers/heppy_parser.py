@@ -19,7 +19,7 @@ except ImportError:
 import ROOT  # pylint: disable=import-error
 from pythiaplotter.utils.logging_config import get_logger
 from pythiaplotter.utils.common import generate_repr_str
-from .event_classes import Event, Particle, NodeParticle
+from .event_classes import Event, Particle, ParticleTable, NodeParticle
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True  # stop stealing sys.argv
@@ -75,6 +75,25 @@ class HeppyParser(object):
             Collection of NodeParticles to be assigned to a graph.
         """
 
+        for event, node_particles in self.iter_events([self.event_num]):
+            return event, node_particles
+
+        raise IOError("Cannot get entry {}, no such entry in tree".format(self.event_num))
+
+    def iter_events(self, event_nums=None):
+        """Parse several events from the input file.
+
+        Parameters
+        ----------
+        event_nums : iterable[int], optional
+            Indices of tree entries to parse (0 = first entry). If None, all entries are parsed.
+
+        Yields
+        ------
+        Event, list[NodeParticle]
+            Event object containing info about the event, and collection of
+            NodeParticles to be assigned to a graph, for each event in turn.
+        """
         log.info("Opening event file %s", self.filename)
         with root_open(self.filename) as f:
             tree = f.tree
@@ -96,51 +115,79 @@ class HeppyParser(object):
             num_entries = tree.GetEntries()
             log.debug('%d entries in tree', num_entries)
 
-            get_entry(tree, self.event_num)
-
-            # need to convert from ROOT.PyIntBuffer to list manually
-            mother_indices, daughter_indices = [list(tree.__getattr__(bn))
-                                                for bn in relationship_fields]
-            log.debug('Mother indices: %s', mother_indices)
-            log.debug('Daugher indices: %s', daughter_indices)
-
-            # Make a dict, such that a key of daughter's index returns all mother indices
-            mother_map = dict()
-            for daughter in set(daughter_indices):
-                mother_map[daughter] = sorted([m for m, d
-                                               in izip(mother_indices, daughter_indices)
-                                               if d == daughter])
-            log.debug('Daughter/mothers mapping: %s', mother_map)
-
-            particle_branches = [tree.__getattr__(bn) for bn in particle_branch_names]
-
-            node_particles = []
-
-            for ind, entry in enumerate(izip(*particle_branches)):
-                contents_dict = {k: v for k, v in izip(particle_fields, entry)}
-                p = Particle(barcode=ind,
-                             pdgid=int(contents_dict['pdgId']),
-                             status=int(contents_dict['status']),
-                             pt=float(contents_dict['pt']),
-                             eta=float(contents_dict['eta']),
-                             phi=float(contents_dict['phi']),
-                             mass=float(contents_dict['mass']))
-                np = NodeParticle(p, parent_barcodes=mother_map.get(ind, []))
-
-                # Kill the load of final-state particles who are children of an
-                # incoming proton, heppy like to produce loads of these
-                parent_particles = [n for n in node_particles
-                                    if n.barcode in np.parent_barcodes]
-                if (p.status == 1 and len(parent_particles) == 1 and
-                    parent_particles[0].barcode in [0, 1]):
-                    continue
-
-                log.debug(np)
-
-                node_particles.append(np)
-
-            event = Event(event_num=self.event_num, source=self.filename)
-            return event, node_particles
+            wanted = range(num_entries) if event_nums is None else sorted(set(event_nums))
+
+            for event_num in wanted:
+                if event_num >= num_entries:
+                    break
+                get_entry(tree, event_num)
+                node_particles = self.parse_entry(tree, particle_fields, particle_branch_names,
+                                                  relationship_fields)
+                event = Event(event_num=event_num, source=self.filename)
+                yield event, node_particles
+
+    def parse_entry(self, tree, particle_fields, particle_branch_names, relationship_fields):
+        """Get particles from the current tree entry.
+
+        Parameters
+        ----------
+        tree : ROOT.TTree
+            Tree, with the entry of interest loaded
+        particle_fields : list[str]
+            Particle field names
+        particle_branch_names : list[str]
+            Branch names corresponding to `particle_fields`
+        relationship_fields : list[str]
+            Mother and daughter index branch names
+
+        Returns
+        -------
+        list[NodeParticle]
+        """
+        # need to convert from ROOT.PyIntBuffer to list manually
+        mother_indices, daughter_indices = [list(tree.__getattr__(bn))
+                                            for bn in relationship_fields]
+        log.debug('Mother indices: %s', mother_indices)
+        log.debug('Daugher indices: %s', daughter_indices)
+
+        # Make a dict, such that a key of daughter's index returns all mother indices
+        mother_map = dict()
+        for daughter in set(daughter_indices):
+            mother_map[daughter] = sorted([m for m, d
+                                           in izip(mother_indices, daughter_indices)
+                                           if d == daughter])
+        log.debug('Daughter/mothers mapping: %s', mother_map)
+
+        particle_branches = [tree.__getattr__(bn) for bn in particle_branch_names]
+
+        node_particles = []
+        table = ParticleTable()
+
+        for ind, entry in enumerate(izip(*particle_branches)):
+            contents_dict = {k: v for k, v in izip(particle_fields, entry)}
+            p = Particle(table=table,
+                         barcode=ind,
+                         pdgid=int(contents_dict['pdgId']),
+                         status=int(contents_dict['status']),
+                         pt=float(contents_dict['pt']),
+                         eta=float(contents_dict['eta']),
+                         phi=float(contents_dict['phi']),
+                         mass=float(contents_dict['mass']))
+            np = NodeParticle(p, parent_barcodes=mother_map.get(ind, []))
+
+            # Kill the load of final-state particles who are children of an
+            # incoming proton, heppy like to produce loads of these
+            parent_particles = [n for n in node_particles
+                                if n.barcode in np.parent_barcodes]
+            if (p.status == 1 and len(parent_particles) == 1 and
+                parent_particles[0].barcode in [0, 1]):
+                continue
+
+            log.debug(np)
+
+            node_particles.append(np)
+
+        return node_particles
 
 
 @contextmanager
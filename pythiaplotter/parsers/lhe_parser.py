@@ -7,6 +7,8 @@ See example/example_lhe.lhe for example input file.
 
 
 from __future__ import absolute_import
+import re
+from contextlib import closing
 from pprint import pformat
 try:
     from lxml import etree as ET  # MegaGainz
@@ -14,12 +16,20 @@ except ImportError:
     import xml.etree.ElementTree as ET  # slowwww
 from pythiaplotter.utils.logging_config import get_logger
 from pythiaplotter.utils.common import map_columns_to_dict, generate_repr_str
-from .event_classes import Event, Particle, NodeParticle
+from .event_classes import Event, Particle, ParticleTable, NodeParticle
+from .event_index import EventIndex, scan_marker_offsets
+from .compression import open_input
+from .mapped_input import map_input
 
 
 log = get_logger(__name__)
 
 
+# Opening tags of the blocks in the file, e.g. not <initrwgt> or <eventgroup>
+INIT_TAG = re.compile(br"<init[\s>]")
+EVENT_TAG = re.compile(br"<event[\s>]")
+
+
 class LHEParser(object):
     """Main class to parse a LHE file.
 
@@ -28,21 +38,31 @@ class LHEParser(object):
     return first event in file.
     """
 
-    def __init__(self, filename, event_num=0):
+    # Event numbers that are other names for an event, {alias: event number}
+    event_aliases = {0: 1}
+
+    def __init__(self, filename, event_num=0, use_index=True):
         """
         Parameters
         ----------
         filename : str
             Input filename.
         event_num : int, optional
-            Index of event to parse in input file. (0 = first event)
+            Number of event to parse in input file. (1 = first event, 0 is also the first event)
+        use_index : bool, optional
+            If True, use (and build if necessary) a byte-offset index of the
+            ``<event>`` blocks to go straight to the requested event.
         """
         self.filename = filename
         self.event_num = event_num
         self.events = []
+        self.index = None
+        if use_index:
+            self.index = EventIndex(filename, marker=b"<event", accept_func=is_event_tag,
+                                    first_key=1, line_start=False, find_start=find_init_end)
 
     def __repr__(self):
-        return generate_repr_str(self, ignore=['events'])
+        return generate_repr_str(self, ignore=['events', 'index'])
 
     def __str__(self):
         return "LHEParser: %s" % pformat(self.filename)
@@ -57,33 +77,177 @@ class LHEParser(object):
         list[NodeParticle]
             Collection of NodeParticles to be assigned to a graph.
         """
+        event_num = self.event_aliases.get(self.event_num, self.event_num)
+        if self.index:
+            offset = self.index.get_offset(event_num)
+            events = [] if offset is None else [self.parse_event_at(offset, event_num)]
+        else:
+            events = self.iter_events([event_num])
+
+        for event, node_particles in events:
+            event.event_num = self.event_num
+            log.debug(node_particles)
+            return event, node_particles
+
+        log.error("Cannot find the <event> block %d in LHE file", self.event_num)
+        raise IndexError("Cannot find the <event> block %d in LHE file" % self.event_num)
+
+    def iter_events(self, event_nums=None):
+        """Parse several events from the input file.
+
+        If possible, the file is memory-mapped, and the <event> blocks found by
+        searching the raw bytes, so only the requested blocks are parsed as XML.
+        Otherwise (e.g. compressed files), the file is parsed incrementally,
+        and each block is discarded once parsed, so memory usage does not depend
+        on the size of the file.
+        Reading stops once all the requested events have been found.
+
+        Parameters
+        ----------
+        event_nums : iterable[int], optional
+            Numbers of events to parse (1 = first event, 0 is also the first event, as in
+            parse()). If None, all events are parsed.
+
+        Yields
+        ------
+        Event, list[NodeParticle]
+            Event object containing info about the event, and collection of
+            NodeParticles to be assigned to a graph, for each event in turn.
+        """
         log.info("Opening event file %s", self.filename)
-        tree = ET.parse(self.filename)
-
-        root = tree.getroot()
-
-        # get tags, find index of init block, since there could be any number of
-        # program-specific fields before it
-        tags = [r.tag for r in root]
-        try:
-            init_ind = tags.index('init')
-        except ValueError:
-            log.exception("Cannot find <init> block in LHE file")
-            raise
-        self.parse_init_text(root[init_ind].text)
-
-        # now get the event the user wanted
-        event_ind = init_ind
-        try:
-            event_ind = tags.index('event', self.event_num)
-        except ValueError:
-            log.exception("Cannot find the <event> block %d in LHE file", self.event_num)
-            raise
-
-        event, node_particles = self.parse_event_text(root[event_ind].text)
-
-        log.debug(node_particles)
-        return event, node_particles
+        wanted = None if event_nums is None else set(event_nums)
+        for alias, event_num in sorted(self.event_aliases.items()):
+            if wanted is not None and alias in wanted:
+                wanted.discard(alias)
+                for event, node_particles in self.iter_events([event_num]):
+                    event.event_num = alias
+                    yield event, node_particles
+        if wanted is not None and not wanted:
+            return
+
+        buf = map_input(self.filename)
+        if buf is not None:
+            with closing(buf):
+                for event in self.iter_mapped_events(buf, wanted):
+                    yield event
+            return
+
+        root = None
+        depth = 0
+        found_init = False
+        event_num = 0
+        with open_input(self.filename, "rb") as f:
+            for action, elem in ET.iterparse(f, events=("start", "end")):
+                if action == "start":
+                    if root is None:
+                        root = elem
+                    depth += 1
+                    continue
+
+                # Only interested in the blocks directly inside the root <LesHouchesEvents>
+                depth -= 1
+                if depth != 1:
+                    continue
+
+                # There could be any number of program-specific blocks before <init>
+                if elem.tag == 'init':
+                    found_init = True
+                    self.parse_init_text(elem.text)
+                elif elem.tag == 'event':
+                    if not found_init:
+                        break
+                    event_num += 1
+                    if wanted is None or event_num in wanted:
+                        yield self.parse_event_text(elem.text, event_num)
+                        if wanted is not None:
+                            wanted.discard(event_num)
+                            if not wanted:
+                                return
+
+                # Throw away the finished block, so the tree never holds more than one
+                root.clear()
+
+        if not found_init:
+            log.error("Cannot find <init> block in LHE file")
+            raise ValueError("Cannot find <init> block in LHE file")
+
+    def iter_mapped_events(self, buf, wanted=None):
+        """Parse events from a memory-mapped LHE file, see iter_events().
+
+        Parameters
+        ----------
+        buf : mmap.mmap
+            Contents of the input file.
+        wanted : set[int], optional
+            Numbers of events to parse, which are removed as they are parsed.
+            If None, all events are parsed.
+
+        Yields
+        ------
+        Event, list[NodeParticle]
+        """
+        # There could be any number of program-specific blocks before <init>
+        init = INIT_TAG.search(buf)
+        if init is None:
+            log.error("Cannot find <init> block in LHE file")
+            raise ValueError("Cannot find <init> block in LHE file")
+
+        for event_num, match in enumerate(EVENT_TAG.finditer(buf, init.end()), 1):
+            if wanted is None or event_num in wanted:
+                yield self.parse_event_block(get_event_block(buf, match.start()), event_num)
+                if wanted is not None:
+                    wanted.discard(event_num)
+                    if not wanted:
+                        return
+
+    def parse_event_at(self, offset, event_num):
+        """Parse the <event> block starting at a given byte offset in the input file.
+
+        Parameters
+        ----------
+        offset : int
+            Byte offset of the opening ``<event`` tag.
+        event_num : int
+            Event number, as it is not included in the event block.
+
+        Returns
+        -------
+        Event, list[NodeParticle]
+        """
+        buf = map_input(self.filename)
+        if buf is not None:
+            with closing(buf):
+                return self.parse_event_block(get_event_block(buf, offset), event_num)
+
+        end_tag = b"</event>"
+        lines = []
+        with self.index.open_at(offset, "rb") as f:
+            for line in f:
+                end = line.find(end_tag)
+                if end >= 0:
+                    lines.append(line[:end + len(end_tag)])
+                    break
+                lines.append(line)
+            else:
+                raise ValueError("Unterminated <event> block at byte %d in %s"
+                                 % (offset, self.filename))
+        return self.parse_event_block(b"".join(lines), event_num)
+
+    def parse_event_block(self, block, event_num):
+        """Parse the raw bytes of an <event>...</event> block.
+
+        Parameters
+        ----------
+        block : bytes
+            The whole block, including the opening and closing tags.
+        event_num : int
+            Event number, as it is not included in the event block.
+
+        Returns
+        -------
+        Event, list[NodeParticle]
+        """
+        return self.parse_event_text(ET.fromstring(block).text, event_num)
 
     def parse_init_text(self, text):
         """Parse the initialisation info. Currently does nothing.
@@ -102,7 +266,7 @@ class LHEParser(object):
         """
         pass
 
-    def parse_event_text(self, text):
+    def parse_event_text(self, text, event_num):
         """Parse the text in a <event>...</event> block
 
         The first line is compulsory event info
@@ -112,6 +276,8 @@ class LHEParser(object):
         ----------
         text : str
             Event text block to be parsed.
+        event_num : int
+            Event number, as it is not included in the event block.
 
         Returns
         -------
@@ -120,6 +286,7 @@ class LHEParser(object):
         """
         event = None
         node_particles = []
+        table = ParticleTable()
         # Keep a track of particle barcodes - start at 1, not 0.
         # LHE files do not include a barcode for each particle,
         # so we have to do it manually
@@ -133,12 +300,13 @@ class LHEParser(object):
 
             # event info
             if not event:
-                event = self.parse_event_line(line, self.event_num)
+                event = self.parse_event_line(line, event_num)
             else:
-                node_particle = self.parse_particle_line(line, barcode=counter)
+                node_particle = self.parse_particle_line(line, barcode=counter, table=table)
                 node_particles.append(node_particle)
                 counter += 1
 
+        table.compute_kinematics()
         return event, node_particles
 
     def parse_event_line(self, line, event_num):
@@ -161,7 +329,7 @@ class LHEParser(object):
         log.debug(contents)
         return Event(event_num=int(event_num), source=self.filename)
 
-    def parse_particle_line(self, line, barcode):
+    def parse_particle_line(self, line, barcode, table=None):
         """Parse a line that describes a particle and its mothers from a LHE file.
 
         Need to supply barcode to make Particle obj unique, since not supplied as
@@ -173,6 +341,8 @@ class LHEParser(object):
             Line of text describing a particle
         barcode : int
             Unique barcode for this particle
+        table : ParticleTable, optional
+            Table to store the particle data in.
 
         Returns
         -------
@@ -182,7 +352,8 @@ class LHEParser(object):
         fields = ["pdgid", "status", "parent1", "parent2", "col1", "col2",
                   "px", "py", "pz", "energy", "mass", "lifetime", "spin"]
         contents_dict = map_columns_to_dict(fields, line)
-        p = Particle(barcode=barcode,
+        p = Particle(table=table,
+                     barcode=barcode,
                      pdgid=int(contents_dict["pdgid"]),
                      status=int(contents_dict["status"]),
                      px=float(contents_dict["px"]),
@@ -195,3 +366,51 @@ class LHEParser(object):
                           parent_barcodes=list(range(int(contents_dict['parent1']),
                                                      int(contents_dict['parent2']) + 1)))
         return np
+
+
+def get_event_block(buf, offset):
+    """Get the bytes of the <event> block starting at `offset` in a buffer.
+
+    Parameters
+    ----------
+    buf : mmap.mmap, bytes
+    offset : int
+        Offset of the opening ``<event`` tag.
+
+    Returns
+    -------
+    bytes
+    """
+    end_tag = b"</event>"
+    end = buf.find(end_tag, offset)
+    if end < 0:
+        raise ValueError("Unterminated <event> block at byte %d" % offset)
+    return buf[offset:end + len(end_tag)]
+
+
+def find_init_end(f):
+    """Find the byte offset just after the opening <init> tag in a LHE file.
+
+    Events are only looked for after this, as in LHEParser.iter_mapped_events().
+
+    Parameters
+    ----------
+    f : file
+        Input file, opened in binary mode.
+
+    Returns
+    -------
+    int
+        Byte offset, or None if there is no <init> tag.
+    """
+    for offset, line in scan_marker_offsets(f, b"<init", line_start=False):
+        # The line has no newline, which can end the tag name
+        match = INIT_TAG.match(line + b"\n")
+        if match:
+            return offset + match.end()
+    return None
+
+
+def is_event_tag(line):
+    """Check if a line starting with ``<event`` opens an <event> block, e.g. not <eventgroup>"""
+    return line[6:7] in (b">", b" ", b"\t", b"\r", b"")
@@ -0,0 +1,142 @@
+"""Find events in uncompressed input files without reading them line-by-line.
+
+The input file is memory-mapped, and the start of each event is found by
+searching the raw bytes. No Python objects are made for the lines
+of the events we skip over, so they are skipped at close to disk bandwidth.
+Only the bytes of the requested events are decoded into lines for the parser.
+
+Compressed files can't be mapped (see :mod:`pythiaplotter.parsers.compression`),
+so the parsers fall back to reading them line-by-line.
+"""
+
+
+from __future__ import absolute_import
+import re
+import mmap
+from pythiaplotter.utils.logging_config import get_logger
+from .compression import get_compression
+
+
+log = get_logger(__name__)
+
+
+def map_input(filename):
+    """Memory-map an input file for reading.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    mmap.mmap
+        Read-only map of the whole file, or None if the file cannot be mapped
+        (e.g. it is compressed or empty). Use with ``contextlib.closing``.
+    """
+    if get_compression(filename):
+        return None
+    with open(filename, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError) as err:
+            log.debug("Cannot memory-map %s: %s", filename, err)
+            return None
+
+
+def compile_markers(markers, prefix=b""):
+    """Make a regular expression that matches any of the given markers.
+
+    Regular expressions are used rather than ``mmap.find``, which is slow
+    in older versions of python.
+
+    Parameters
+    ----------
+    markers : bytes, tuple[bytes]
+        Byte string(s) to look for, e.g. ``b"E "``
+    prefix : bytes, optional
+        Byte string that must come before any of the markers.
+
+    Returns
+    -------
+    re.RegexObject
+    """
+    if isinstance(markers, bytes):
+        markers = (markers,)
+    return re.compile(re.escape(prefix) + b"(?:" + b"|".join(re.escape(m) for m in markers) + b")")
+
+
+def find_marker(buf, markers, start=0, line_start=True):
+    """Find the next occurrence of a marker in a buffer.
+
+    Parameters
+    ----------
+    buf : mmap.mmap, bytes
+        Buffer to search.
+    markers : bytes, tuple[bytes]
+        Byte string(s) to look for, e.g. ``b"E "``
+    start : int, optional
+        Offset to start searching from.
+    line_start : bool, optional
+        If True, a marker must be at the start of a line, otherwise it can be anywhere.
+
+    Returns
+    -------
+    int
+        Offset of the start of the marker, or -1 if there are no more.
+    """
+    for offset in iter_marker_offsets(buf, markers, start, line_start):
+        return offset
+    return -1
+
+
+def iter_marker_offsets(buf, markers, start=0, line_start=True):
+    """Iterate over the offsets of every occurrence of the markers in a buffer.
+
+    Parameters
+    ----------
+    buf : mmap.mmap, bytes
+    markers : bytes, tuple[bytes]
+    start : int, optional
+    line_start : bool, optional
+        See find_marker()
+
+    Yields
+    ------
+    int
+    """
+    if not line_start:
+        for match in compile_markers(markers).finditer(buf, start):
+            yield match.start()
+        return
+
+    # Look for a newline followed by a marker, since a regular expression
+    # starting with "^" can't use the fast search for a literal string
+    if start == 0 and compile_markers(markers).match(buf):
+        yield 0
+    for match in compile_markers(markers, prefix=b"\n").finditer(buf, max(start - 1, 0)):
+        yield match.start() + 1
+
+
+def get_line(buf, start):
+    """Get the line starting at `start` in a buffer, as bytes without the newline"""
+    end = buf.find(b"\n", start)
+    return buf[start:end if end >= 0 else len(buf)].rstrip(b"\r")
+
+
+def decode_lines(buf, start, end):
+    """Decode part of a buffer into lines of text.
+
+    Parameters
+    ----------
+    buf : mmap.mmap, bytes
+    start, end : int
+        Offsets of the part to decode. If `end` is negative, decode to the end of the buffer.
+
+    Returns
+    -------
+    list[str]
+        Lines, without newlines.
+    """
+    if end < 0:
+        end = len(buf)
+    return buf[start:end].decode("utf-8").splitlines()
@@ -4,19 +4,23 @@ Default is NODE representation for particles.
 
 See example/example_pythia8.txt for example input file.
 
-TODO: reshuffle blocks - non optimal spreading out atm
 """
 
 
 from __future__ import absolute_import
+import copy
+from contextlib import closing
 from pprint import pformat
+from collections import OrderedDict
 try:
     from itertools import izip
 except ImportError:
     izip = zip
 from pythiaplotter.utils.logging_config import get_logger
 from pythiaplotter.utils.common import map_columns_to_dict, generate_repr_str
-from .event_classes import Event, Particle, NodeParticle
+from .event_classes import Event, Particle, ParticleTable, NodeParticle
+from .compression import open_input
+from .mapped_input import map_input, iter_marker_offsets, decode_lines
 
 
 log = get_logger(__name__)
@@ -74,8 +78,9 @@ def parse_event_block(contents):
     # These indicate non-particle lines - matches words
     ignore = (("no", "id"), ("Charge", "sum:"), ("0", "90", "(system)"))
 
-    # Store all the NodeParticles in the event
+    # Store all the NodeParticles in the event, with their data in one table
     node_particles = []
+    table = ParticleTable()
 
     log.debug("start of raw contents")
     log.debug(contents)
@@ -96,7 +101,8 @@ def parse_event_block(contents):
         contents_dict = map_columns_to_dict(fields, line)
         log.debug(contents_dict)
         # Create a Particle obj and add to total
-        p = Particle(barcode=int(contents_dict['barcode']),
+        p = Particle(table=table,
+                     barcode=int(contents_dict['barcode']),
                      pdgid=int(contents_dict['pdgid']),
                      status=int(contents_dict['status']),
                      px=float(contents_dict['px']),
@@ -112,6 +118,7 @@ def parse_event_block(contents):
                                                      int(contents_dict['parent2']) + 1)))
         node_particles.append(np)
 
+    table.compute_kinematics()
     return node_particles
 
 
@@ -126,14 +133,17 @@ def parse_stats_block(contents):
 
 
 class Pythia8Parser(object):
-    """Main class to parse Pythia 8 screen output from a text file."""
+    """Main class to parse Pythia 8 screen output from a text file.
+
+    Only the blocks for the requested events are stored and parsed.
+    If possible, the file is memory-mapped, and the blocks found by searching the raw bytes,
+    so other events are skipped without making any lines. Otherwise (e.g. compressed files),
+    the file is read line-by-line, and other event blocks are skipped over without
+    processing their lines. Either way, memory usage is bounded by the size of one event.
+    """
 
     # Block types in Pythia output
-    # For each, we store:
-    # strings that indicate start/end or block;
-    # the start/end indices of any blocks;
-    # a list of individual block contents;
-    # and the parser method to handle this type of block
+    # For each, we store strings that indicate start/end or block
     info_start = "PYTHIA Info Listing"
     info_end = "End PYTHIA Info Listing"
 
@@ -158,36 +168,26 @@ class Pythia8Parser(object):
         self.filename = filename
         self.event_num = event_num
 
-        self.info_blocks = dict(str_start=self.info_start, str_end=self.info_end,
-                                ind_start=[], ind_end=[], blocks=[],
-                                parser=parse_info_block)
-
-        self.full_evt_blocks = dict(str_start=self.full_evt_start, str_end=self.full_evt_end,
-                                    ind_start=[], ind_end=[], blocks=[],
-                                    parser=parse_event_block)
-
-        self.hard_evt_blocks = dict(str_start=self.hard_evt_start, str_end=self.hard_evt_end,
-                                    ind_start=[], ind_end=[], blocks=[],
-                                    parser=parse_event_block)
-
-        self.stats_blocks = dict(str_start=self.stats_start, str_end=self.stats_end,
-                                 ind_start=[], ind_end=[], blocks=[],
-                                 parser=parse_stats_block)
-
-        # All the different blocks we want to be able to parse, with sensible names
-        self.block_types = dict(FullEvent=self.full_evt_blocks,
-                                Info=self.info_blocks,
-                                HardEvent=self.hard_evt_blocks)
-
-        # store file contents in list to slice up easily
-        self.contents = []
+        # All the different blocks we want to be able to recognise, with sensible names,
+        # their start/end strings, and the parser method to handle this type of block.
+        # Blocks without a parser are skipped over.
+        # Order matters: the first block whose start string matches a line is used.
+        self.block_types = OrderedDict([
+            ("FullEvent", dict(str_start=self.full_evt_start, str_end=self.full_evt_end,
+                               parser=parse_event_block)),
+            ("HardEvent", dict(str_start=self.hard_evt_start, str_end=self.hard_evt_end,
+                               parser=None)),
+            ("Info", dict(str_start=self.info_start, str_end=self.info_end,
+                          parser=parse_info_block)),
+            ("Stats", dict(str_start=self.stats_start, str_end=self.stats_end,
+                           parser=None))
+        ])
 
     def __repr__(self):
-        return generate_repr_str(self, ignore=['contents', 'info_blocks', 'full_evt_blocks',
-                                               'hard_evt_blocks', 'stats_blocks', 'block_types'])
+        return generate_repr_str(self, ignore=['block_types'])
 
     def __str__(self):
-        return "Pythia8Parser:\n%s" % pformat(self.block_types)
+        return "Pythia8Parser:\n%s" % pformat(self.filename)
 
     def parse(self):
         """Parse contents of the input file, extract particles, and assign to a NetworkX graph.
@@ -199,48 +199,229 @@ class Pythia8Parser(object):
         list[NodeParticle]
             Collection of NodeParticles to be assigned to a graph.
         """
+        for event, node_particles in self.iter_events([self.event_num]):
+            return event, node_particles
+
+        raise IndexError("Cannot access event number %d, no such event" % self.event_num)
+
+    def iter_events(self, event_nums=None):
+        """Parse several events from the input file, in a single pass.
+
+        Stops reading the file as soon as all the requested events have been parsed.
+
+        Parameters
+        ----------
+        event_nums : iterable[int], optional
+            Indices of events to parse (0 = first event). If None, all events are parsed.
+
+        Yields
+        ------
+        Event, list[NodeParticle]
+            Event object containing info about the event, and collection of
+            NodeParticles to be assigned to a graph, for each event in turn.
+        """
+        remaining = None if event_nums is None else set(event_nums)
+        if remaining is not None and not remaining:
+            return
+
         log.info("Opening event file %s", self.filename)
-        with open(self.filename, "r") as f:
-            lines = [l.replace("\n", "").strip() for l in list(f)]
-            self.contents = [l for l in lines if l]
-
-        # Find all start & end indices for blocks
-        for i, line in enumerate(self.contents):
-            for block in self.block_types.values():
-                if block["str_start"] in line:
-                    block["ind_start"].append(i)
-                    log.debug("Block starting line: %s", line)
-                if block["str_end"] in line:
-                    # check that there's at least one ind_start < i
-                    if sum([j < i for j in block["ind_start"]]):
-                        block["ind_end"].append(i)
-                        log.debug("Block ending line: %s", line)
-
-        # Now pull the contents from files & parse
+        buf = map_input(self.filename)
+        if buf is not None:
+            with closing(buf):
+                for event in self.iter_mapped_events(buf, remaining):
+                    yield event
+            return
+
+        event_num = -1  # index of the most recent complete event block
+        info_event = None  # Event from the most recent Info block
+        block_name = None  # name of the block we are currently in, if any
+        block_end = None  # end string of the current block
+        contents = None  # lines of the current block, if it is one we want to parse
+
+        with open_input(self.filename) as f:
+            for line in f:
+                if block_name is not None and block_end not in line:
+                    if self.get_block_start(line) is None:
+                        # Inside a block: only store lines from blocks we want to parse
+                        if contents is not None:
+                            line = line.strip()
+                            if line:
+                                contents.append(line)
+                        continue
+                    # The start of another block before the end of this one
+                    if block_name == "FullEvent":
+                        log.warning("FullEvent block %d has no end, skipping it", event_num)
+                    elif block_name == "Info":
+                        info_event = None
+                    block_name, block_end, contents = None, None, None
+
+                if block_name is None:
+                    block_name = self.get_block_start(line)
+                    if block_name is None:
+                        continue
+                    log.debug("Block starting line: %s", line.strip())
+                    block_end = self.block_types[block_name]["str_end"]
+                    if block_name == "FullEvent":
+                        event_num += 1
+                        wanted = remaining is None or event_num in remaining
+                        contents = [] if wanted else None
+                    elif self.block_types[block_name]["parser"]:
+                        contents = []
+                    continue
+
+                # End of the current block
+                log.debug("Block ending line: %s", line.strip())
+                if contents is not None:
+                    pb = PythiaBlock(name=block_name, contents=contents,
+                                     parser=self.block_types[block_name]["parser"])
+                    pb.parse_block()
+                    if block_name == "Info":
+                        info_event = pb.parser_results
+                    elif block_name == "FullEvent":
+                        yield self.make_event(event_num, info_event, pb.parser_results)
+                        if remaining is not None:
+                            remaining.discard(event_num)
+                            if not remaining:
+                                return
+                block_name, block_end, contents = None, None, None
+
+    def get_block_start(self, line):
+        """Get the name of the block started by a line, or None if it doesn't start one."""
+        # All the block start lines mention PYTHIA, so can cheaply skip most lines
+        if "PYTHIA" not in line or "End PYTHIA" in line:
+            return None
         for name, block in self.block_types.items():
-            for pair in izip(block["ind_start"], block["ind_end"]):
-                pb = PythiaBlock(name=name, parser=block["parser"],
-                                 contents=self.contents[pair[0] + 1: pair[1]])
-                pb.parse_block()
-                block["blocks"].append(pb)
-
-        if len(self.block_types["FullEvent"]["blocks"]) < self.event_num:
-            raise IndexError("Cannot access event number %d, no such event" % self.event_num)
-
-        # Deal with each type
-        # Info block: make a blank Event() object in case there's no Info block,
-        # assigning grapher (TODO: move elsewhere?)
-        event = Event()
-        if self.block_types["Info"]["blocks"]:
-            event = self.block_types["Info"]["blocks"][self.event_num].parser_results
-
-        event.event_num = self.event_num
-        event.source = self.filename
+            if block["str_start"] in line:
+                return name
+        return None
+
+    def iter_block_starts(self, buf):
+        """Find the start of every block in a memory-mapped file.
+
+        Parameters
+        ----------
+        buf : mmap.mmap
+            Contents of the input file.
+
+        Yields
+        ------
+        int, str
+            Offset of the block's start string, and the name of the block type.
+        """
+        starts = [(block["str_start"].encode("ascii"), name)
+                  for name, block in self.block_types.items()]
+        end_prefix = b"End "
+        for offset in iter_marker_offsets(buf, tuple(start for start, _ in starts),
+                                          line_start=False):
+            # Start strings are also part of some end strings, e.g. "End PYTHIA Info Listing"
+            if buf[max(offset - len(end_prefix), 0):offset] == end_prefix:
+                continue
+            for start, name in starts:
+                if buf[offset:offset + len(start)] == start:
+                    yield offset, name
+                    break
+
+    def iter_mapped_events(self, buf, remaining=None):
+        """Parse events from a memory-mapped file, see iter_events().
 
-        # Hard event blocks:
-        # hard_node_particles = self.block_types["HardEvent"]["blocks"][self.event_num].parser_results
+        Parameters
+        ----------
+        buf : mmap.mmap
+            Contents of the input file.
+        remaining : set[int], optional
+            Indices of events to parse, which are removed as they are parsed.
+            If None, all events are parsed.
+
+        Yields
+        ------
+        Event, list[NodeParticle]
+        """
+        event_num = -1
+        info = None  # (offset, name) of the most recent Info block
+        info_event = None
+        info_parsed = False  # True if info_event is from the most recent Info block
+        block_starts = self.iter_block_starts(buf)
+        next_start = next(block_starts, None)
+        while next_start is not None:
+            offset, block_name = next_start
+            next_start = next(block_starts, None)
+            # A block must end before the next one starts
+            limit = len(buf) if next_start is None else next_start[0]
+            if block_name == "Info":
+                info, info_parsed = (offset, limit), False
+                continue
+            if block_name != "FullEvent":
+                continue
+
+            event_num += 1
+            if remaining is not None and event_num not in remaining:
+                continue
+            node_particles = self.parse_mapped_block(buf, offset, limit, "FullEvent")
+            if node_particles is None:
+                log.warning("FullEvent block %d has no end, skipping it", event_num)
+                continue
+            if info is not None and not info_parsed:
+                info_event = self.parse_mapped_block(buf, info[0], info[1], "Info")
+                info_parsed = True
+            yield self.make_event(event_num, info_event, node_particles)
+            if remaining is not None:
+                remaining.discard(event_num)
+                if not remaining:
+                    return
+
+    def parse_mapped_block(self, buf, offset, limit, block_name):
+        """Parse a block from a memory-mapped file.
 
-        # Full event blocks:
-        full_node_particles = self.block_types["FullEvent"]["blocks"][self.event_num].parser_results
+        Parameters
+        ----------
+        buf : mmap.mmap
+            Contents of the input file.
+        offset : int
+            Offset of the block's start string.
+        limit : int
+            Offset the block must end before, e.g. the start of the next block.
+        block_name : str
+            Name of the block type, from `block_types`
 
-        return event, full_node_particles
+        Returns
+        -------
+        object
+            Results of the block parser, or None if the block has no end.
+        """
+        block = self.block_types[block_name]
+        start = buf.find(b"\n", offset, limit) + 1  # contents start on the line after
+        end = buf.find(block["str_end"].encode("ascii"), start, limit)
+        if start == 0 or end < 0:
+            return None
+        end = max(buf.rfind(b"\n", start, end) + 1, start)  # up to the start of the end line
+        contents = [line.strip() for line in decode_lines(buf, start, end)]
+        pb = PythiaBlock(name=block_name, contents=[line for line in contents if line],
+                         parser=block["parser"])
+        pb.parse_block()
+        return pb.parser_results
+
+    def make_event(self, event_num, info_event, node_particles):
+        """Create the Event and its particles for an event block.
+
+        Parameters
+        ----------
+        event_num : int
+            Index of event (0 = first event)
+        info_event : Event
+            Event from the most recent Info block, or None if there wasn't one.
+        node_particles : list[NodeParticle]
+            Particles from the event block.
+
+        Returns
+        -------
+        Event
+            Event object containing info about the event.
+        list[NodeParticle]
+            Collection of NodeParticles to be assigned to a graph.
+        """
+        # Info block: make a blank Event() object in case there's no Info block
+        # Copy, since several events can share an Info block
+        event = copy.copy(info_event) if info_event else Event()
+        event.event_num = event_num
+        event.source = self.filename
+        return event, node_particles
@@ -6,16 +6,23 @@ Attributes
 printer_opts_all : dict[str, PrinterOption]
     Store a record of all printers and their requirements.
 
-printer_opts_checked : dict{str: PrinterOption}
+printer_opts_checked : Mapping{str: PrinterOption}
     Store a record of only those printers available on the user's system.
+    The requirements are only checked when it is first used, not on import.
+
+The printer modules are only imported when needed, via the ``printer`` attribute
+of their PrinterOption.
 """
 
 
 from __future__ import absolute_import
 import sys
-from pythiaplotter.utils.common import check_program_exists, check_module_exists, generate_repr_str
-from .dot_printer import DotPrinter
-from .web_printer import VisPrinter
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping  # python 2
+from pythiaplotter.utils.common import (check_program_exists, check_module_exists,
+                                       generate_repr_str, load_object)
 
 
 class PrinterOption(object):
@@ -27,20 +34,29 @@ class PrinterOption(object):
         ----------
         description : str
             Short description about this printer
-        printer : class
-            Printer class
+        printer : str
+            Where to find the Printer class, as "module:class".
+            It is only imported when the ``printer`` attribute is first used.
         requires : dict
             Dict of program and module lists that are needed for this printer
         default_output_fmt : str
             Default output file extension
         """
         self.description = description
-        self.printer = printer
+        self.printer_path = printer
+        self._printer = None
         self.requires = requires
         self.default_output_fmt = default_output_fmt
 
+    @property
+    def printer(self):
+        """The Printer class, imported on first use."""
+        if self._printer is None:
+            self._printer = load_object(self.printer_path)
+        return self._printer
+
     def __repr__(self):
-        return generate_repr_str(self)
+        return generate_repr_str(self, ignore=['_printer'])
 
     def __str__(self):
         return self.description
@@ -50,7 +66,7 @@ class PrinterOption(object):
 printer_opts_all = {
     "DOT": PrinterOption(
         description="Fast, but basic formatting",
-        printer=DotPrinter,
+        printer="pythiaplotter.printers.dot_printer:DotPrinter",
         requires={
             "programs": ["dot"]  # assuming that sfdp, neato etc also work...
         },
@@ -58,7 +74,7 @@ printer_opts_all = {
     ),
     "WEB": PrinterOption(
         description="Interactive diagram in your browser",
-        printer=VisPrinter,
+        printer="pythiaplotter.printers.web_printer:VisPrinter",
         requires={
             "programs": ["dot"]
         },
@@ -75,17 +91,44 @@ printer_opts_all = {
 }
 
 
-# Create a similar dict, but only if each printer has
-# the necessary programs and py modules available
-printer_opts_checked = {}
+class CheckedPrinterOptions(Mapping):
+    """Read-only dict of the printers in printer_opts_all that have
+    the necessary programs and py modules available.
+
+    Searching the PATH for programs is slow, so the requirements are only checked
+    the first time it is used, rather than when this package is imported.
+    check_program_exists() caches its results, so each program is only looked for once.
+    """
+
+    def __init__(self, printer_opts):
+        self.printer_opts = printer_opts
+        self._available = None
+
+    def _get_available(self):
+        if self._available is None:
+            self._available = {}
+            for pname, popt in self.printer_opts.items():
+                required_progs = popt.requires.get('programs', [])
+                required_mods = popt.requires.get('modules', [])
+                if (all(check_program_exists(prog) for prog in required_progs)
+                        and all(check_module_exists(mod) for mod in required_mods)):
+                    self._available[pname] = popt
+        return self._available
+
+    def __getitem__(self, key):
+        return self._get_available()[key]
+
+    def __iter__(self):
+        return iter(self._get_available())
+
+    def __len__(self):
+        return len(self._get_available())
+
+    def __repr__(self):
+        return "{0}({1})".format(self.__class__.__name__, sorted(self._get_available()))
 
-for pname, popt in printer_opts_all.items():
-    required_progs = popt.requires.get('programs', [])
-    required_mods = popt.requires.get('modules', [])
 
-    if (all(check_program_exists(prog) for prog in required_progs)
-        and all(check_module_exists(mod) for mod in required_mods)):
-        printer_opts_checked[pname] = popt
+printer_opts_checked = CheckedPrinterOptions(printer_opts_all)
 
 
 def print_printers_requirements(output=sys.stdout.write):
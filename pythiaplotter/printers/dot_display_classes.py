@@ -6,6 +6,9 @@ method for the particle?
 
 
 from __future__ import absolute_import
+from string import Formatter
+import operator
+from operator import attrgetter
 from pythiaplotter.utils.logging_config import get_logger
 from pythiaplotter.utils.pdgid_converter import pdgid_to_string
 from pythiaplotter.utils.common import generate_repr_str, check_representation_str
@@ -40,14 +43,130 @@ def get_particle_label(particle, representation, label_opts, fancy=True):
     """
     check_representation_str(representation)
     style_key = "fancy" if fancy else "plain"
-    label = label_opts[representation.lower()][style_key].format(**particle.__dict__)
+    label = label_opts[representation.lower()][style_key].format(**particle.as_dict())
     if fancy:
         label = label.replace("inf", "&#x221e;")
     return label
 
 
+class ParticleLabel(object):
+    """Precompiled particle label template, as used by get_particle_label().
+
+    The template fields are turned into positional ones (e.g. ``{pt:.2f}`` -> ``{0:.2f}``),
+    so that all the particle fields needed can be fetched in one go.
+    """
+
+    def __init__(self, template, fancy):
+        """
+        Parameters
+        ----------
+        template : str
+            Label template, using the str.format() syntax, e.g. ``"{barcode}: {name}"``
+        fancy : bool
+            If True, will use HTML/unicode in labels
+        """
+        self.template = template
+        self.fancy = fancy
+        self.fields = []  # particle field names, e.g. "pt" from "{pt:.2f}"
+        compiled = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(template):
+            compiled.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field_name is None:
+                continue
+            field = field_name.split(".")[0].split("[")[0]
+            if field not in self.fields:
+                self.fields.append(field)
+            compiled.append("{%d%s%s%s}" % (self.fields.index(field),
+                                            field_name[len(field):],
+                                            "!" + conversion if conversion else "",
+                                            ":" + format_spec if format_spec else ""))
+        self.compiled_template = "".join(compiled)
+        getter = attrgetter(*self.fields) if self.fields else lambda particle: ()
+        self.get_fields = getter if len(self.fields) != 1 else lambda particle: (getter(particle),)
+
+    def __repr__(self):
+        return "{0}({1!r}, fancy={2})".format(self.__class__.__name__, self.template, self.fancy)
+
+    def __call__(self, particle):
+        """Get the label string for a particle."""
+        label = self.compiled_template.format(*self.get_fields(particle))
+        if self.fancy:
+            label = label.replace("inf", "&#x221e;")
+        return label
+
+
+class RecordingParticle(object):
+    """Wrap a particle, recording the names of all the attributes read from it.
+
+    Anything else done with it, e.g. comparing it to another particle, is also recorded,
+    by the name of the special method used (e.g. ``__eq__``).
+    """
+
+    __slots__ = ("_particle", "_names_used")
+
+    def __init__(self, particle):
+        object.__setattr__(self, "_particle", particle)
+        object.__setattr__(self, "_names_used", set())
+
+    @property
+    def names_used(self):
+        """Names of the attributes & special methods used so far."""
+        return self._names_used
+
+    def __getattr__(self, name):
+        self._names_used.add(name)
+        return getattr(self._particle, name)
+
+    def __setattr__(self, name, value):
+        self._names_used.add("__setattr__")
+        setattr(self._particle, name, value)
+
+    @property
+    def __class__(self):
+        # used by isinstance()
+        self._names_used.add("__class__")
+        return self._particle.__class__
+
+
+def _recorded_operation(name, operation):
+    def method(self, *args):
+        self._names_used.add(name)
+        return operation(self._particle, *args)
+    method.__name__ = name
+    return method
+
+
+# Special methods are looked up on the type, bypassing __getattr__, so add them all here
+for _name, _operation in [("__eq__", operator.eq), ("__ne__", operator.ne),
+                          ("__lt__", operator.lt), ("__le__", operator.le),
+                          ("__gt__", operator.gt), ("__ge__", operator.ge),
+                          ("__hash__", hash), ("__str__", str), ("__repr__", repr),
+                          ("__format__", format), ("__bool__", bool), ("__nonzero__", bool),
+                          ("__len__", len), ("__iter__", iter), ("__dir__", dir),
+                          ("__contains__", operator.contains),
+                          ("__getitem__", operator.getitem)]:
+    setattr(RecordingParticle, _name, _recorded_operation(_name, _operation))
+del _name, _operation
+
+
 class DotAttrGenerator(object):
-    """Base class for generating particle attr dicts"""
+    """Base class for generating particle attr dicts
+
+    Particle styles are chosen by the first matching `filter` in the particle options.
+    The attribute string for each style is only made once.
+
+    The matching style is also remembered for each combination of the `style_key_attributes`
+    of the particle (PDGID, status, initial/final state). The first time each combination
+    is seen, the filters are run on a RecordingParticle, to see which attributes they read.
+    If they read anything else (e.g. pT), the filters are run for every particle with that
+    combination instead, so any filter gives the right style.
+    """
+
+    # Particle representation this generator is for, "NODE" or "EDGE"
+    representation = None
+
+    # Particle attributes that matching styles are remembered for
+    style_key_attributes = ("pdgid", "status", "initial_state", "final_state")
 
     def __init__(self, particle_opts=None, label_opts=None):
         """Create Graphviz attribute str for an object that may or may not correspond to a Particle.
@@ -64,9 +183,16 @@ class DotAttrGenerator(object):
             for op in self.particle_opts:
                 self.validate_particle_opt(op)
         self.label_opts = label_opts
+        self.labels = {}  # ParticleLabel for fancy (True) and plain (False)
+        self.styles = {}  # (label, rest of the attribute str) for each style option index
+        # index of the matching style option for each style key,
+        # None if the filters read other attributes so must be run for each particle
+        self.style_indices = {}
+        self.get_style_key = attrgetter(*self.style_key_attributes)
 
     def __repr__(self):
-        return generate_repr_str(self)
+        return generate_repr_str(self, ignore=['labels', 'styles', 'style_indices',
+                                               'get_style_key'])
 
     @staticmethod
     def validate_particle_opt(opt):
@@ -91,18 +217,102 @@ class DotAttrGenerator(object):
         fancy : bool
             Whether to style plain or fancy
         """
-        if 'particle' in list(obj.keys()):
-            attr = self.get_particle_attr(obj['particle'], fancy)
+        particle = obj.get('particle')
+        if particle is not None:
+            return self.get_particle_gv_str(particle, fancy)
+        return self.dict_to_gv_str(self.get_non_particle_attr(obj, fancy))
+
+    def get_particle_gv_str(self, particle, fancy):
+        """Create attribute string for a particle.
+
+        This gives the same as ``dict_to_gv_str(get_particle_attr(particle, fancy))``,
+        but reuses the precompiled label template and styles.
+
+        Parameters
+        ----------
+        particle : Particle
+        fancy : bool
+
+        Returns
+        -------
+        str
+        """
+        if self.representation is None:
+            return self.dict_to_gv_str(self.get_particle_attr(particle, fancy))
+
+        key = self.get_style_key(particle)
+        try:
+            index = self.style_indices[key]
+        except KeyError:
+            index = self.find_style_index(key, particle)
         else:
-            attr = self.get_non_particle_attr(obj, fancy)
-        return self.dict_to_gv_str(attr)
+            if index is None:
+                index = self.get_style_index(particle)
+        style = self.styles.get(index)
+        if style is None:
+            style = self.styles[index] = self.compile_style(index)
+        label, rest = style
+
+        if label is None:
+            label = self.labels.get(fancy)
+            if label is None:
+                style_key = "fancy" if fancy else "plain"
+                template = self.label_opts[self.representation.lower()][style_key]
+                label = self.labels[fancy] = ParticleLabel(template, fancy)
+            label = label(particle)
+        return "[label={0}{1}]".format(label, rest)
+
+    def compile_style(self, index):
+        """Make the attribute string for a style option.
+
+        Parameters
+        ----------
+        index : int
+            Index of the style option, -1 if none match.
+
+        Returns
+        -------
+        str, str
+            Label from the style option (None if it doesn't set one),
+            and the rest of the attribute string.
+        """
+        attr = self.get_option_attr(index)
+        rest = "".join([", {0}={1}".format(k, v) for k, v in attr.items() if k != "label"])
+        return attr.get("label"), rest
+
+    def find_style_index(self, key, particle):
+        """Get the index of the style option matching a particle with a new style key,
+        and remember it for the key if the filters only read the style key attributes."""
+        recorder = RecordingParticle(particle)
+        index = self.get_style_index(recorder)
+        only_key_used = recorder.names_used.issubset(self.style_key_attributes)
+        self.style_indices[key] = index if only_key_used else None
+        return index
+
+    def get_style_index(self, particle):
+        """Get the index of the first style option that matches the particle, -1 if none."""
+        for index, opt in enumerate(self.particle_opts or []):
+            if opt['filter'](particle):
+                return index
+        return -1
+
+    def get_style_attr(self, particle):
+        """Get the attribute dict from the first style option that matches the particle."""
+        return self.get_option_attr(self.get_style_index(particle))
+
+    def get_option_attr(self, index):
+        """Get the attribute dict from a style option, empty if the index is -1."""
+        if index < 0:
+            return {}
+        return self.particle_opts[index]['attr'][self.representation.lower()]
 
     def get_particle_attr(self, particle, fancy):
         """Base method for getting an attribute dict for a particle.
 
         key:value pairs must be legal graphviz key/values.
 
-        The user should override this method.
+        If `representation` is set, this is the particle label plus the matching style option,
+        otherwise the user should override this method.
 
         Parameters
         ----------
@@ -113,7 +323,11 @@ class DotAttrGenerator(object):
         -------
         dict
         """
-        return {}
+        if self.representation is None:
+            return {}
+        attr = {"label": get_particle_label(particle, self.representation, self.label_opts, fancy)}
+        attr.update(self.get_style_attr(particle))
+        return attr
 
     def get_non_particle_attr(self, obj, fancy):
         """Base method for getting an attribute dict for not a particle.
@@ -145,36 +359,20 @@ class DotAttrGenerator(object):
 class DotEdgeAttrGenerator(DotAttrGenerator):
     """AttrGenerator specifically for Edges."""
 
+    representation = "EDGE"
+
     def __init__(self, particle_opts, label_opts):
         super(DotEdgeAttrGenerator, self).__init__(particle_opts, label_opts)
 
-    def get_particle_attr(self, particle, fancy):
-        attr = {"label": get_particle_label(particle, "EDGE", self.label_opts, fancy)}
-
-        for opt in self.particle_opts:
-            if opt['filter'](particle):
-                attr.update(opt['attr']['edge'])
-                break
-        return attr
 
 class DotNodeAttrGenerator(DotAttrGenerator):
     """AttrGenerator specifically for Nodes."""
 
+    representation = "NODE"
+
     def __init__(self, particle_opts, label_opts):
         super(DotNodeAttrGenerator, self).__init__(particle_opts, label_opts)
 
-    def __repr__(self):
-        return generate_repr_str(self)
-
-    def get_particle_attr(self, particle, fancy):
-        attr = {"label": get_particle_label(particle, "NODE", self.label_opts, fancy)}
-
-        for opt in self.particle_opts:
-            if opt['filter'](particle):
-                attr.update(opt['attr']['node'])
-                break
-        return attr
-
     def get_non_particle_attr(self, obj, fancy):
         return {"shape": "point"}
 
@@ -5,17 +5,25 @@ do is attach display attributes to each node/edge, then print these to file.
 
 Several stages:
 1. Go through nodes & edges and attach display attributes [add_display_attr()]
-2. Write to Graphviz format file [write_gv()]
-3. Render to file [print_diagram()]
+2. Generate the Graphviz description line by line [iter_gv_lines()]
+3. Render to file [print_diagram()], optionally also writing the Graphviz file
+
+The Graphviz description is streamed straight into the renderer (and Graphviz file),
+rather than built up as one string, as it can be very large for big events.
 """
 
 
 from __future__ import absolute_import
 import os
+import errno
+import glob
+import shutil
+import tempfile
 from string import Template
 from subprocess import call, PIPE, Popen
 from pythiaplotter.utils.logging_config import get_logger
 from pythiaplotter.utils.common import generate_repr_str
+from pythiaplotter.utils.profiling import profiler, record_graph_size
 from .dot_display_classes import DotNodeAttrGenerator, DotEdgeAttrGenerator, DotGraphAttrGenerator
 
 
@@ -45,51 +53,135 @@ class DotPrinter(object):
             If True, the chosen renderer converts the Graphviz description to a graph diagram.
         write_gv : bool
             If True, writes Graphviz description to file.
-        gv_filename : str
-            Filename for intermediate Graphviz file.
+        batch_size : int
+            Number of diagrams to render together, see start_batch().
+            If 0, each diagram is rendered as soon as it is printed.
         """
         self.output_filename = opts.output
         self.renderer = opts.layout
         self.output_format = opts.outputFormat
         self.make_diagram = not opts.noOutput
         self.write_gv = opts.saveGraphviz
-        if self.write_gv:
-            self.gv_filename = os.path.splitext(self.output_filename)[0] + ".gv"
-        else:
-            self.gv_filename = None
         self.graph_attr_gen = DotGraphAttrGenerator(opts.GRAPH_OPTS)
         self.node_attr_gen = DotNodeAttrGenerator(opts.DOT_PARTICLE_OPTS, opts.DOT_LABEL_OPTS)
         self.edge_attr_gen = DotEdgeAttrGenerator(opts.DOT_PARTICLE_OPTS, opts.DOT_LABEL_OPTS)
+        self.batch_size = 0
+        self.batch = []  # (gv_filename, output_filename) for each diagram waiting to be rendered
+        self.batch_gv_filenames = []  # Graphviz file the user asked for, for each diagram
+        self.batch_dir = None  # temporary directory for the batch Graphviz files
 
     def __repr__(self):
-        return generate_repr_str(self)
+        return generate_repr_str(self, ignore=['batch', 'batch_gv_filenames', 'batch_dir'])
+
+    def start_batch(self, batch_size=100):
+        """Start queueing up diagrams, to be rendered in batches by a single renderer process.
+
+        This saves starting the renderer for every event when printing many events.
+        Call finish_batch() once all events are printed.
+
+        Parameters
+        ----------
+        batch_size : int, optional
+            Number of diagrams to render together.
+        """
+        self.batch_size = batch_size
+
+    def finish_batch(self):
+        """Render any diagrams still waiting, and go back to rendering each diagram immediately."""
+        self.render_batch()
+        self.batch_size = 0
+
+    def render_batch(self):
+        """Render all diagrams waiting in the batch."""
+        try:
+            if self.batch:
+                with profiler.stage("render_batch") as stage:
+                    run_cmds = render_gv_files(diagrams=self.batch,
+                                               renderer=self.renderer,
+                                               output_format=self.output_format)
+                    stage.counts["diagrams"] = len(self.batch)
+                if self.write_gv:
+                    # The batch Graphviz files are temporary, so use the copies kept for the user
+                    for (batch_gv_filename, _), gv_filename in zip(self.batch,
+                                                                   self.batch_gv_filenames):
+                        if gv_filename:
+                            run_cmds = [cmd.replace(batch_gv_filename, gv_filename)
+                                        for cmd in run_cmds]
+                    log.info("To re-run:")
+                    log.info('\n'.join(run_cmds))
+        finally:
+            self.batch = []
+            self.batch_gv_filenames = []
+            if self.batch_dir:
+                shutil.rmtree(self.batch_dir)
+                self.batch_dir = None
+
+    def add_to_batch(self, gv_lines, output_filename, gv_filename=None):
+        """Write the Graphviz description to a temporary file, to be rendered with the batch.
 
-    def print_event(self, event):
+        Parameters
+        ----------
+        gv_lines : iterable[str]
+            Graph contents in DOT language, from iter_gv_lines()
+        output_filename : str
+            Final diagram filename
+        gv_filename : str, optional
+            If set, also write the Graphviz description to this file.
+        """
+        if self.batch_dir is None:
+            self.batch_dir = tempfile.mkdtemp(prefix="pythiaplotter")
+        batch_gv_filename = os.path.join(self.batch_dir, "%d.gv" % len(self.batch))
+        write_gv(gv_lines, batch_gv_filename)
+        if gv_filename:
+            log.info("Writing Graphviz file to %s", gv_filename)
+            shutil.copyfile(batch_gv_filename, gv_filename)
+        self.batch.append((batch_gv_filename, output_filename))
+        self.batch_gv_filenames.append(gv_filename)
+        if len(self.batch) >= self.batch_size:
+            self.render_batch()
+
+    def print_event(self, event, output_filename=None):
         """Convert the event diagram to Graphivz language, then run the renderer.
 
-        Can also optionally save the Graphviz description to file.
+        Can also optionally save the Graphviz description to file,
+        with the same stem as the output filename.
 
         Parameters
         ----------
         event : Event
             Event to print
+        output_filename : str, optional
+            Diagram filename. If unset, uses the output filename from the user options.
         """
+        output_filename = output_filename or self.output_filename
         fancy = self.output_format in ["ps", "pdf"]
-        self.add_display_attr(event, fancy)
-        gv_str = construct_gv_full(event)
-        # save gv first incase of parsing errors
+        with profiler.stage("attrs") as stage:
+            self.add_display_attr(event, fancy)
+            record_graph_size(stage, event.graph)
+        gv_lines = iter_gv_lines(event)
+        gv_filename = None
         if self.write_gv:
-            write_gv(gv_str, self.gv_filename)
-        if self.make_diagram:
-            run_cmds = print_diagram(gv_str=gv_str,
-                                     output_filename=self.output_filename,
+            gv_filename = os.path.splitext(output_filename)[0] + ".gv"
+        if not self.make_diagram:
+            if gv_filename:
+                with profiler.stage("write_gv"):
+                    write_gv(gv_lines, gv_filename)
+            return
+        if self.batch_size > 0:
+            with profiler.stage("add_to_batch"):
+                self.add_to_batch(gv_lines, output_filename, gv_filename)
+            return
+        # Includes the time taken by the renderer
+        with profiler.stage("render"):
+            run_cmds = print_diagram(gv_lines=gv_lines,
+                                     output_filename=output_filename,
                                      renderer=self.renderer,
-                                     output_format=self.output_format)
+                                     output_format=self.output_format,
+                                     gv_filename=gv_filename)
         if self.write_gv:
             log.info("To re-run:")
             log.info('\n'.join(run_cmds))
 
-
     def add_display_attr(self, event, fancy):
         """Add display attribute to graph, nodes & edges
 
@@ -110,61 +202,84 @@ class DotPrinter(object):
             edge_data["attr"] = self.edge_attr_gen.gv_str(edge_data, fancy)
 
 
-def construct_gv_full(event):
-    """Turn event graph into Graphviz string in DOT language
+def iter_gv_lines(event):
+    """Generate the Graphviz description of the event graph in DOT language, line by line.
+
+    Only the graph-wide attributes are filled in with any info from the event
+    (e.g. ``${event_num}``), using string.Template.
 
     Parameters
     ----------
     event : Event
 
-    Returns
-    -------
+    Yields
+    ------
     str
+        Each line of the description, without a newline
     """
     graph = event.graph
 
     # Header-type info with graph-wide settings
-    gv_str = ["digraph g {"]
-    gv_str.append("{attr}".format(**graph.graph))
+    yield "digraph g {"
+    yield Template("{attr}".format(**graph.graph)).safe_substitute(event.__dict__)
 
     # Write all the nodes to file, with their display attributes
     for node, node_data in graph.nodes_iter(data=True):
-        gv_str.append("{0} {attr};".format(node, **node_data))
+        yield "{0} {attr};".format(node, **node_data)
 
     # Write all the edges to file, with their display attributes
     for out_node, in_node, edge_data in graph.edges_iter(data=True):
-        gv_str.append("{0} -> {1} {attr};".format(out_node, in_node, **edge_data))
+        yield "{0} -> {1} {attr};".format(out_node, in_node, **edge_data)
 
     # Set all initial particles to be level in diagram
-    initial = ' '.join([str(node) for node, node_data
-                        in graph.nodes_iter(data=True)
-                        if len(graph.predecessors(node)) == 0])
-    gv_str.append("{{rank=same; {0} }}; "
-                    "// initial particles on same level".format(initial))
-    gv_str.append("}")
-    gv_str = "\n".join(gv_str)
+    initial = ' '.join([str(node) for node in graph.nodes_iter() if not graph.pred[node]])
+    yield "{{rank=same; {0} }}; // initial particles on same level".format(initial)
+    yield "}"
+
+
+def construct_gv_full(event):
+    """Turn event graph into Graphviz string in DOT language
 
-    # Fill in template with any data
-    gv_str = Template(gv_str).safe_substitute(event.__dict__)
+    For large events, prefer iter_gv_lines() to avoid holding the whole string in memory.
 
-    return gv_str
+    Parameters
+    ----------
+    event : Event
+
+    Returns
+    -------
+    str
+    """
+    return "\n".join(iter_gv_lines(event))
 
 
-def write_gv(gv_str, gv_filename):
-    """Write event graph to file in Graphviz format"""
+def write_gv(gv_lines, gv_filename):
+    """Write event graph to file in Graphviz format
 
+    Parameters
+    ----------
+    gv_lines : iterable[str]
+        Graph contents in DOT language, from iter_gv_lines()
+    gv_filename : str
+        Output filename
+    """
     log.info("Writing Graphviz file to %s", gv_filename)
     with open(gv_filename, "w") as gv_file:
-        gv_file.write(gv_str)
+        for line in gv_lines:
+            gv_file.write(line)
+            gv_file.write("\n")
 
 
-def print_diagram(gv_str, output_filename, renderer, output_format):
+def print_diagram(gv_lines, output_filename, renderer, output_format, gv_filename=None):
     """Pass graph in DOT language to a Graphviz program to produce a diagram.
 
+    The lines are written to the renderer as they are generated,
+    so the full description is never held in memory.
+
     Parameters
     ----------
-    gv_str : str
-        Graph contents in DOT language
+    gv_lines : iterable[str]
+        Graph contents in DOT language, e.g. from iter_gv_lines()
 
     output_filename : str
         Final diagram filename
@@ -179,46 +294,215 @@ def print_diagram(gv_str, output_filename, renderer, output_format):
         * ps2 - PDF searchable, but won't obey all HTML tags or unicode.
         * pdf - obeys HTML but not searchable
 
+    gv_filename : str, optional
+        If set, also write the graph contents to this file.
+        It is always written in full, even if the renderer fails.
+
     Returns
     -------
     list[str]
-        List of commands run to produce diagram from graphviz file
+        List of commands to produce the diagram from the Graphviz file
     """
     if output_format is None:
         raise RuntimeError("Need an output format for graphviz")
 
     log.info("Printing diagram to %s", output_filename)
+    if gv_filename:
+        log.info("Writing Graphviz file to %s", gv_filename)
+    run_cmds = []
+
+    dot_format, dot_filename = get_renderer_output(output_filename, output_format)
+    dot_args = [renderer, "-T" + dot_format, "-o", dot_filename]
+    # The description is piped to the renderer, so to re-run it needs the Graphviz file
+    run_cmds.append(" ".join(dot_args + ([gv_filename] if gv_filename else [])))
+    # stderr goes to a file, as the renderer could fill a pipe while we are still writing
+    with tempfile.TemporaryFile() as err_file:
+        p = Popen(dot_args, stdin=PIPE, stderr=err_file)
+        gv_file = open(gv_filename, "w") if gv_filename else None
+        try:
+            renderer_input = p.stdin
+            for line in gv_lines:
+                if gv_file:
+                    gv_file.write(line)
+                    gv_file.write("\n")
+                if renderer_input:
+                    try:
+                        renderer_input.write(line.encode())
+                        renderer_input.write(b"\n")
+                    except (IOError, OSError) as err:
+                        # Renderer has quit early, e.g. parsing error: keep writing the gv file
+                        if err.errno not in (errno.EPIPE, errno.EINVAL):
+                            raise
+                        renderer_input = None
+            close_pipe(p.stdin)
+        finally:
+            if gv_file:
+                gv_file.close()
+        p.wait()
+        if p.returncode != 0:
+            err_file.seek(0)
+            raise RuntimeError(err_file.read())
+
+    run_cmds.extend(convert_ps_output(dot_filename, output_filename))
+    return run_cmds
+
+
+def close_pipe(pipe):
+    """Close a pipe to a subprocess, ignoring errors if the subprocess has already quit."""
+    try:
+        pipe.close()
+    except (IOError, OSError) as err:
+        if err.errno not in (errno.EPIPE, errno.EINVAL):
+            raise
+
+
+def render_gv_files(diagrams, renderer, output_format):
+    """Produce diagrams from several Graphviz files with one run of a Graphviz program.
+
+    The files are all passed to the renderer with the -O option, so it writes each diagram
+    next to its graph file (e.g. 0.gv -> 0.gv.pdf). These are then moved to their final filenames.
+    Each Graphviz file should therefore be in a directory with nothing else named like it.
+
+    If the renderer fails, the files are rendered again one at a time,
+    so that the error says which diagrams failed, and all the others are still made.
+
+    Parameters
+    ----------
+    diagrams : list[(str, str)]
+        Graphviz filename, and final diagram filename, for each diagram.
+
+    renderer : str
+        Graphviz program to use
+
+    output_format : str
+        Output format, see print_diagram()
+
+    Returns
+    -------
+    list[str]
+        List of commands to produce each diagram from its Graphviz file
+
+    Raises
+    ------
+    RuntimeError
+        If the renderer fails for any of the diagrams
+    """
+    if output_format is None:
+        raise RuntimeError("Need an output format for graphviz")
+
+    log.info("Printing %d diagrams", len(diagrams))
+    dot_format, _ = get_renderer_output("", output_format)
+    gv_filenames = [gv_filename for gv_filename, _ in diagrams]
+    dot_args = [renderer, "-T" + dot_format, "-O"] + gv_filenames
+    p = Popen(dot_args, stdin=PIPE, stderr=PIPE)
+    out, err = p.communicate()
+    if p.returncode != 0:
+        if len(diagrams) == 1:
+            raise RuntimeError(err)
+        return render_gv_files_separately(diagrams, renderer, output_format)
+
+    run_cmds = []
+    for gv_filename, output_filename in diagrams:
+        # The renderer adds the format to the filename, e.g. 0.gv.pdf, 0.gv.cairo.ps
+        rendered = glob.glob(gv_filename + ".*")
+        if len(rendered) != 1:
+            raise RuntimeError("Cannot find renderer output for %s" % output_filename)
+        log.info("Printing diagram to %s", output_filename)
+        _, dot_filename = get_renderer_output(output_filename, output_format)
+        shutil.move(rendered[0], dot_filename)
+        run_cmds.append(" ".join([renderer, "-T" + dot_format, "-o", dot_filename, gv_filename]))
+        run_cmds.extend(convert_ps_output(dot_filename, output_filename))
+
+    return run_cmds
+
+
+def render_gv_files_separately(diagrams, renderer, output_format):
+    """Produce diagrams from several Graphviz files with one run of a Graphviz program each.
+
+    Used when rendering them all at once fails, to find which diagrams are bad.
+
+    Parameters
+    ----------
+    diagrams : list[(str, str)]
+        Graphviz filename, and final diagram filename, for each diagram.
+    renderer : str
+        Graphviz program to use
+    output_format : str
+        Output format, see print_diagram()
+
+    Returns
+    -------
+    list[str]
+        List of commands to produce each diagram from its Graphviz file
+
+    Raises
+    ------
+    RuntimeError
+        If the renderer fails for any of the diagrams, naming them all
+    """
+    log.warning("Rendering %d diagrams together failed, rendering them one at a time",
+                len(diagrams))
     run_cmds = []
+    errors = []
+    for diagram in diagrams:
+        try:
+            run_cmds.extend(render_gv_files([diagram], renderer, output_format))
+        except RuntimeError as err:
+            errors.append("Rendering %s failed: %s" % (diagram[1], err))
+    if errors:
+        raise RuntimeError("\n".join(errors))
+    return run_cmds
 
+
+def get_renderer_output(output_filename, output_format):
+    """Get the Graphviz output format, and the file the renderer should write to.
+
+    The ps & ps2 formats make a PostScript file, which is then converted to PDF
+    by convert_ps_output() if necessary.
+
+    Parameters
+    ----------
+    output_filename : str
+        Final diagram filename
+
+    output_format : str
+        Output format, see print_diagram()
+
+    Returns
+    -------
+    str, str
+        Graphviz output format (for the -T option), and the renderer's output filename
+    """
     if output_format == "ps" or output_format == "ps2":
-        # Do 2 stages: make a PostScript file, then convert to PDF.
         ps_filename = os.path.splitext(output_filename)[0] + ".ps"
-
         if output_format == "ps":  # hmm or should we get user to do this
             output_format += ":cairo"
+        return output_format, ps_filename
+    return output_format, output_filename
 
-        dot_args = [renderer, "-T" + output_format, "-o", ps_filename]
-        run_cmds.append(" ".join(dot_args))
-        p = Popen(dot_args, stdin=PIPE, stderr=PIPE)
-        out, err = p.communicate(input=gv_str.encode())
-        if p.returncode != 0:
-            raise RuntimeError(err)
 
-        if output_filename.endswith(".pdf"):
-            pdfargs = ["ps2pdf", ps_filename, output_filename]
-            run_cmds.append(' '.join(pdfargs))
-            call(pdfargs)
+def convert_ps_output(dot_filename, output_filename):
+    """Convert the renderer's PostScript output to the final PDF, if needed.
 
-            rmargs = ["rm", ps_filename]
-            run_cmds.append(' '.join(rmargs))
-            call(rmargs)
+    Parameters
+    ----------
+    dot_filename : str
+        Renderer output filename, from get_renderer_output()
 
-    elif output_format is not None:
-        dot_args = [renderer, "-T" + output_format, "-o", output_filename]
-        run_cmds.append(' '.join(dot_args))
-        p = Popen(dot_args, stdin=PIPE, stderr=PIPE)
-        out, err = p.communicate(input=gv_str.encode())
-        if p.returncode != 0:
-            raise RuntimeError(err)
+    output_filename : str
+        Final diagram filename
+
+    Returns
+    -------
+    list[str]
+        List of commands run
+    """
+    run_cmds = []
+    if dot_filename != output_filename and output_filename.endswith(".pdf"):
+        pdfargs = ["ps2pdf", dot_filename, output_filename]
+        run_cmds.append(' '.join(pdfargs))
+        call(pdfargs)
 
+        run_cmds.append(' '.join(["rm", dot_filename]))
+        os.remove(dot_filename)
     return run_cmds
@@ -0,0 +1,310 @@
+"""Collapse parts of large graphs into clusters, so the webpage stays usable.
+
+Each cluster is a set of graph nodes, drawn as a single node in the webpage
+until the user expands it. Clusters are only made if the graph has more elements
+(nodes + edges) than a given budget, in this order, until it fits:
+
+1. Everything produced by a hadronisation string or cluster (PDGID 92 or 91).
+2. Long chains of the same particle, e.g. kept with ``--redundants``.
+3. Everything below a certain number of generations from the initial particles.
+
+Steps 1 & 2 collapse the biggest clusters first, step 3 cuts as deep as possible.
+This works in either representation, since it only groups nodes.
+"""
+
+
+from __future__ import absolute_import
+from collections import deque
+from pythiaplotter.utils.logging_config import get_logger
+
+
+log = get_logger(__name__)
+
+
+# PDGIDs of particles whose descendants are hadronisation products
+HADRONISATION_PDGIDS = (91, 92)
+
+
+def find_clusters(graph, max_elements, min_chain_length=3):
+    """Find clusters of nodes to collapse, so the graph is drawn with at most `max_elements`.
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+    max_elements : int
+        Maximum number of nodes + edges to draw.
+    min_chain_length : int, optional
+        Minimum number of nodes in a chain of the same particle for it to be collapsed.
+
+    Returns
+    -------
+    list[set]
+        Nodes in each cluster. Each node is in at most one cluster.
+    """
+    num_elements = graph.number_of_nodes() + graph.number_of_edges()
+    if num_elements <= max_elements:
+        return []
+
+    clusters = []
+    clustered = set()
+    candidates = sorted(get_hadronisation_clusters(graph), key=len, reverse=True)
+    candidates += sorted(get_chain_clusters(graph, min_chain_length), key=len, reverse=True)
+    for members in candidates:
+        if num_elements <= max_elements:
+            break
+        if len(members) < 2 or not clustered.isdisjoint(members):
+            continue
+        clusters.append(members)
+        clustered.update(members)
+        # Upper bound: edges between the cluster & the same outside node get merged as well
+        num_elements -= len(members) - 1 + count_internal_edges(graph, members)
+
+    if num_elements > max_elements:
+        clusters = get_depth_clusters(graph, clusters, max_elements)
+
+    log.info("Collapsed %d nodes into %d clusters",
+             sum(len(members) for members in clusters), len(clusters))
+    return clusters
+
+
+def get_particle_pdgid(data):
+    """Get the PDGID of the particle in a node/edge's data dict, or None if there isn't one."""
+    particle = data.get('particle')
+    return None if particle is None else particle.pdgid
+
+
+def iter_edge_data(graph, node, successors=True):
+    """Iterate over the data dicts of all edges out of (or into) a node."""
+    neighbours = graph.succ[node] if successors else graph.pred[node]
+    for keydict in neighbours.values():
+        for data in keydict.values():
+            yield data
+
+
+def get_hadronisation_clusters(graph):
+    """Get the descendants of each hadronisation string or cluster.
+
+    In NODE representation, these are the descendants of the string node,
+    in EDGE representation the descendants of the node the string edge goes into.
+    The string itself stays visible.
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+
+    Returns
+    -------
+    list[set]
+    """
+    roots = []
+    for node, node_data in graph.nodes_iter(data=True):
+        if get_particle_pdgid(node_data) in HADRONISATION_PDGIDS:
+            roots.append(node)
+        elif any(get_particle_pdgid(edge_data) in HADRONISATION_PDGIDS
+                 for edge_data in iter_edge_data(graph, node, successors=False)):
+            roots.append(node)
+    return [get_descendants(graph, root) for root in roots]
+
+
+def get_descendants(graph, node):
+    """Get all the descendants of a node (not including itself)."""
+    descendants = set()
+    queue = deque([node])
+    while queue:
+        for child in graph.succ[queue.popleft()]:
+            if child not in descendants and child != node:
+                descendants.add(child)
+                queue.append(child)
+    return descendants
+
+
+def get_chain_clusters(graph, min_chain_length):
+    """Get chains of the same particle, each with only one parent & child.
+
+    In NODE representation, a node is in a chain if its parent and child are the same particle
+    as itself. In EDGE representation, a node is in a chain if its incoming & outgoing edges
+    are the same particle. The ends of the chain stay visible.
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+    min_chain_length : int
+        Minimum number of nodes in a chain.
+
+    Returns
+    -------
+    list[set]
+    """
+    def _chain_pdgid(node):
+        """PDGID of the particle passing through a node, or None if it isn't part of a chain."""
+        if len(graph.pred[node]) != 1 or len(graph.succ[node]) != 1:
+            return None
+        edges_in = list(iter_edge_data(graph, node, successors=False))
+        edges_out = list(iter_edge_data(graph, node))
+        if len(edges_in) != 1 or len(edges_out) != 1:
+            return None
+        if 'particle' in graph.node[node]:
+            parent, child = next(iter(graph.pred[node])), next(iter(graph.succ[node]))
+            pdgids = [get_particle_pdgid(graph.node[n]) for n in (parent, node, child)]
+        else:
+            pdgids = [get_particle_pdgid(edges_in[0]), get_particle_pdgid(edges_out[0])]
+        return pdgids[0] if pdgids[0] is not None and len(set(pdgids)) == 1 else None
+
+    chain_pdgids = {}
+    for node in graph.nodes_iter():
+        pdgid = _chain_pdgid(node)
+        if pdgid is not None:
+            chain_pdgids[node] = pdgid
+
+    chains = []
+    for node, pdgid in chain_pdgids.items():
+        parent = next(iter(graph.pred[node]))
+        if chain_pdgids.get(parent) == pdgid:
+            continue  # not the start of a chain
+        chain = [node]
+        child = next(iter(graph.succ[node]))
+        while chain_pdgids.get(child) == pdgid and child != node:
+            chain.append(child)
+            child = next(iter(graph.succ[child]))
+        if len(chain) >= min_chain_length:
+            chains.append(set(chain))
+    return chains
+
+
+def get_depth_clusters(graph, clusters, max_elements):
+    """Collapse everything below the deepest generation that keeps the graph within budget.
+
+    Each node at the cut depth keeps its (breadth-first) descendants in a cluster.
+    Any existing cluster that overlaps with one of these is merged into it.
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+    clusters : list[set]
+        Existing clusters.
+    max_elements : int
+
+    Returns
+    -------
+    list[set]
+        Updated clusters.
+    """
+    # Breadth-first search from the initial nodes for the generation of each node
+    depths = {}
+    bfs_parents = {}
+    order = []
+    queue = deque()
+    for node in graph.nodes_iter():
+        if not graph.pred[node]:
+            depths[node] = 0
+            queue.append(node)
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for child in graph.succ[node]:
+            if child not in depths:
+                depths[child] = depths[node] + 1
+                bfs_parents[child] = node
+                queue.append(child)
+    if not order:
+        return clusters
+
+    def _clusters_at(depth):
+        heads = {}
+        for node in order:
+            if depths[node] == depth + 1:
+                heads[node] = bfs_parents[node]
+            elif depths[node] > depth + 1:
+                heads[node] = heads[bfs_parents[node]]
+        groups = {}
+        for node in order:
+            if node in heads:
+                groups.setdefault(heads[node], set()).add(node)
+        return merge_clusters([members for members in groups.values() if len(members) > 1]
+                              + clusters)
+
+    # Fewer generations drawn means fewer elements, so search for the deepest cut that fits
+    low, high = 0, max(depths.values()) - 1
+    best = _clusters_at(low)
+    while low <= high:
+        mid = (low + high) // 2
+        mid_clusters = _clusters_at(mid)
+        if count_elements(graph, mid_clusters) <= max_elements:
+            best = mid_clusters
+            low = mid + 1
+        else:
+            high = mid - 1
+    if count_elements(graph, best) > max_elements:
+        log.warning("Cannot collapse graph into fewer than %d elements", max_elements)
+    return best
+
+
+def merge_clusters(clusters):
+    """Merge any overlapping clusters, so each node is in only one.
+
+    Parameters
+    ----------
+    clusters : list[set]
+
+    Returns
+    -------
+    list[set]
+    """
+    # Union-find on the cluster indices
+    parents = list(range(len(clusters)))
+
+    def _find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    owners = {}
+    for i, members in enumerate(clusters):
+        for node in members:
+            if node in owners:
+                parents[_find(i)] = _find(owners[node])
+            else:
+                owners[node] = i
+
+    merged = {}
+    for i, members in enumerate(clusters):
+        merged.setdefault(_find(i), set()).update(members)
+    return [merged[i] for i in sorted(merged)]
+
+
+def count_internal_edges(graph, members):
+    """Count the edges between nodes in a cluster."""
+    return sum(len(keydict) for node in members
+               for child, keydict in graph.succ[node].items() if child in members)
+
+
+def count_elements(graph, clusters):
+    """Count the number of nodes & edges drawn once the clusters are collapsed.
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+    clusters : list[set]
+
+    Returns
+    -------
+    int
+    """
+    cluster_of = {}
+    for i, members in enumerate(clusters):
+        for node in members:
+            cluster_of[node] = i
+
+    num_nodes = graph.number_of_nodes() - len(cluster_of) + len(clusters)
+    num_edges = 0
+    cluster_edges = set()
+    for out_node, in_node in graph.edges_iter():
+        if out_node not in cluster_of and in_node not in cluster_of:
+            num_edges += 1
+            continue
+        out_node = ("cluster", cluster_of[out_node]) if out_node in cluster_of else out_node
+        in_node = ("cluster", cluster_of[in_node]) if in_node in cluster_of else in_node
+        if out_node != in_node:
+            cluster_edges.add((out_node, in_node))
+    return num_nodes + num_edges + len(cluster_edges)
@@ -5,22 +5,40 @@ but we still use graphviz to do the layout for (a) parity with the PDF version,
 (b) because it is faster, whereas web pages (so far) crash.
 
 Of course if I could find a graphviz-as-as-JS service, that would be cooler...
+
+The node & edge data is stored in a compact columnar format (see create_vis_data()),
+then gzipped and base64-encoded (see encode_vis_data()). This is either put directly in
+the webpage, or in a separate javascript file alongside it, and decoded by the webpage.
 """
 
 
 from __future__ import absolute_import, print_function
+import io
+import os
 import json
+import math
+import gzip
+import base64
+from io import BytesIO
 from string import Template
 from subprocess import PIPE, Popen
 from pkg_resources import resource_filename
 from pythiaplotter.utils.logging_config import get_logger
 from pythiaplotter.utils.common import generate_repr_str
-from pythiaplotter.utils.pdgid_converter import pdgid_to_string
+from pythiaplotter.utils.cache import DiskCache, make_key
+from pythiaplotter.utils.profiling import profiler, record_graph_size
+from .web_clustering import find_clusters
 
 
 log = get_logger(__name__)
 
 
+try:
+    string_types = basestring  # python 2
+except NameError:
+    string_types = str
+
+
 class VisPrinter(object):
 
     def __init__(self, opts):
@@ -38,49 +56,106 @@ class VisPrinter(object):
             Graphviz program to use for rendering layout, default is dot since dealing with DAGs
         graph_opts : dict
             Dict of Graphviz attributes for the whole graph (e.g. direction, nodesep)
+        layout_cache : DiskCache
+            Cache of node positions from previous layouts, to avoid re-running the renderer.
+            None if the user doesn't want to use the cache.
+        separate_data : bool
+            If True, write the event data to a separate javascript file next to the webpage,
+            instead of inside the webpage.
+        max_elements : int
+            Maximum number of nodes + edges to draw at first. Larger graphs have parts
+            collapsed into clusters, which can be expanded in the webpage. 0 for no limit.
         """
         self.output_filename = opts.output
         self.renderer = opts.layout
         self.graph_opts = opts.GRAPH_OPTS
-        # self.pythia_statusfile = 'particledata/pythia6status.json' if opts.inputFormat == "CMSSW" else
+        self.layout_cache = None if opts.noCache else DiskCache("layouts")
+        self.separate_data = opts.webDataFile
+        self.max_elements = opts.webMaxElements
 
     def __repr__(self):
         return generate_repr_str(self)
 
-    def print_event(self, event):
+    def print_event(self, event, output_filename=None):
         """Calculate layout, add to graph nodes, and make website file for this event.
 
         Parameters
         ----------
         event : Event
+        output_filename : str, optional
+            Web page filename. If unset, uses the output filename from the user options.
         """
 
-        gv_str = construct_gv_only_edges(event.graph, self.graph_opts)
+        # Includes the time taken by the renderer, if the layout isn't cached
+        with profiler.stage("layout") as stage:
+            gv_str = construct_gv_only_edges(event.graph, self.graph_opts)
+            positions = self.get_layout(gv_str)
+            add_node_positions(event.graph, positions)
+            record_graph_size(stage, event.graph)
 
-        raw_json = get_dot_json(gv_str, self.renderer)
+        output_filename = output_filename or self.output_filename
 
-        add_node_positions(event.graph, raw_json)
+        clusters = None
+        if self.max_elements > 0:
+            with profiler.stage("clusters") as stage:
+                clusters = find_clusters(event.graph, self.max_elements)
+                stage.counts["clusters"] = len(clusters)
 
-        vis_node_dicts, vis_edge_dicts = create_vis_dicts(event.graph)
+        with profiler.stage("data") as stage:
+            vis_data = encode_vis_data(create_vis_data(event.graph, clusters))
+            stage.counts["bytes"] = len(vis_data)
 
         pythia8status_file = resource_filename('pythiaplotter',
-                                               'particledata/pythia6status.json')
+                                               'particledata/pythia8status.json')
         with open(pythia8status_file) as f:
             pythia8status = f.read()
 
-        dkwargs = dict(indent=None, sort_keys=True)
-
         field_data = dict(
             title=event.title,
             inputfile=event.source,
             eventnum=event.event_num,
-            nodedata=json.dumps(vis_node_dicts, **dkwargs),
-            edgedata=json.dumps(vis_edge_dicts, **dkwargs),
             pythia8status=pythia8status
         )
 
-        # create new webpage
-        write_webpage(field_data, self.output_filename)
+        with profiler.stage("write"):
+            if self.separate_data:
+                data_filename = os.path.splitext(output_filename)[0] + "_data.js"
+                write_vis_data_file(vis_data, data_filename)
+                field_data['datascript'] = '<script type="text/javascript" src="%s"></script>' \
+                                           % os.path.basename(data_filename)
+            else:
+                field_data['datascript'] = ('<script type="text/javascript">'
+                                            'var visData = "%s";</script>' % vis_data)
+
+            # create new webpage
+            write_webpage(field_data, output_filename)
+
+    def get_layout(self, gv_str):
+        """Get the node positions for a graph, from the cache if it has been done before.
+
+        The layout only depends on the graph edges & attributes in `gv_str`, and the renderer,
+        so changing labels or styling doesn't need a new layout.
+
+        Parameters
+        ----------
+        gv_str : str
+            Graph in DOT language, from construct_gv_only_edges()
+
+        Returns
+        -------
+        list[[int, float, float]]
+            Barcode, x, y for each node
+        """
+        if self.layout_cache is None:
+            return get_node_positions(get_dot_json(gv_str, self.renderer))
+        key = make_key(self.renderer, gv_str)
+        positions = self.layout_cache.get(key)
+        if positions is not None:
+            log.debug("Using cached layout %s", key)
+            return positions
+        positions = get_node_positions(get_dot_json(gv_str, self.renderer))
+        self.layout_cache.set(key, positions)
+        return positions
 
 
 def construct_gv_only_edges(graph, graph_attr=None):
@@ -137,82 +212,232 @@ def get_dot_json(graphviz_str, renderer="dot"):
     return out.decode()
 
 
-def add_node_positions(graph, raw_json):
-    """Update graph nodes with their positions, using info in `raw_json`.
+def get_node_positions(raw_json):
+    """Get the node positions from the renderer's JSON output.
 
     Parameters
     ----------
-    graph : NetworkX.MultiDiGraph
-        Graph to be updated
     raw_json : str
         JSON with nodes & their positions
+
+    Returns
+    -------
+    list[[int, float, float]]
+        Barcode, x, y for each node
     """
     gv_dict = json.loads(raw_json)
 
-    # add node positions.
+    positions = []
     for obj in gv_dict['objects']:
         # skip not proper nodes
         if 'nodes' in obj:
             continue
         barcode = int(obj['name'])
         x, y = obj['pos'].split(',')
-        x, y = float(x), float(y)
+        positions.append([barcode, float(x), float(y)])
+    return positions
+
+
+def add_node_positions(graph, positions):
+    """Update graph nodes with their positions.
+
+    Parameters
+    ----------
+    graph : NetworkX.MultiDiGraph
+        Graph to be updated
+    positions : list[[int, float, float]]
+        Barcode, x, y for each node, from get_node_positions()
+    """
+    for barcode, x, y in positions:
         graph.node[barcode]['pos'] = (x, y)
 
 
-def create_vis_dicts(graph):
-    """Create list of dicts for nodes & edges suitable for input to vis.js
+def create_vis_data(graph, clusters=None):
+    """Create the node & edge data for vis.js, in a compact columnar format.
+
+    Nodes & edges are each stored as a table from make_columns(), with a list of values
+    per field. Strings (e.g. particle names) are stored as indices into a shared list
+    of unique strings, ``"strings"``. Floats are rounded to 3 significant figures.
 
-    This includes node position, label, hover info, etc
+    Nodes in clusters are stored separately in ``"clusterNodes"``, along with the id of their
+    cluster. Any edges to or from them are stored in ``"clusterEdges"``. The webpage then
+    draws each cluster as one node, from ``"clusters"``, until it is expanded.
+
+    Labels, tooltips, etc are made by the webpage itself.
 
     Parameters
     ----------
     graph : NetworkX.MultiDiGraph
 
+    clusters : list[set], optional
+        Nodes in each cluster, e.g. from web_clustering.find_clusters()
+
     Returns
     -------
-    list[dict], list[dict]
-        Lists of dicts corresponding to (nodes, edges)
+    dict
+        ``{"nodes": {...}, "edges": {...}, "clusters": {...}, "clusterNodes": {...},
+        "clusterEdges": {...}, "strings": [...]}``
     """
-    def _generate_particle_opts(particle):
-        pd = {
-            'label': pdgid_to_string(particle.pdgid),
-            'name': pdgid_to_string(particle.pdgid),
-            'title': "",  # does tooltip, control in webpage itself
-            'group': "default"
-        }
-        attr = particle.__dict__
-        for k, v in attr.items():
-            if isinstance(v, float):
-                attr[k] = "%.3g" % v
-        pd.update(**attr)
-        if particle.initial_state:
-            pd['group'] = 'initial'
-        if particle.final_state:
-            pd['group'] = 'final'
-        pd['originalGroup'] = pd['group']
-        return pd
-
-    node_dicts = []
+    cluster_of = {}
+    cluster_rows = []
+    for i, members in enumerate(clusters or []):
+        cluster_id = "cluster%d" % i
+        for node in members:
+            cluster_of[node] = cluster_id
+        positions = [graph.node[node]['pos'] for node in members]
+        num_particles = sum(1 for node in members if 'particle' in graph.node[node])
+        num_particles += sum(1 for node in members
+                             for child, keydict in graph.succ[node].items() if child in members
+                             for edge_data in keydict.values() if 'particle' in edge_data)
+        cluster_rows.append({
+            'id': cluster_id,
+            'x': sum(x for x, _ in positions) / len(positions),
+            'y': sum(y for _, y in positions) / len(positions),
+            'particles': num_particles
+        })
+
+    node_rows, cluster_node_rows = [], []
     for node, node_data in graph.nodes_iter(data=True):
-        nd = {
-            "id": node,
-            "label": "",
-            "x": node_data['pos'][0],
-            "y": node_data['pos'][1]
-        }
-        if 'particle' in node_data:
-            nd.update(_generate_particle_opts(node_data['particle']))
-        node_dicts.append(nd)
-
-    edge_dicts = []
+        row = get_vis_particle_fields(node_data.get('particle'))
+        row['id'] = node
+        row['x'], row['y'] = node_data['pos']
+        if node in cluster_of:
+            row['cluster'] = cluster_of[node]
+            cluster_node_rows.append(row)
+        else:
+            node_rows.append(row)
+
+    edge_rows, cluster_edge_rows = [], []
     for out_vtx, in_vtx, edge_data in graph.edges_iter(data=True):
-        ed = {"from": out_vtx, "to": in_vtx}
-        if 'particle' in edge_data:
-            ed.update(_generate_particle_opts(edge_data['particle']))
-        edge_dicts.append(ed)
+        row = get_vis_particle_fields(edge_data.get('particle'))
+        row['from'] = out_vtx
+        row['to'] = in_vtx
+        if out_vtx in cluster_of or in_vtx in cluster_of:
+            cluster_edge_rows.append(row)
+        else:
+            edge_rows.append(row)
+
+    strings = {}
+    vis_data = {
+        "nodes": make_columns(node_rows, strings),
+        "edges": make_columns(edge_rows, strings),
+        "clusters": make_columns(cluster_rows, strings),
+        "clusterNodes": make_columns(cluster_node_rows, strings),
+        "clusterEdges": make_columns(cluster_edge_rows, strings),
+    }
+    vis_data["strings"] = sorted(strings, key=strings.get)
+    return vis_data
+
+
+def get_vis_particle_fields(particle):
+    """Get a dict of the particle's fields to show on the webpage.
+
+    The particle itself isn't modified.
+
+    Parameters
+    ----------
+    particle : Particle or None
+
+    Returns
+    -------
+    dict
+        Empty if `particle` is None
+    """
+    if particle is None:
+        return {}
+    fields = particle.as_dict()
+    fields['group'] = "default"
+    if fields.pop('initial_state'):
+        fields['group'] = 'initial'
+    if fields.pop('final_state'):
+        fields['group'] = 'final'
+    for k, v in fields.items():
+        if isinstance(v, float):
+            # JSON can't store inf/nan, so keep those as strings
+            fields[k] = str(v) if math.isinf(v) or math.isnan(v) else float("%.3g" % v)
+    return fields
+
+
+def make_columns(rows, strings):
+    """Convert a list of dicts into a dict of lists, with None for missing values.
+
+    Fields where all the values are strings are stored as indices into a string table.
+
+    Parameters
+    ----------
+    rows : list[dict]
+        Data for each node or edge.
+    strings : dict[str, int]
+        Index of each unique string in the string table, to be updated.
+
+    Returns
+    -------
+    dict
+        ``{"length": number of rows, "columns": {field name: list of values},
+        "stringFields": [names of fields stored in the string table]}``
+    """
+    field_names = set()
+    for row in rows:
+        field_names.update(row)
+
+    columns = {}
+    string_fields = []
+    for field in sorted(field_names):
+        column = [row.get(field) for row in rows]
+        values = [v for v in column if v is not None]
+        if values and all(isinstance(v, string_types) for v in values):
+            column = [None if v is None else strings.setdefault(v, len(strings))
+                      for v in column]
+            string_fields.append(field)
+        columns[field] = column
+    return {"length": len(rows), "columns": columns, "stringFields": string_fields}
+
+
+def encode_vis_data(vis_data):
+    """Encode the data from create_vis_data() as gzipped JSON, in base64.
+
+    Parameters
+    ----------
+    vis_data : dict
+
+    Returns
+    -------
+    str
+    """
+    json_str = json.dumps(vis_data, separators=(",", ":"), sort_keys=True)
+    buf = BytesIO()
+    # mtime=0 so the same event always gives the same output
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6, mtime=0) as f:
+        f.write(json_str.encode("utf-8"))
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def decode_vis_data(encoded_data):
+    """Decode data from encode_vis_data(), like the webpage does.
+
+    Parameters
+    ----------
+    encoded_data : str
+
+    Returns
+    -------
+    dict
+    """
+    json_str = gzip.GzipFile(fileobj=BytesIO(base64.b64decode(encoded_data))).read()
+    return json.loads(json_str.decode("utf-8"))
+
 
-    return node_dicts, edge_dicts
+def write_vis_data_file(encoded_data, data_filename):
+    """Write the data from encode_vis_data() as a javascript file, to be loaded by the webpage.
+
+    Parameters
+    ----------
+    encoded_data : str
+    data_filename : str
+    """
+    with open(data_filename, "w") as f:
+        f.write('var visData = "%s";\n' % encoded_data)
+    log.info("Webpage data written to %s", data_filename)
 
 
 def write_webpage(field_data, output_filename):
@@ -227,12 +452,12 @@ def write_webpage(field_data, output_filename):
     """
     template_file = resource_filename('pythiaplotter',
                                       'printers/templates/vis_template.html')
-    with open(template_file, "r") as f:
+    with io.open(template_file, "r", encoding="utf-8") as f:
         template = f.read()
 
     template = Template(template).safe_substitute(field_data)
 
-    with open(output_filename, 'w') as f:
+    with io.open(output_filename, 'w', encoding="utf-8") as f:
         f.write(template)
 
     log.info("Webpage written to %s", output_filename)
@@ -0,0 +1,156 @@
+"""Simple persistent cache, to save results of slow operations between runs.
+
+Each entry is stored as a file in the cache directory, named by its key.
+By default entries are JSON, subclasses can store them in other formats.
+Keys are normally made by hashing all the inputs to the operation with make_key().
+When the cache gets too big, the least recently used entries are removed.
+
+The cache lives in ``$XDG_CACHE_HOME/pythiaplotter`` (default ``~/.cache/pythiaplotter``).
+Failure to read or write the cache is never fatal, the result is just recalculated.
+"""
+
+
+from __future__ import absolute_import
+import os
+import json
+import hashlib
+from pythiaplotter.utils.logging_config import get_logger
+
+
+log = get_logger(__name__)
+
+
+def get_cache_dir():
+    """Get the top directory for all PythiaPlotter caches."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"),
+                                                                  ".cache")
+    return os.path.join(cache_home, "pythiaplotter")
+
+
+def make_key(*parts):
+    """Make a cache key by hashing all the strings in `parts`."""
+    sha = hashlib.sha1()
+    for part in parts:
+        sha.update(part.encode("utf-8"))
+        sha.update(b"\0")  # so ("ab", "c") and ("a", "bc") give different keys
+    return sha.hexdigest()
+
+
+class DiskCache(object):
+    """Persistent key: value store, with least-recently-used eviction once over a size limit.
+
+    Subclasses can store values in a different format by overriding
+    ``extension``, encode() and decode().
+    """
+
+    extension = ".json"
+
+    def __init__(self, name, max_size=50 * 1024 * 1024, directory=None):
+        """
+        Parameters
+        ----------
+        name : str
+            Name of this cache, used as its subdirectory name.
+        max_size : int, optional
+            Maximum total size of all the entries, in bytes.
+        directory : str, optional
+            Top cache directory. Defaults to get_cache_dir()
+        """
+        self.directory = os.path.join(directory or get_cache_dir(), name)
+        self.max_size = max_size
+        # Total size of the entries, as far as we know. None until the directory is first scanned
+        self._size = None
+
+    def __repr__(self):
+        return "{0}(directory={1!r}, max_size={2})".format(self.__class__.__name__,
+                                                            self.directory, self.max_size)
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def encode(self, value):
+        """Convert a value to the bytes stored in the cache.
+
+        Raises TypeError or ValueError if the value cannot be stored.
+        """
+        return json.dumps(value).encode("utf-8")
+
+    def decode(self, data):
+        """Convert bytes stored in the cache back to a value.
+
+        Raises ValueError if the bytes are not a valid entry.
+        """
+        return json.loads(data.decode("utf-8"))
+
+    def get(self, key):
+        """Get the value stored for `key`, or None if there isn't one."""
+        filename = self._filename(key)
+        try:
+            with open(filename, "rb") as f:
+                value = self.decode(f.read())
+            # Mark as recently used, for eviction
+            os.utime(filename, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return value
+
+    def set(self, key, value):
+        """Store `value` for `key`."""
+        filename = self._filename(key)
+        tmp_filename = filename + ".tmp"
+        try:
+            data = self.encode(value)
+        except (TypeError, ValueError) as err:
+            log.debug("Cannot store %r in cache: %s", key, err)
+            return
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            with open(tmp_filename, "wb") as f:
+                f.write(data)
+            if os.path.exists(filename):
+                os.remove(filename)
+            os.rename(tmp_filename, filename)
+        except (IOError, OSError):
+            log.debug("Cannot save cache entry to %s", filename)
+            return
+        # Only scan the directory when it might be too big,
+        # so storing many entries in a row doesn't get slower & slower
+        if self._size is None or self._size + len(data) > self.max_size:
+            self.evict()
+        else:
+            self._size += len(data)
+
+    def evict(self):
+        """Remove least recently used entries until the cache is below its maximum size."""
+        entries = []
+        for entry in os.listdir(self.directory):
+            if not entry.endswith(self.extension):
+                continue
+            filename = os.path.join(self.directory, entry)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+                log.debug("Removed cache entry %s", filename)
+            except OSError:
+                pass
+            total_size -= size
+        self._size = total_size
+
+    def clear(self):
+        """Remove all entries."""
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.listdir(self.directory):
+            if entry.endswith(self.extension):
+                os.remove(os.path.join(self.directory, entry))
+        self._size = 0
@@ -4,6 +4,7 @@
 from __future__ import absolute_import
 import os
 import imp
+from importlib import import_module
 # https://github.com/PyCQA/pylint/issues/73
 from distutils.spawn import find_executable  # pylint: disable=import-error,no-name-in-module
 from subprocess import call, check_output
@@ -100,8 +101,18 @@ def check_program_exists(program):
     -------
     bool
         Whether program is in PATH
+
+    Notes
+    -----
+    Searching the PATH is slow, so the result is cached for the rest of the process.
     """
-    return bool(find_executable(program))
+    if program not in _programs_found:
+        _programs_found[program] = bool(find_executable(program))
+    return _programs_found[program]
+
+
+# Cache of check_program_exists() results
+_programs_found = {}
 
 
 def check_module_exists(module):
@@ -124,6 +135,43 @@ def check_module_exists(module):
     return True
 
 
+# NumPy module, once get_numpy() has tried to import it (None if it isn't installed)
+_numpy = False
+
+
+def get_numpy():
+    """Get the NumPy module, or None if it isn't installed.
+
+    NumPy is optional, and slow to import, so it is only imported when first needed.
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = None
+    return _numpy
+
+
+def load_object(path):
+    """Import an object from a "module:name" string, like a setuptools entry point.
+
+    Parameters
+    ----------
+    path : str
+        Full module name and object name, separated by a colon,
+        e.g. ``"pythiaplotter.parsers.lhe_parser:LHEParser"``
+
+    Returns
+    -------
+    object
+        The named object, e.g. a class or function.
+    """
+    module_name, _, obj_name = path.partition(":")
+    return getattr(import_module(module_name), obj_name)
+
+
 def generate_repr_str(obj, ignore=None):
     """Generate a generic string for use in __repr__, with object fields and their value.
 
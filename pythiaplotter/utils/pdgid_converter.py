@@ -2,21 +2,46 @@
 
 Uses the PDGID for TeX names, and Pythia8 for normal names.
 
+Parsing the source files is slow, so the names are precompiled into
+``particledata/pdgid_names.json`` (run ``make pdgid-table`` after editing the sources).
+The table is only loaded on the first lookup, and is trusted to match the sources,
+which are only checked by the tests.
+
 TODO: what if pdgid doesn't exist?
 
 TODO: deal with tex entries like: ``25 h^0 / H_1^0``
 """
 
 
-from __future__ import absolute_import
+from __future__ import absolute_import, print_function
+import os
 import re
-import xml.etree.ElementTree as ET
-from pkg_resources import resource_string
+import json
+import hashlib
+import pkgutil
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping  # python 2
+from pythiaplotter.utils.logging_config import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Bump this whenever the layout of the precompiled table changes
+PDGID_TABLE_VERSION = 1
+
+PDGID_TABLE = "particledata/pdgid_names.json"
+
+PDGID_SOURCES = ["particledata/pdg_all.tex", "particledata/PythiaParticleData.xml"]
 
 
 def load_pdgid_dict():
     """Generate dictionary with PDGIDs and corresponding names e.g. ``\pi^0, pi0``
 
+    This parses the source files, which is slow, so normally get_pdgid_dict() is used instead.
+
     For each PDGID key, we store the tex and "raw" string names,
     for both particle and antiparticle
 
@@ -36,12 +61,13 @@ def load_pdgid_dict():
 
     So stick with mine for now...
     """
+    import xml.etree.ElementTree as ET
     pdgid_dict = {}
 
     # get latex names
     # decode() necessary as "The resource is read in binary fashion, such that the returned
     # string contains exactly the bytes that are stored in the resource."
-    particle_tex = resource_string('pythiaplotter', "particledata/pdg_all.tex").decode('utf-8')
+    particle_tex = pkgutil.get_data('pythiaplotter', PDGID_SOURCES[0]).decode('utf-8')
     for line in particle_tex.split('\n'):
         (pid, tex) = line.split(" ", 1)
         tex = tex.strip()
@@ -65,14 +91,14 @@ def load_pdgid_dict():
         pdgid_dict[-1 * int(pid)] = dict(tex=tex_anti, raw=tex_anti)
 
     # get raw string names
-    particle_data = resource_string('pythiaplotter', "particledata/PythiaParticleData.xml")
+    particle_data = pkgutil.get_data('pythiaplotter', PDGID_SOURCES[1])
     root = ET.ElementTree(ET.fromstring(particle_data)).getroot()  # nasty hack...
     for child in root:
         pid = int(child.get('id'))
         name = child.get('name')
         # if no antiparticle name, use particle name
         anti_name = child.get('antiName') if child.get('antiName') else name
-        if pid in list(pdgid_dict.keys()):
+        if pid in pdgid_dict:
             pdgid_dict[pid]["raw"] = name
             pdgid_dict[-1 * pid]["raw"] = anti_name
         else:
@@ -81,27 +107,119 @@ def load_pdgid_dict():
             pdgid_dict[-1 * pid] = dict(tex=anti_name, raw=anti_name)
 
     # These are for the CMSSW Pythia6 interface
-    pdgid_dict[88] = dict(latex='junction', latex_anti='junction',
-                          raw='junction', raw_anti='junction')
-    pdgid_dict[92] = dict(latex='string', latex_anti='string',
-                          raw='string', raw_anti='string')
+    pdgid_dict[88] = dict(tex='junction', raw='junction')
+    pdgid_dict[92] = dict(tex='string', raw='string')
 
     return pdgid_dict
 
 
+def source_hash():
+    """Get a hash of the source files, to tell if the precompiled table is out of date."""
+    sha = hashlib.sha1()
+    for source in PDGID_SOURCES:
+        sha.update(pkgutil.get_data('pythiaplotter', source))
+    return sha.hexdigest()
+
+
+def write_pdgid_table(filename=None):
+    """Precompile the PDGID names from the source files, and save them to `filename`.
+
+    Defaults to the table inside the package.
+    """
+    filename = filename or os.path.join(os.path.dirname(os.path.dirname(__file__)), PDGID_TABLE)
+    pdgid_dict = load_pdgid_dict()
+    # Write one particle per line, so changes are easy to see
+    names = ['"%d": %s' % (pid, json.dumps([pdgid_dict[pid]["tex"], pdgid_dict[pid]["raw"]]))
+             for pid in sorted(pdgid_dict)]
+    with open(filename, "w") as f:
+        f.write('{"version": %d,\n' % PDGID_TABLE_VERSION)
+        f.write('"source_hash": "%s",\n' % source_hash())
+        f.write('"names": {\n%s\n}}\n' % ",\n".join(names))
+    return filename
+
+
+def read_pdgid_table(check_sources=False):
+    """Load the precompiled PDGID names.
+
+    Parameters
+    ----------
+    check_sources : bool, optional
+        If True, also check the table was made from the current source files.
+        This means reading them all in, so is not done normally.
+
+    Returns
+    -------
+    dict
+        PDGID names, in the same form as load_pdgid_dict(),
+        or None if the table is missing or out of date.
+    """
+    try:
+        contents = json.loads(pkgutil.get_data('pythiaplotter', PDGID_TABLE).decode('utf-8'))
+    except (IOError, OSError, ValueError):
+        return None
+    if contents.get("version") != PDGID_TABLE_VERSION:
+        return None
+    if check_sources and contents.get("source_hash") != source_hash():
+        return None
+
+    # Lots of particles share names (e.g. tex = raw), so only store one copy of each string
+    strings = {}
+    return {int(pid): dict(tex=strings.setdefault(tex, tex), raw=strings.setdefault(raw, raw))
+            for pid, (tex, raw) in contents["names"].items()}
+
+
 # Dictionary, where PDGID is key, and value is a dictionary with fields for
-# latex and raw string names. Separate entries for particle & antiparticle
-PDGID_NAME_DICT = load_pdgid_dict()
+# tex and raw string names. Separate entries for particle & antiparticle.
+# Loaded on first use by get_pdgid_dict()
+_pdgid_dict = None
 
-# Add in custom particles e.g.
-# PDGID_NAME_DICT[999] = dict(latex="I^0", latex_anti="\\overline{I}^0",
-#                             raw="I0", raw_anti="I0")
+
+def get_pdgid_dict():
+    """Get the dictionary of PDGIDs and corresponding names, loading it if necessary.
+
+    Add in custom particles with e.g.
+    ``get_pdgid_dict()[999] = dict(tex="\\overline{I}^0", raw="I0")``
+    """
+    global _pdgid_dict
+    if _pdgid_dict is None:
+        _pdgid_dict = read_pdgid_table()
+        if _pdgid_dict is None:
+            log.warning("Precompiled PDGID table is missing or out of date, "
+                        "please run `make pdgid-table`")
+            _pdgid_dict = load_pdgid_dict()
+    return _pdgid_dict
+
+
+class _LazyPdgidDict(MutableMapping):
+    """Stand-in for the PDGID names dictionary, that only loads it once it is used."""
+
+    def __getitem__(self, pdgid):
+        return get_pdgid_dict()[pdgid]
+
+    def __setitem__(self, pdgid, names):
+        get_pdgid_dict()[pdgid] = names
+
+    def __delitem__(self, pdgid):
+        del get_pdgid_dict()[pdgid]
+
+    def __iter__(self):
+        return iter(get_pdgid_dict())
+
+    def __len__(self):
+        return len(get_pdgid_dict())
+
+    def __repr__(self):
+        return repr(get_pdgid_dict())
+
+
+# For backwards compatibility, prefer get_pdgid_dict()
+PDGID_NAME_DICT = _LazyPdgidDict()
 
 
 def check_pdgid(pdgid):
     """Check if entry corresponding to given pdgid. If not, throw KeyError."""
 
-    if int(pdgid) not in list(PDGID_NAME_DICT.keys()):
+    if int(pdgid) not in get_pdgid_dict():
         raise KeyError("%r not in list of valid particle names/PDGIDs. Please "
                        "add custom entry in pdgid_converter.py" % pdgid)
 
@@ -110,11 +228,15 @@ def pdgid_to_tex(pdgid):
     """Convert PDGID to TeX-compatible name e.g. ``\pi^0``"""
 
     check_pdgid(pdgid)
-    return PDGID_NAME_DICT[int(pdgid)]["tex"]
+    return get_pdgid_dict()[int(pdgid)]["tex"]
 
 
 def pdgid_to_string(pdgid):
     """Convert PDGID to readable string (raw) name e.g. ``pi0``"""
 
     check_pdgid(pdgid)
-    return PDGID_NAME_DICT[int(pdgid)]["raw"]
+    return get_pdgid_dict()[int(pdgid)]["raw"]
+
+
+if __name__ == "__main__":
+    print("Written PDGID table to", write_pdgid_table())
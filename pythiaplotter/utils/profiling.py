@@ -0,0 +1,223 @@
+"""Measure the time & memory taken by each stage of making a diagram, for ``--profile``.
+
+Code marks out a stage with the global `profiler`::
+
+    with profiler.stage("graph") as stage:
+        graph = assign_particles_nodes(particles)
+        stage.counts["nodes"] = graph.number_of_nodes()
+
+Stages can be nested, and each one is recorded under its full path, e.g. "plot/graph/convert".
+For each stage we record:
+
+- wall time & CPU time (of this process) in seconds
+- CPU time of child processes (e.g. Graphviz) that finished during the stage
+- the peak resident set size (RSS) of this process, & of the largest child process, so far,
+  in bytes. The operating system only tracks the peak over the whole process lifetime,
+  so this is not the peak during just this stage.
+- the event number, if the stage is part of plotting an event
+- any counts of elements (particles, nodes, edges...) given by the code
+
+The profiler does nothing unless it is enabled, so stages can be marked anywhere
+for little cost.
+"""
+
+
+from __future__ import absolute_import, division
+import os
+import sys
+import json
+import platform
+from collections import OrderedDict
+from contextlib import contextmanager
+from timeit import default_timer
+try:
+    import resource
+except ImportError:
+    # e.g. Windows
+    resource = None
+from pythiaplotter.utils.logging_config import get_logger
+from pythiaplotter.utils.common import generate_repr_str
+
+
+log = get_logger(__name__)
+
+
+def get_usage():
+    """Get the resources used by this process & its finished child processes.
+
+    Returns
+    -------
+    float, float
+        CPU time (user + system) of this process & its children, in seconds
+    int, int
+        Peak resident set size of this process & its largest child, in bytes.
+        None if unknown.
+    """
+    if resource is None:
+        times = os.times()
+        return times[0] + times[1], times[2] + times[3], None, None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux reports kilobytes, macOS bytes
+    scale = 1 if sys.platform == "darwin" else 1024
+    return (usage.ru_utime + usage.ru_stime, children_usage.ru_utime + children_usage.ru_stime,
+            usage.ru_maxrss * scale, children_usage.ru_maxrss * scale)
+
+
+def record_graph_size(stage, graph):
+    """Record the number of nodes & edges in a graph as counts for a stage."""
+    stage.counts["nodes"] = graph.number_of_nodes()
+    stage.counts["edges"] = graph.number_of_edges()
+
+
+class StageRecord(object):
+
+    def __init__(self, stage, event_num=None):
+        """Measurements of one run of a stage.
+
+        Parameters
+        ----------
+        stage : str
+            Full name of the stage, including any enclosing stages.
+        event_num : int, optional
+            Event number, if the stage is part of plotting an event.
+
+        Attributes
+        ----------
+        counts : dict
+            Number of elements (particles, nodes, edges...) handled by the stage.
+            Filled in by the code being profiled.
+        """
+        self.stage = stage
+        self.event_num = event_num
+        self.counts = {}
+        self.wall_time = None
+        self.cpu_time = None
+        self.children_cpu_time = None
+        self.peak_rss = None
+        self.children_peak_rss = None
+
+    def __repr__(self):
+        return generate_repr_str(self)
+
+    def to_dict(self):
+        return {"stage": self.stage, "event": self.event_num, "counts": self.counts,
+                "wall_time": self.wall_time, "cpu_time": self.cpu_time,
+                "children_cpu_time": self.children_cpu_time,
+                "peak_rss": self.peak_rss, "children_peak_rss": self.children_peak_rss}
+
+
+class Profiler(object):
+
+    def __init__(self):
+        """Records the time & memory taken by each stage.
+
+        Attributes
+        ----------
+        enabled : bool
+            If False, stages are not recorded.
+        records : list[StageRecord]
+            One record per run of a stage, in the order they finished.
+        """
+        self.enabled = False
+        self.records = []
+        self._open_stages = []  # records of the stages currently running, outermost first
+
+    def __repr__(self):
+        return "{0}(enabled={1}, records=<{2} records>)".format(self.__class__.__name__,
+                                                              self.enabled, len(self.records))
+
+    @contextmanager
+    def stage(self, name, event_num=None):
+        """Record the time & memory taken by the code in the with block.
+
+        Parameters
+        ----------
+        name : str
+            Stage name. The recorded name also includes any enclosing stages.
+        event_num : int, optional
+            Event number. If unset, uses the event number of the enclosing stage.
+
+        Yields
+        ------
+        StageRecord
+            For the caller to fill in counts, or the event number if it isn't known yet.
+        """
+        if not self.enabled:
+            yield StageRecord(name, event_num)
+            return
+
+        parent = self._open_stages[-1] if self._open_stages else None
+        if parent:
+            name = parent.stage + "/" + name
+            if event_num is None:
+                event_num = parent.event_num
+        record = StageRecord(name, event_num)
+        self._open_stages.append(record)
+        cpu_start, children_cpu_start, _, _ = get_usage()
+        wall_start = default_timer()
+        try:
+            yield record
+        finally:
+            record.wall_time = default_timer() - wall_start
+            cpu_end, children_cpu_end, record.peak_rss, record.children_peak_rss = get_usage()
+            record.cpu_time = cpu_end - cpu_start
+            record.children_cpu_time = children_cpu_end - children_cpu_start
+            self._open_stages.pop()
+            self.records.append(record)
+
+    def pop_records(self):
+        """Remove & return all records, e.g. to send them from a worker process."""
+        records, self.records = self.records, []
+        return records
+
+    def summarise(self):
+        """Sum the wall & CPU times for each stage, over all runs.
+
+        Returns
+        -------
+        list[dict]
+            Number of runs, total wall time, total CPU time & total children CPU time
+            for each stage, in the order each stage first finished.
+        """
+        totals = OrderedDict()
+        for record in self.records:
+            if record.stage not in totals:
+                totals[record.stage] = {"stage": record.stage, "calls": 0, "wall_time": 0.,
+                                        "cpu_time": 0., "children_cpu_time": 0.}
+            total = totals[record.stage]
+            total["calls"] += 1
+            total["wall_time"] += record.wall_time
+            total["cpu_time"] += record.cpu_time
+            total["children_cpu_time"] += record.children_cpu_time
+        return list(totals.values())
+
+    def log_summary(self):
+        """Log the total time taken by each stage."""
+        log.info("Time taken by each stage [s]:")
+        log.info("{0:<32} {1:>6} {2:>10} {3:>10} {4:>10}".format("stage", "calls", "wall",
+                                                               "CPU", "child CPU"))
+        for total in self.summarise():
+            log.info("{0[stage]:<32} {0[calls]:>6d} {0[wall_time]:>10.4f} {0[cpu_time]:>10.4f} "
+                     "{0[children_cpu_time]:>10.4f}".format(total))
+
+    def write_json(self, filename, info=None):
+        """Write the summary & all records to a JSON file.
+
+        Parameters
+        ----------
+        filename : str
+        info : dict, optional
+            Extra information about the run, e.g. the input file.
+        """
+        run_info = {"python": platform.python_version(), "platform": platform.platform()}
+        run_info.update(info or {})
+        with open(filename, "w") as f:
+            json.dump({"info": run_info, "summary": self.summarise(),
+                       "stages": [record.to_dict() for record in self.records]},
+                      f, indent=1, sort_keys=True)
+        log.info("Profile written to %s", filename)
+
+
+# The profiler used throughout PythiaPlotter
+profiler = Profiler()
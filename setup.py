@@ -17,7 +17,7 @@ setup(
     author="Robin Aggleton",
     author_email="robinaggleton@gmail.com",
     url="https://github.com/raggleton/PythiaPlotter",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     install_requires=requirements,
     entry_points={
         'console_scripts': [
@@ -27,6 +27,7 @@ setup(
     package_data={
         'pythiaplotter': ['particledata/*.tex', 'particledata/*.xml',
                           'particledata/pythia8status.json',
+                          'particledata/pdgid_names.json',
                           'printers/templates/vis_template.html']
     },
     classifiers=[
@@ -6,6 +6,7 @@ from timeit import repeat
 from collections import OrderedDict
 import os
 import json
+import random
 
 
 n_iter = 100
@@ -44,6 +45,50 @@ def print_result(time, label, label_width=15, comparison=None):
     print(print_str)
 
 
+def make_shower_edge_particles(num_particles, seed=1):
+    """Make a synthetic parton shower with EDGE particles, for benchmarking.
+
+    Each particle either has a redundant copy of itself as its only child
+    (as MC generators like to make), or splits into 2 daughters.
+    """
+    from pythiaplotter.parsers.event_classes import Particle, ParticleTable, EdgeParticle
+    rng = random.Random(seed)
+    table = ParticleTable()
+    edge_particles = []
+    vertices = [(1, 21)]  # open vertices at the end of a particle, and that particle's PDGID
+    next_vtx = 2
+    barcode = 1
+    while barcode <= num_particles and vertices:
+        vtx_out, parent_pdgid = vertices.pop(0)
+        if rng.random() < 0.6:
+            pdgids = [parent_pdgid]
+        else:
+            pdgids = [rng.choice([21, 21, 21, 1, -1, 2, -2, 22]) for _ in range(2)]
+        for pdgid in pdgids:
+            p = Particle(barcode=barcode, pdgid=pdgid, status=1, table=table,
+                         px=rng.gauss(0, 10), py=rng.gauss(0, 10), pz=rng.gauss(0, 100))
+            edge_particles.append(EdgeParticle(p, vtx_out_barcode=vtx_out, vtx_in_barcode=next_vtx))
+            vertices.append((next_vtx, pdgid))
+            next_vtx += 1
+            barcode += 1
+    table.compute_kinematics()
+    return edge_particles
+
+
+def make_shower_node_particles(num_particles, seed=1):
+    """Make a synthetic parton shower with NODE particles, for benchmarking.
+
+    Same shower as make_shower_edge_particles().
+    """
+    from pythiaplotter.parsers.event_classes import NodeParticle
+    # Each particle's parent is the one ending at its outgoing vertex
+    edge_particles = make_shower_edge_particles(num_particles, seed)
+    parent_at_vtx = {ep.vtx_in_barcode: ep.barcode for ep in edge_particles}
+    return [NodeParticle(ep.particle, [parent_at_vtx[ep.vtx_out_barcode]]
+                         if ep.vtx_out_barcode in parent_at_vtx else [])
+            for ep in edge_particles]
+
+
 std_import = "gc.enable();import logging;" \
              "from pythiaplotter.utils.logging_config import root;" \
              "root.setLevel(logging.ERROR);" \
@@ -54,14 +99,14 @@ test_settings = OrderedDict()
 # NODE based parsers
 test_settings['py8 parser'] = dict(
     stmt='Pythia8Parser(cf("example/example_pythia8.txt"), 0).parse()',
-    setup=std_import+"from pythiaplotter.parsers import Pythia8Parser",
+    setup=std_import+"from pythiaplotter.parsers.pythia8_parser import Pythia8Parser",
     repeat=n_repeat,
     number=n_iter
 )
 
 test_settings['lhe parser'] = dict(
     stmt='LHEParser(cf("example/example_lhe.lhe"), 0).parse()',
-    setup=std_import+"from pythiaplotter.parsers import LHEParser",
+    setup=std_import+"from pythiaplotter.parsers.lhe_parser import LHEParser",
     repeat=n_repeat,
     number=n_iter
 )
@@ -70,7 +115,7 @@ try:
     import ROOT
     test_settings['heppy parser'] = dict(
         stmt='HeppyParser(cf("example/example_heppy.root"), 0).parse()',
-        setup=std_import+"from pythiaplotter.parsers import HeppyParser",
+        setup=std_import+"from pythiaplotter.parsers.heppy_parser import HeppyParser",
         repeat=n_repeat,
         number=n_iter
     )
@@ -79,7 +124,8 @@ except:
 
 test_settings['cmssw parser'] = dict(
     stmt='CMSSWParticleListParser(cf("example/example_cmssw.txt")).parse()',
-    setup=std_import+"from pythiaplotter.parsers import CMSSWParticleListParser",
+    setup=std_import + "from pythiaplotter.parsers.cmssw_particle_list_parser "
+                       "import CMSSWParticleListParser",
     repeat=n_repeat,
     number=n_iter
 )
@@ -87,7 +133,7 @@ test_settings['cmssw parser'] = dict(
 # EDGE based parsers
 test_settings['hepmc parser'] = dict(
     stmt='HepMCParser(cf("example/example_hepmc.hepmc"), 0).parse()',
-    setup=std_import+"from pythiaplotter.parsers import HepMCParser",
+    setup=std_import+"from pythiaplotter.parsers.hepmc_parser import HepMCParser",
     repeat=n_repeat,
     number=n_iter
 )
@@ -95,7 +141,7 @@ test_settings['hepmc parser'] = dict(
 # Graphers
 test_settings['node grapher'] = dict(
     stmt="assign_particles_nodes(particles)",
-    setup=std_import+'from pythiaplotter.parsers import Pythia8Parser;'
+    setup=std_import+'from pythiaplotter.parsers.pythia8_parser import Pythia8Parser;'
                      'from pythiaplotter.graphers.node_grapher import assign_particles_nodes;'
                      '_, particles = Pythia8Parser(cf("example/example_pythia8.txt"), 0).parse()',
     repeat=n_repeat,
@@ -104,7 +150,7 @@ test_settings['node grapher'] = dict(
 
 test_settings['edge grapher'] = dict(
     stmt="assign_particles_edges(particles)",
-    setup=std_import+'from pythiaplotter.parsers import HepMCParser;'
+    setup=std_import+'from pythiaplotter.parsers.hepmc_parser import HepMCParser;'
                      'from pythiaplotter.graphers.edge_grapher import assign_particles_edges;'
                      '_, particles = HepMCParser(cf("example/example_hepmc.hepmc"), 0).parse()',
     repeat=n_repeat,
@@ -114,7 +160,7 @@ test_settings['edge grapher'] = dict(
 # Graph converters
 test_settings['edge to node conversion'] = dict(
     stmt="edge_to_node(graph)",
-    setup=std_import+'from pythiaplotter.parsers import HepMCParser;'
+    setup=std_import+'from pythiaplotter.parsers.hepmc_parser import HepMCParser;'
                      'from pythiaplotter.graphers.edge_grapher import assign_particles_edges;'
                      'from pythiaplotter.graphers.converters import edge_to_node;'
                      '_, particles = HepMCParser(cf("example/example_hepmc.hepmc"), 0).parse();'
@@ -125,7 +171,7 @@ test_settings['edge to node conversion'] = dict(
 
 test_settings['node to edge conversion'] = dict(
     stmt="node_to_edge(graph)",
-    setup=std_import+'from pythiaplotter.parsers import Pythia8Parser;'
+    setup=std_import+'from pythiaplotter.parsers.pythia8_parser import Pythia8Parser;'
                      'from pythiaplotter.graphers.node_grapher import assign_particles_nodes;'
                      'from pythiaplotter.graphers.converters import node_to_edge;'
                      '_, particles = Pythia8Parser(cf("example/example_pythia8.txt"), 0).parse();'
@@ -134,6 +180,120 @@ test_settings['node to edge conversion'] = dict(
     number=n_iter
 )
 
+test_settings['node to edge conversion (20k)'] = dict(
+    stmt="node_to_edge(graph)",
+    setup=std_import+'from pythiaplotter.graphers.node_grapher import assign_particles_nodes;'
+                     'from pythiaplotter.graphers.converters import node_to_edge;'
+                     'from __main__ import make_shower_node_particles;'
+                     'graph = assign_particles_nodes(make_shower_node_particles(20000))',
+    repeat=3,
+    number=1
+)
+
+test_settings['redundant edge removal (50k)'] = dict(
+    stmt="remove_redundant_edges(graph)",
+    setup=std_import+'from pythiaplotter.graphers.edge_grapher import assign_particles_edges, '
+                     'remove_redundant_edges;'
+                     'from __main__ import make_shower_edge_particles;'
+                     'graph = assign_particles_edges(make_shower_edge_particles(50000))',
+    repeat=3,
+    number=1  # graph is modified, so can only run once per setup
+)
+
+test_settings['redundant node removal (50k)'] = dict(
+    stmt="remove_redundant_nodes(graph)",
+    setup=std_import+'from pythiaplotter.graphers.node_grapher import assign_particles_nodes, '
+                     'remove_redundant_nodes;'
+                     'from __main__ import make_shower_node_particles;'
+                     'graph = assign_particles_nodes(make_shower_node_particles(50000))',
+    repeat=3,
+    number=1  # graph is modified, so can only run once per setup
+)
+
+test_settings['focus (20k)'] = dict(
+    stmt="focus_graph(graph, barcodes=[5000], ancestors=10, descendants=10, siblings=True)",
+    setup=std_import+'from pythiaplotter.graphers.node_grapher import assign_particles_nodes;'
+                     'from pythiaplotter.graphers.focus import focus_graph;'
+                     'from __main__ import make_shower_node_particles;'
+                     'graph = assign_particles_nodes(make_shower_node_particles(20000))',
+    repeat=n_repeat,
+    number=1
+)
+
+# Printers
+dot_attr_setup = (std_import +
+                  'import pythiaplotter.default_config as config;'
+                  'from pythiaplotter.printers.dot_display_classes import DotNodeAttrGenerator;'
+                  'from __main__ import make_shower_node_particles;'
+                  'nodes = [{"particle": np.particle} for np in make_shower_node_particles(20000)]')
+
+# The generic (uncompiled) way, to compare with
+test_settings['dot node attributes, generic (20k)'] = dict(
+    stmt='gen = DotNodeAttrGenerator(config.DOT_PARTICLE_OPTS, config.DOT_LABEL_OPTS);'
+         '[gen.dict_to_gv_str(gen.get_particle_attr(n["particle"], True)) for n in nodes]',
+    setup=dot_attr_setup,
+    repeat=3,
+    number=1
+)
+
+test_settings['dot node attributes (20k)'] = dict(
+    stmt='gen = DotNodeAttrGenerator(config.DOT_PARTICLE_OPTS, config.DOT_LABEL_OPTS);'
+         '[gen.gv_str(n, True) for n in nodes]',
+    setup=dot_attr_setup,
+    repeat=3,
+    number=1
+)
+
+test_settings['dot description (20k)'] = dict(
+    stmt='write_gv(iter_gv_lines(event), os.devnull)',
+    setup=std_import+'import os, argparse;'
+                     'import pythiaplotter.default_config as config;'
+                     'from pythiaplotter.parsers.event_classes import Event;'
+                     'from pythiaplotter.graphers.node_grapher import assign_particles_nodes;'
+                     'from pythiaplotter.printers.dot_printer import DotPrinter, iter_gv_lines, '
+                     'write_gv;'
+                     'from __main__ import make_shower_node_particles;'
+                     'event = Event();'
+                     'event.graph = assign_particles_nodes(make_shower_node_particles(20000));'
+                     'opts = argparse.Namespace(output="", layout="dot", outputFormat="pdf", '
+                     'noOutput=True, saveGraphviz=False, **config.__dict__);'
+                     'DotPrinter(opts).add_display_attr(event, True)',
+    repeat=3,
+    number=1
+)
+
+test_settings['web data (20k)'] = dict(
+    stmt='encode_vis_data(create_vis_data(graph))',
+    setup=std_import+'from pythiaplotter.graphers.node_grapher import assign_particles_nodes;'
+                     'from pythiaplotter.printers.web_printer import create_vis_data, '
+                     'encode_vis_data;'
+                     'from __main__ import make_shower_node_particles;'
+                     'graph = assign_particles_nodes(make_shower_node_particles(20000));'
+                     '[graph.node[n].update(pos=(n * 1.5, n * 0.5)) for n in graph.nodes_iter()]',
+    repeat=3,
+    number=1
+)
+
+test_settings['web clustering (20k)'] = dict(
+    stmt='find_clusters(graph, 5000)',
+    setup=std_import+'from pythiaplotter.graphers.node_grapher import assign_particles_nodes;'
+                     'from pythiaplotter.printers.web_clustering import find_clusters;'
+                     'from __main__ import make_shower_node_particles;'
+                     'graph = assign_particles_nodes(make_shower_node_particles(20000))',
+    repeat=3,
+    number=1
+)
+
+# Startup time, e.g. from importing modules. Use `python -X importtime` (python >= 3.7)
+# to see which imports are slow.
+test_settings['startup (--help)'] = dict(
+    stmt='call([sys.executable, "-m", "pythiaplotter.PythiaPlotter", "--help"], '
+         'stdout=devnull, stderr=devnull)',
+    setup='import os, sys;from subprocess import call;devnull = open(os.devnull, "w")',
+    repeat=n_repeat,
+    number=3
+)
+
 # Run tests
 results_dict = {}
 # raw_results_dict = {}
@@ -142,7 +302,7 @@ print("Running benchmarks...")
 for name, settings in test_settings.items():
     result = repeat(**settings)
     # raw_results_dict[name] = result
-    time = min(result) / n_iter
+    time = min(result) / settings['number']
     results_dict[name] = time
     print_result(time, name, label_width=width, comparison=previous_results)
 
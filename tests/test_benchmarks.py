@@ -0,0 +1,133 @@
+"""Tests for the synthetic events & statistics used by the scaling benchmarks"""
+
+
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+from benchmarks.synthetic import make_event, write_events
+from benchmarks.run_benchmarks import (incomplete_beta, welch_t_test, compare_results,
+                                       get_scaling_exponent)
+from pythiaplotter.parsers.pythia8_parser import Pythia8Parser
+from pythiaplotter.parsers.hepmc_parser import HepMCParser
+from pythiaplotter.parsers.lhe_parser import LHEParser
+from pythiaplotter.parsers.cmssw_particle_list_parser import CMSSWParticleListParser
+from pythiaplotter.graphers.node_grapher import assign_particles_nodes
+from pythiaplotter.graphers.edge_grapher import assign_particles_edges
+
+
+class SyntheticEvent_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.events = [make_event(500, seed=2), make_event(300, seed=3)]
+        # Number of parent-child relationships in the first event
+        self.num_links = sum(len(p.parents) for p in self.events[0])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_size(self):
+        for num_particles in [20, 21, 1000, 1001]:
+            self.assertEqual(len(make_event(num_particles)), num_particles)
+        with self.assertRaises(ValueError):
+            make_event(10)
+
+    def test_seed(self):
+        self.assertEqual([(p.pdgid, p.parents) for p in make_event(500, seed=2)],
+                         [(p.pdgid, p.parents) for p in self.events[0]])
+
+    def test_parents(self):
+        """Parents must come before their children, and be next to each other"""
+        for p in self.events[0]:
+            self.assertEqual(p.parents, list(range(p.parents[0], p.parents[0] + len(p.parents)))
+                             if p.parents else [])
+            self.assertTrue(all(parent < p.barcode for parent in p.parents))
+        self.assertIn(92, [p.pdgid for p in self.events[0]])
+
+    def check_node_parser(self, input_format, filename, parser, barcode_offset=0):
+        """Particles & relationships should survive writing & parsing"""
+        filename = os.path.join(self.tmp_dir, filename)
+        write_events(self.events, filename, input_format)
+        _, node_particles = parser(filename).parse()
+        self.assertEqual([(np.barcode + barcode_offset, np.particle.pdgid)
+                          for np in node_particles],
+                         [(p.barcode, p.pdgid) for p in self.events[0]])
+        graph = assign_particles_nodes(node_particles)
+        # Pythia & CMSSW also have links to the "system" particle, which isn't in the graph
+        self.assertEqual(graph.number_of_edges(), self.num_links)
+
+    def test_pythia8(self):
+        self.check_node_parser("PYTHIA", "event.txt", lambda f: Pythia8Parser(f, 0))
+        _, node_particles = Pythia8Parser(os.path.join(self.tmp_dir, "event.txt"), 1).parse()
+        self.assertEqual(len(node_particles), 300)
+
+    def test_lhe(self):
+        self.check_node_parser("LHE", "event.lhe", lambda f: LHEParser(f, 1, use_index=False))
+
+    def test_cmssw(self):
+        """Only the first event is written, with indices from 0"""
+        self.events = self.events[:1]
+        self.check_node_parser("CMSSW", "event.txt", CMSSWParticleListParser, barcode_offset=1)
+
+    def test_hepmc(self):
+        filename = os.path.join(self.tmp_dir, "event.hepmc")
+        write_events(self.events, filename, "HEPMC")
+        _, edge_particles = HepMCParser(filename, 0, use_index=False).parse()
+        # Particles are grouped by production vertex, so aren't in barcode order
+        self.assertEqual(sorted((ep.barcode, ep.particle.pdgid) for ep in edge_particles),
+                         [(p.barcode, p.pdgid) for p in self.events[0]])
+        graph = assign_particles_edges(edge_particles)
+        self.assertEqual(graph.number_of_edges(), 500)
+        # One production vertex for each set of parents, and one end vertex per final particle
+        children = set(parent for p in self.events[0] for parent in p.parents)
+        vertices = set(tuple(p.parents) or p.barcode for p in self.events[0])
+        self.assertEqual(graph.number_of_nodes(), len(vertices) + 500 - len(children))
+
+
+class Statistics_Test(unittest.TestCase):
+
+    def test_incomplete_beta(self):
+        self.assertAlmostEqual(incomplete_beta(0.5, 3, 3), 0.5)
+        self.assertAlmostEqual(incomplete_beta(0.3, 1, 1), 0.3)
+        self.assertAlmostEqual(incomplete_beta(0.2, 2, 1), 0.04)
+        self.assertAlmostEqual(incomplete_beta(0.9, 0.5, 2), 1 - incomplete_beta(0.1, 2, 0.5))
+
+    def test_welch(self):
+        old, new = [1.0, 1.1, 0.9, 1.0], [2.0, 2.1, 1.9, 2.0]
+        self.assertLess(welch_t_test(old, new), 1e-4)
+        self.assertGreater(welch_t_test(new, old), 0.999)
+        self.assertAlmostEqual(welch_t_test(old, old), 0.5)
+        # t = 2.449 with 4 degrees of freedom
+        self.assertAlmostEqual(welch_t_test([-1, 0, 1], [1, 2, 3]), 0.0352, places=4)
+
+    def test_scaling(self):
+        self.assertAlmostEqual(get_scaling_exponent([10, 100, 1000], [2, 200, 20000]), 2)
+        self.assertIsNone(get_scaling_exponent([10], [2]))
+
+    def test_compare(self):
+        def _result(stage, times, peak_memory):
+            return {"format": "PYTHIA", "stage": stage, "size": 1000, "times": times,
+                    "peak_memory": peak_memory}
+
+        baseline = [_result("parse", [1.0, 1.1, 0.9], 10e6),
+                    _result("graph", [1.0, 1.1, 0.9], 10e6),
+                    _result("attrs", [1.0, 1.1, 0.9], 10e6),
+                    _result("write", [1.0], 10e6)]
+        results = [_result("parse", [2.0, 2.1, 1.9], 10e6),
+                   _result("graph", [1.0, 1.05, 0.95], 20e6),
+                   _result("attrs", [0.5, 0.55, 0.45], 10e6),
+                   _result("write", [1.0], 10.1e6),  # too small a change in memory
+                   _result("layout", [1.0], 10e6)]  # not in baseline
+        comparisons = compare_results(results, baseline)
+        self.assertEqual([(c["stage"], c["status"]) for c in comparisons],
+                         [("parse", "slower"), ("graph", "more memory"), ("attrs", "faster"),
+                          ("write", "ok")])
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
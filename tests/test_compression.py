@@ -0,0 +1,172 @@
+"""Tests for reading compressed input files"""
+
+
+from __future__ import absolute_import
+import unittest
+import os
+import bz2
+import gzip
+import shutil
+import tempfile
+from argparse import Namespace
+from pythiaplotter.parsers import compression
+from pythiaplotter.parsers.compression import (get_compression, strip_compression_extension,
+                                               open_input, get_checkpoints, GzipReader)
+from pythiaplotter.parsers.hepmc_parser import HepMCParser
+from pythiaplotter.parsers.lhe_parser import LHEParser
+from pythiaplotter.parsers.pythia8_parser import Pythia8Parser
+from pythiaplotter.cli import set_default_input_format
+from test_event_index import make_multi_event_hepmc, use_temp_cache_dir
+from test_parsers import particle_summary
+
+
+def compress_file(filename, compression, member_size=None):
+    """Compress a file, returning the new filename.
+
+    For gzip, if `member_size` is given, compress every `member_size` bytes
+    as a separate gzip member, like bgzip.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    new_filename = filename + {"gzip": ".gz", "bzip2": ".bz2"}[compression]
+    if compression == "bzip2":
+        with open(new_filename, "wb") as f:
+            f.write(bz2.compress(data))
+        return new_filename
+    member_size = member_size or len(data)
+    with open(new_filename, "wb") as f:
+        for start in range(0, len(data), member_size):
+            with gzip.GzipFile(fileobj=f, mode="wb") as member:
+                member.write(data[start:start + member_size])
+    return new_filename
+
+
+class Compression_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "lines.txt")
+        self.data = b"".join(b"line %d\n" % i for i in range(5000))
+        with open(self.filename, "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_compression(self):
+        self.assertIsNone(get_compression(self.filename))
+        self.assertEqual(get_compression(compress_file(self.filename, "gzip")), "gzip")
+        self.assertEqual(get_compression(compress_file(self.filename, "bzip2")), "bzip2")
+
+    def test_strip_extension(self):
+        self.assertEqual(strip_compression_extension("a/event.hepmc.GZ"), "a/event.hepmc")
+        self.assertEqual(strip_compression_extension("event.lhe.zst"), "event.lhe")
+        self.assertEqual(strip_compression_extension("event.hepmc"), "event.hepmc")
+
+    def test_open_input(self):
+        for filename in [self.filename, compress_file(self.filename, "gzip"),
+                         compress_file(self.filename, "bzip2")]:
+            with open_input(filename, "rb") as f:
+                self.assertEqual(f.read(), self.data)
+            with open_input(filename, "rb", offset=1000) as f:
+                self.assertEqual(f.read(), self.data[1000:])
+            with open_input(filename, offset=14) as f:
+                self.assertEqual([next(f), next(f)], ["line 2\n", "line 3\n"])
+
+    def test_gzip_checkpoints(self):
+        """Checkpoints should be at gzip members, with at least the given spacing"""
+        filename = compress_file(self.filename, "gzip", member_size=1000)
+        with GzipReader(filename, checkpoint_spacing=5000) as f:
+            self.assertEqual(f.read(), self.data)
+            checkpoints = f.checkpoints
+        self.assertEqual([position for position, _ in checkpoints],
+                         list(range(0, len(self.data), 5000)))
+        # Decompressing from each checkpoint should give the right data
+        with GzipReader(filename, checkpoints=checkpoints) as f:
+            for offset in [30000, 7, 12345, len(self.data) - 5, 0]:
+                self.assertEqual(f.seek(offset), offset)
+                self.assertEqual(f.read(10), self.data[offset:offset + 10])
+        with open_input(filename, "rb", offset=25003, checkpoints=checkpoints) as f:
+            self.assertEqual(f.read(), self.data[25003:])
+            self.assertEqual(get_checkpoints(f), checkpoints)
+
+    def test_gzip_single_member(self):
+        filename = compress_file(self.filename, "gzip")
+        with open_input(filename) as f:
+            f.read()
+            self.assertEqual(get_checkpoints(f), [(0, 0)])
+        with open_input(self.filename) as f:
+            self.assertEqual(get_checkpoints(f), [])
+
+    def test_gzip_padding(self):
+        """Zeros after the last member should be ignored"""
+        filename = compress_file(self.filename, "gzip", member_size=10000)
+        with open(filename, "ab") as f:
+            f.write(b"\x00" * 100)
+        with open_input(filename, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_gzip_truncated(self):
+        filename = compress_file(self.filename, "gzip")
+        with open(filename, "rb+") as f:
+            f.truncate(os.path.getsize(filename) // 2)
+        with self.assertRaises(EOFError):
+            with open_input(filename, "rb") as f:
+                f.read()
+
+
+class CompressedParsers_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        use_temp_cache_dir(self, self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_hepmc_index(self):
+        filename = os.path.join(self.tmp_dir, "multi.hepmc")
+        make_multi_event_hepmc(filename, range(1, 9))
+        gz_filename = compress_file(filename, "gzip", member_size=50000)
+        spacing = compression.CHECKPOINT_SPACING
+        compression.CHECKPOINT_SPACING = 200000  # a checkpoint every couple of events
+        try:
+            for num in [1, 8, 3]:
+                _, particles = HepMCParser(filename, num).parse()
+                _, gz_particles = HepMCParser(gz_filename, num).parse()
+                self.assertEqual(particle_summary(gz_particles), particle_summary(particles))
+        finally:
+            compression.CHECKPOINT_SPACING = spacing
+        index = HepMCParser(gz_filename).index
+        self.assertIsNotNone(index._read_stored())
+        self.assertGreater(len(index.checkpoints), 1)
+        events = list(HepMCParser(compress_file(filename, "bzip2")).iter_events([2, 7]))
+        self.assertEqual([e.event_num for e, _ in events], [2, 7])
+
+    def test_lhe(self):
+        filename = os.path.join(self.tmp_dir, "example_lhe.lhe")
+        shutil.copy("example/example_lhe.lhe", filename)
+        gz_filename = compress_file(filename, "gzip")
+        _, particles = LHEParser(filename, 1).parse()
+        for use_index in [True, False]:
+            _, gz_particles = LHEParser(gz_filename, 1, use_index=use_index).parse()
+            self.assertEqual(particle_summary(gz_particles), particle_summary(particles))
+
+    def test_pythia8(self):
+        filename = os.path.join(self.tmp_dir, "example_pythia8.txt")
+        shutil.copy("example/example_pythia8.txt", filename)
+        _, particles = Pythia8Parser(filename).parse()
+        _, gz_particles = Pythia8Parser(compress_file(filename, "gzip")).parse()
+        self.assertEqual(particle_summary(gz_particles), particle_summary(particles))
+
+    def test_input_format(self):
+        args = Namespace(input="events.hepmc.gz", inputFormat=None)
+        set_default_input_format(args)
+        self.assertEqual(args.inputFormat, "HEPMC")
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Tests for generating Graphviz attributes for particles"""
+
+
+from __future__ import absolute_import
+import unittest
+import pythiaplotter.default_config as config
+from pythiaplotter.parsers.event_classes import Particle
+from pythiaplotter.printers.dot_display_classes import (DotNodeAttrGenerator, DotEdgeAttrGenerator,
+                                                        ParticleLabel)
+
+
+class DotAttrGenerator_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.particles = [Particle(barcode=1, pdgid=5, status=2, px=1., py=2., pz=3.),
+                          Particle(barcode=2, pdgid=22, status=1, px=1., py=0., pz=0.),
+                          Particle(barcode=3, pdgid=1, status=21, pt=0., eta=0., phi=0.),
+                          Particle(barcode=4, pdgid=5, status=2, px=4., py=5., pz=6.)]
+        self.particles[1].final_state = True
+        self.particles[2].initial_state = True
+
+    def check_generators(self, particle_opts):
+        for generator_class in [DotNodeAttrGenerator, DotEdgeAttrGenerator]:
+            generator = generator_class(particle_opts, config.DOT_LABEL_OPTS)
+            for fancy in [True, False]:
+                for p in self.particles:
+                    expected = generator.dict_to_gv_str(generator.get_particle_attr(p, fancy))
+                    self.assertEqual(generator.gv_str({"particle": p}, fancy), expected)
+
+    def test_default_styles(self):
+        """Compiled styles & labels must give the same as the generic method"""
+        self.check_generators(config.DOT_PARTICLE_OPTS)
+
+    def test_label_override(self):
+        particle_opts = [dict(filter=lambda p: p.status == 2,
+                              attr={"node": {"shape": "box", "label": '"b"'}, "edge": {}}),
+                         dict(filter=lambda p: True, attr={"node": {}, "edge": {"penwidth": 2}})]
+        self.check_generators(particle_opts)
+        generator = DotNodeAttrGenerator(particle_opts, config.DOT_LABEL_OPTS)
+        self.assertEqual(generator.gv_str({"particle": self.particles[0]}, True),
+                         '[label="b", shape=box]')
+
+    def test_custom_filter(self):
+        """Filters on other fields must be run for every particle, in any order"""
+        for particle_opts in [[dict(filter=lambda p: p.pt > 5,
+                                    attr={"node": {"color": "red"}, "edge": {}})],
+                              [dict(filter=lambda p: p.pdgid == 5 and p.pt > 5,
+                                    attr={"node": {"color": "red"}, "edge": {}})]]:
+            self.check_generators(particle_opts)
+            for order in [[0, 3], [3, 0]]:
+                generator = DotNodeAttrGenerator(particle_opts, config.DOT_LABEL_OPTS)
+                gv_strs = [generator.gv_str({"particle": self.particles[i]}, False)
+                           for i in order]
+                self.assertEqual(["color=red" in gv_str for gv_str in gv_strs],
+                                 [i == 3 for i in order])
+
+    def test_style_memo(self):
+        """Styles are only remembered for filters that use just the style key fields"""
+        generator = DotNodeAttrGenerator(config.DOT_PARTICLE_OPTS, config.DOT_LABEL_OPTS)
+        for p in self.particles:
+            generator.gv_str({"particle": p}, False)
+        self.assertEqual(len(generator.style_indices), 3)
+        self.assertTrue(all(isinstance(index, int)
+                            for index in generator.style_indices.values()))
+
+        special = self.particles[0]
+        particle_opts = [dict(filter=lambda p: p == special,
+                              attr={"node": {"color": "red"}, "edge": {}})]
+        self.check_generators(particle_opts)
+        generator = DotNodeAttrGenerator(particle_opts, config.DOT_LABEL_OPTS)
+        self.assertIn("color=red", generator.gv_str({"particle": self.particles[0]}, False))
+        self.assertNotIn("color", generator.gv_str({"particle": self.particles[3]}, False))
+        self.assertEqual(list(generator.style_indices.values()), [None])
+
+    def test_non_particle(self):
+        generator = DotNodeAttrGenerator(config.DOT_PARTICLE_OPTS, config.DOT_LABEL_OPTS)
+        self.assertEqual(generator.gv_str({}, True), "[shape=point]")
+        generator = DotEdgeAttrGenerator(config.DOT_PARTICLE_OPTS, config.DOT_LABEL_OPTS)
+        self.assertEqual(generator.gv_str({}, True), "")
+
+    def test_label_fields(self):
+        label = ParticleLabel("{barcode}: {name} {pt:.2f} {barcode} {name[0]}", False)
+        self.assertEqual(label.fields, ["barcode", "name", "pt"])
+        self.assertEqual(label(self.particles[1]), "2: gamma 1.00 2 g")
+        self.assertEqual(ParticleLabel("{{literal}} {status!r:>3}", False)(self.particles[1]),
+                         "{literal}   1")
+        self.assertEqual(ParticleLabel("none", False)(self.particles[1]), "none")
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
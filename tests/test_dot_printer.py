@@ -0,0 +1,168 @@
+"""Tests for rendering diagrams with Graphviz"""
+
+
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+from argparse import Namespace
+import networkx as nx
+import pythiaplotter.default_config as config
+from pythiaplotter.utils.common import check_program_exists
+from pythiaplotter.parsers.event_classes import Event
+from pythiaplotter.printers.dot_printer import (DotPrinter, print_diagram, get_renderer_output,
+                                                iter_gv_lines, render_gv_files)
+
+
+class GvLines_Test(unittest.TestCase):
+
+    def test_lines(self):
+        """Only the graph attributes should be filled in with event info"""
+        event = Event(event_num=3)
+        event.graph = nx.DiGraph(attr="label=\"event ${event_num}\"")
+        event.graph.add_node(1, attr="[label=\"${event_num}\"]")
+        event.graph.add_node(2, attr="[]")
+        event.graph.add_edge(1, 2, attr="")
+        self.assertEqual(list(iter_gv_lines(event)),
+                         ["digraph g {",
+                          "label=\"event 3\"",
+                          "1 [label=\"${event_num}\"];",
+                          "2 [];",
+                          "1 -> 2 ;",
+                          "{rank=same; 1 }; // initial particles on same level",
+                          "}"])
+
+
+class RendererOutput_Test(unittest.TestCase):
+
+    def test_formats(self):
+        self.assertEqual(get_renderer_output("a/b.pdf", "pdf"), ("pdf", "a/b.pdf"))
+        self.assertEqual(get_renderer_output("a/b.pdf", "ps"), ("ps:cairo", "a/b.ps"))
+        self.assertEqual(get_renderer_output("a/b.pdf", "ps2"), ("ps2", "a/b.ps"))
+
+
+class PrintDiagram_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.gv_lines = ["digraph g {"] + ["%d -> %d;" % (i, i + 1) for i in range(20000)] + ["}"]
+        self.gv_filename = os.path.join(self.tmp_dir, "graph.gv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @unittest.skipUnless(check_program_exists("dot"), "Needs Graphviz")
+    def test_stream(self):
+        """The diagram and Graphviz file should both be made from the streamed lines"""
+        output_filename = os.path.join(self.tmp_dir, "graph.plain")
+        print_diagram(iter(self.gv_lines), output_filename, "dot", "plain", self.gv_filename)
+        with open(self.gv_filename) as f:
+            self.assertEqual(f.read().splitlines(), self.gv_lines)
+        with open(output_filename) as f:
+            self.assertIn("node 20000 ", f.read())
+
+    @unittest.skipUnless(check_program_exists("false"), "Needs false")
+    def test_renderer_fails(self):
+        """The Graphviz file should still be written in full if the renderer quits early"""
+        with self.assertRaises(RuntimeError):
+            print_diagram(iter(self.gv_lines), os.path.join(self.tmp_dir, "graph.pdf"),
+                          "false", "pdf", self.gv_filename)
+        with open(self.gv_filename) as f:
+            self.assertEqual(f.read().splitlines(), self.gv_lines)
+
+    @unittest.skipUnless(check_program_exists("true"), "Needs true")
+    def test_rerun_command(self):
+        """The command to re-run the renderer must read the Graphviz file"""
+        output_filename = os.path.join(self.tmp_dir, "graph.pdf")
+        run_cmds = print_diagram(iter(self.gv_lines), output_filename, "true", "pdf",
+                                 self.gv_filename)
+        self.assertEqual(run_cmds, ["true -Tpdf -o %s %s" % (output_filename, self.gv_filename)])
+
+
+@unittest.skipUnless(check_program_exists("dot"), "Needs Graphviz")
+class RenderBatch_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_printer(self, output_format):
+        opts = Namespace(output=None, layout="dot", outputFormat=output_format, noOutput=False,
+                         saveGraphviz=False, GRAPH_OPTS=config.GRAPH_OPTS,
+                         DOT_PARTICLE_OPTS=config.DOT_PARTICLE_OPTS,
+                         DOT_LABEL_OPTS=config.DOT_LABEL_OPTS)
+        return DotPrinter(opts)
+
+    def test_batch(self):
+        """Each graph in the batch must end up in its own output file"""
+        names = ["particleA", "particleB", "particleC"]
+        for output_format in ["svg", "plain"]:
+            diagrams = [("digraph g {%s -> x;}" % name,
+                         os.path.join(self.tmp_dir, "%s.%s" % (name, output_format)))
+                        for name in names]
+            printer = self.make_printer(output_format)
+            printer.start_batch(batch_size=2)
+            for gv_str, output_filename in diagrams:
+                printer.add_to_batch([gv_str], output_filename)
+            printer.finish_batch()
+            self.assertIsNone(printer.batch_dir)
+            for name, (_, output_filename) in zip(names, diagrams):
+                with open(output_filename) as f:
+                    contents = f.read()
+                self.assertEqual([n for n in names if n in contents], [name])
+
+
+@unittest.skipUnless(check_program_exists("sh"), "Needs sh")
+class RenderGvFiles_Test(unittest.TestCase):
+    """Uses a fake renderer, that copies each Graphviz file, failing if any contain 'bad'"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.renderer = os.path.join(self.tmp_dir, "renderer")
+        with open(self.renderer, "w") as f:
+            f.write('#!/bin/sh\n'
+                    'shift 2\n'
+                    'if grep -q bad "$@"; then echo "syntax error" >&2; exit 1; fi\n'
+                    'for gv in "$@"; do cp "$gv" "$gv.svg"; done\n')
+        os.chmod(self.renderer, 0o755)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_diagrams(self, contents):
+        diagrams = []
+        for i, content in enumerate(contents):
+            gv_filename = os.path.join(self.tmp_dir, "%d.gv" % i)
+            with open(gv_filename, "w") as f:
+                f.write(content)
+            diagrams.append((gv_filename, os.path.join(self.tmp_dir, "event%d.svg" % i)))
+        return diagrams
+
+    def test_rerun_commands(self):
+        diagrams = self.make_diagrams(["good", "good"])
+        run_cmds = render_gv_files(diagrams, self.renderer, "svg")
+        self.assertEqual(run_cmds, ["%s -Tsvg -o %s %s" % (self.renderer, output_filename,
+                                                           gv_filename)
+                                    for gv_filename, output_filename in diagrams])
+
+    def test_bad_diagram(self):
+        """A bad diagram must be named in the error, and the others still made"""
+        diagrams = self.make_diagrams(["good", "bad", "good"])
+        with self.assertRaises(RuntimeError) as cm:
+            render_gv_files(diagrams, self.renderer, "svg")
+        message = str(cm.exception)
+        self.assertIn("event1.svg", message)
+        self.assertNotIn("event0.svg", message)
+        self.assertTrue(os.path.isfile(diagrams[0][1]))
+        self.assertFalse(os.path.isfile(diagrams[1][1]))
+        self.assertTrue(os.path.isfile(diagrams[2][1]))
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
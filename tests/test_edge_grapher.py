@@ -122,6 +122,49 @@ class EdgeGrapher_Test(unittest.TestCase):
         edges = [(-1, -2), (-2, -4), (-2, -3), (-3, -7), (-3, -8)]
         self.check_graph_edges(edges, graph)
 
+    def test_redundant_long_chain(self):
+        """A long chain of redundant gluons collapses down to the first one
+
+        (0)--p0(u)--(1)--p1(g)--(2)--p2(g)-- ... --(n)--pn(g)--(n+1)--(u)--(n+2)
+        """
+        n = 500
+        particles = [EdgeParticle(particle=Particle(barcode=0, pdgid=2),
+                                  vtx_out_barcode=0, vtx_in_barcode=1)]
+        for i in range(1, n + 1):
+            particles.append(EdgeParticle(particle=Particle(barcode=i, pdgid=21),
+                                          vtx_out_barcode=i, vtx_in_barcode=i + 1))
+        particles.append(EdgeParticle(particle=Particle(barcode=n + 1, pdgid=2),
+                                      vtx_out_barcode=n + 1, vtx_in_barcode=n + 2))
+        graph = eg.assign_particles_edges(particles)
+        eg.remove_redundant_edges(graph)
+        self.check_graph_edges([(0, 1), (1, 2), (2, n + 2)], graph)
+        self.check_graph_particles([particles[i].particle for i in [0, 1, n + 1]], graph)
+
+    def test_redundant_rewire_parents(self):
+        """Other parents of the redundant particle's child vertex get rewired
+
+        (1)--p1(g)--(2)--p2(g)--(4)--p4(a)--(5)
+                                 |
+        (3)--p3(u)--------------(4)
+
+        should simplify to
+
+        (1)--p1(g)--(2)--p4(a)--(5)
+                     |
+        (3)--p3(u)--(2)
+        """
+        p1 = EdgeParticle(particle=Particle(barcode=1, pdgid=21),
+                          vtx_out_barcode=1, vtx_in_barcode=2)
+        p2 = EdgeParticle(particle=Particle(barcode=2, pdgid=21),
+                          vtx_out_barcode=2, vtx_in_barcode=4)
+        p3 = EdgeParticle(particle=Particle(barcode=3, pdgid=2),
+                          vtx_out_barcode=3, vtx_in_barcode=4)
+        p4 = EdgeParticle(particle=Particle(barcode=4, pdgid=22),
+                          vtx_out_barcode=4, vtx_in_barcode=5)
+        graph = eg.assign_particles_edges([p1, p2, p3, p4])
+        eg.remove_redundant_edges(graph)
+        self.check_graph_edges([(1, 2), (2, 5), (3, 2)], graph)
+
     def test_intial_final_state(self):
         """Test whether particles marked as initial/final state correctly
 
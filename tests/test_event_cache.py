@@ -0,0 +1,121 @@
+"""Tests for the cache of parsed events"""
+
+
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+from pythiaplotter.parsers.event_cache import (encode_event, decode_event,
+                                               EventCache, CachedParser)
+from pythiaplotter.parsers.hepmc_parser import HepMCParser
+from pythiaplotter.parsers.pythia8_parser import Pythia8Parser
+from pythiaplotter.parsers.lhe_parser import LHEParser
+from pythiaplotter.parsers.cmssw_particle_list_parser import CMSSWParticleListParser
+from test_event_index import make_multi_event_hepmc, use_temp_cache_dir
+from test_parsers import particle_summary
+
+
+def relationships(particles):
+    return [(p.barcode, getattr(p, "parent_barcodes", None),
+             getattr(p, "vtx_in_barcode", None), getattr(p, "vtx_out_barcode", None))
+            for p in particles]
+
+
+class EncodeEvent_Test(unittest.TestCase):
+
+    def check_round_trip(self, parser):
+        event, particles = parser.parse()
+        new_event, new_particles = decode_event(encode_event(event, particles))
+        self.assertEqual(new_event.__dict__, event.__dict__)
+        self.assertEqual(particle_summary(new_particles), particle_summary(particles))
+        self.assertEqual(relationships(new_particles), relationships(particles))
+        self.assertEqual([p.particle.as_dict() for p in new_particles],
+                         [p.particle.as_dict() for p in particles])
+
+    def test_round_trip(self):
+        self.check_round_trip(HepMCParser("example/example_hepmc.hepmc", use_index=False))
+        self.check_round_trip(Pythia8Parser("example/example_pythia8.txt"))
+        self.check_round_trip(LHEParser("example/example_lhe.lhe", 1, use_index=False))
+        self.check_round_trip(CMSSWParticleListParser("example/example_cmssw.txt"))
+
+    def test_invalid(self):
+        event, particles = Pythia8Parser("example/example_pythia8.txt").parse()
+        data = encode_event(event, particles)
+        for bad_data in [b"", b"PPEV", data[:len(data) // 2], b"XXXX" + data[4:]]:
+            with self.assertRaises(ValueError):
+                decode_event(bad_data)
+
+    def test_unstorable(self):
+        event, particles = Pythia8Parser("example/example_pythia8.txt").parse()
+        particles[3].particle.colour = 501
+        with self.assertRaises(ValueError):
+            encode_event(event, particles)
+
+
+class CachedParser_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        use_temp_cache_dir(self, self.tmp_dir)
+        self.cache = EventCache(directory=self.tmp_dir)
+        self.filename = os.path.join(self.tmp_dir, "multi.hepmc")
+        make_multi_event_hepmc(self.filename, [1, 2, 3, 4])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def num_entries(self):
+        return len(os.listdir(self.cache.directory))
+
+    def test_parse(self):
+        """Once cached, the input file must not be parsed again, unless it changes"""
+        parser = HepMCParser(self.filename, 3)
+        event, particles = CachedParser(parser, self.cache).parse()
+        self.assertEqual(self.num_entries(), 1)
+        parser.parse = None
+        cached_event, cached_particles = CachedParser(parser, self.cache).parse()
+        self.assertEqual(cached_event.event_num, 3)
+        self.assertEqual(particle_summary(cached_particles), particle_summary(particles))
+
+        stat = os.stat(self.filename)
+        os.utime(self.filename, (stat.st_atime, stat.st_mtime + 10))
+        with self.assertRaises(TypeError):
+            CachedParser(parser, self.cache).parse()
+
+    def test_iter_events(self):
+        """Only events not in the cache should be parsed"""
+        requested = []
+
+        def iter_events(event_nums=None):
+            requested.append(event_nums)
+            return HepMCParser(self.filename).iter_events(event_nums)
+
+        CachedParser(HepMCParser(self.filename, 2), self.cache).parse()
+        parser = HepMCParser(self.filename)
+        parser.iter_events = iter_events
+        cached = CachedParser(parser, self.cache)
+        self.assertEqual([e.event_num for e, _ in cached.iter_events([4, 2, 1])], [2, 1, 4])
+        self.assertEqual(requested, [[4, 1]])
+        # Uses the event index to find all the events in the file
+        self.assertEqual(sorted(e.event_num for e, _ in cached.iter_events()), [1, 2, 3, 4])
+        self.assertEqual(requested, [[4, 1], [3]])
+        self.assertEqual(len(list(cached.iter_events([2, 3]))), 2)
+        self.assertEqual(len(requested), 2)
+
+    def test_size_limit(self):
+        self.cache.max_size = 1
+        CachedParser(HepMCParser(self.filename, 2), self.cache).parse()
+        self.assertEqual(self.num_entries(), 0)
+
+    def test_passthrough(self):
+        cached = CachedParser(HepMCParser(self.filename), self.cache)
+        self.assertEqual(cached.filename, self.filename)
+        self.assertIsNotNone(cached.index)
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Tests for the Particle view onto the ParticleTable store"""
+
+
+from __future__ import absolute_import
+import unittest
+import copy
+import pickle
+from pythiaplotter.parsers.event_classes import Particle, ParticleTable
+
+
+class ParticleTable_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.table = ParticleTable()
+        self.p1 = Particle(barcode=1, pdgid=11, status=2, px=3., py=4., pz=0., table=self.table)
+        self.p2 = Particle(barcode=2, pdgid=-13, pt=5., eta=1.5, table=self.table)
+
+    def test_shared_table(self):
+        self.assertEqual(len(self.table), 2)
+        self.assertIs(self.p1.table, self.p2.table)
+        self.assertEqual(list(self.table.pdgid), [11, -13])
+        self.assertEqual([p.barcode for p in self.table], [1, 2])
+
+    def test_attributes(self):
+        self.assertEqual(self.p1.pdgid, 11)
+        self.assertEqual(self.p1.name, "e-")
+        self.assertAlmostEqual(self.p1.pt, 5.)
+        self.assertEqual(self.p2.px, 0.)
+        self.assertEqual(self.p2.eta, 1.5)
+        self.p2.energy = 10
+        self.assertEqual(self.table.energy[1], 10.)
+
+    def test_flags(self):
+        self.assertFalse(self.p1.initial_state)
+        self.p1.initial_state = True
+        self.p1.final_state = True
+        self.p1.initial_state = False
+        self.assertFalse(self.p1.initial_state)
+        self.assertTrue(self.p1.final_state)
+        self.assertFalse(self.p2.final_state)
+
+    def test_extra_attributes(self):
+        p = Particle(barcode=3, lifetime=0.1)
+        self.assertEqual(p.lifetime, 0.1)
+        p.spin = 9
+        self.assertEqual(p.as_dict()["spin"], 9)
+        with self.assertRaises(AttributeError):
+            p.colour
+
+    def test_copy(self):
+        p3 = self.p1.copy()
+        p3.barcode = 3
+        self.assertEqual(self.p1.barcode, 1)
+        self.assertEqual(p3.pdgid, 11)
+        self.assertEqual(len(self.table), 3)
+
+    def test_extend(self):
+        start = self.table.extend({"barcode": [3, 4], "pdgid": [21, 22], "px": [1., 0.],
+                                   "py": [0., 2.], "pz": [0., 0.],
+                                   "flags": [ParticleTable.KINEMATICS_PENDING] * 2})
+        self.assertEqual(start, 2)
+        self.assertEqual(list(self.table.barcode), [1, 2, 3, 4])
+        p4 = self.table.particle(3)
+        self.assertEqual((p4.pdgid, p4.status, p4.mass), (22, 0, 0.))
+        self.assertAlmostEqual(p4.pt, 2.)
+
+    def test_deepcopy_pickle(self):
+        for p1, p2 in [copy.deepcopy([self.p1, self.p2]),
+                       pickle.loads(pickle.dumps([self.p1, self.p2], protocol=2))]:
+            self.assertIs(p1.table, p2.table)
+            self.assertIsNot(p1.table, self.table)
+            self.assertEqual(p1.as_dict(), self.p1.as_dict())
+            p1.pdgid = 5
+            self.assertEqual(self.p1.pdgid, 11)
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
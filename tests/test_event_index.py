@@ -0,0 +1,139 @@
+"""Tests for byte-offset event indices"""
+
+
+from __future__ import absolute_import
+import unittest
+import os
+import io
+import shutil
+import tempfile
+from pythiaplotter.utils.cache import DiskCache
+from pythiaplotter.parsers.event_index import EventIndex, scan_marker_offsets
+from pythiaplotter.parsers.hepmc_parser import HepMCParser
+
+
+def use_temp_cache_dir(test_case, directory):
+    """Keep the caches made during a test (e.g. event indices) in `directory`"""
+    old_cache_home = os.environ.get("XDG_CACHE_HOME")
+    os.environ["XDG_CACHE_HOME"] = directory
+
+    def restore():
+        if old_cache_home is None:
+            del os.environ["XDG_CACHE_HOME"]
+        else:
+            os.environ["XDG_CACHE_HOME"] = old_cache_home
+
+    test_case.addCleanup(restore)
+
+
+def make_multi_event_hepmc(filename, event_nums):
+    """Write a HepMC file with several copies of the example event, with the given event numbers"""
+    with open("example/example_hepmc.hepmc") as f:
+        lines = f.readlines()
+    header = [l for l in lines if l.startswith("HepMC::") and "END" not in l]
+    footer = [l for l in lines if "END_EVENT_LISTING" in l]
+    body = [l for l in lines if l.strip() and not l.startswith("HepMC::")]
+    with open(filename, "w") as f:
+        f.writelines(header)
+        for num in event_nums:
+            parts = body[0].split(" ")
+            parts[1] = str(num)
+            f.write(" ".join(parts))
+            f.writelines(body[1:])
+        f.writelines(footer)
+
+
+class ScanMarker_Test(unittest.TestCase):
+
+    contents = b"E 1 a\nP 1\nP 2\nE 2 b\nP 3\nXE 3\nE 44 c"
+
+    def test_scan(self):
+        found = list(scan_marker_offsets(io.BytesIO(self.contents), b"E "))
+        self.assertEqual(found, [(0, b"E 1 a"), (14, b"E 2 b"), (29, b"E 44 c")])
+
+    def test_scan_small_chunks(self):
+        """Markers and lines straddling chunk boundaries must still be found"""
+        expected = list(scan_marker_offsets(io.BytesIO(self.contents), b"E "))
+        for chunk_size in range(1, 8):
+            found = list(scan_marker_offsets(io.BytesIO(self.contents), b"E ", chunk_size))
+            self.assertEqual(found, expected)
+
+    def test_scan_anywhere(self):
+        """Markers not at the start of a line, e.g. indented XML tags"""
+        contents = b"<a>\n  <event>\n 1\n  </event>\n<event x='1'>2</event>"
+        expected = [(6, b"<event>"), (28, b"<event x='1'>2</event>")]
+        for chunk_size in [1, 3, 7, 1024]:
+            found = list(scan_marker_offsets(io.BytesIO(contents), b"<event",
+                                             chunk_size, line_start=False))
+            self.assertEqual(found, expected)
+
+
+class EventIndex_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "multi.hepmc")
+        self.event_nums = [3, 10, 7]
+        make_multi_event_hepmc(self.filename, self.event_nums)
+        use_temp_cache_dir(self, self.tmp_dir)
+        self.cache = DiskCache("indices", directory=self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_offsets(self):
+        index = EventIndex(self.filename, b"E ", key_func=lambda l: int(l.split()[1]))
+        self.assertEqual(index.keys(), self.event_nums)
+        with open(self.filename, "rb") as f:
+            for num in self.event_nums:
+                f.seek(index.get_offset(num))
+                self.assertEqual(int(f.readline().split()[1]), num)
+
+    def test_stored(self):
+        """The index must be stored in the cache, not next to the input file"""
+        index = EventIndex(self.filename, b"E ", cache=self.cache)
+        index.load()
+        self.assertEqual(len(os.listdir(self.cache.directory)), 1)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ["indices", "multi.hepmc"])
+        reloaded = EventIndex(self.filename, b"E ", cache=self.cache)
+        self.assertIsNotNone(reloaded._read_stored())
+        self.assertEqual(reloaded.load(), index.load())
+        # Indices for different files or markers must not clash
+        other = EventIndex(self.filename, b"P ", cache=self.cache)
+        self.assertIsNone(other._read_stored())
+
+    def test_default_cache(self):
+        EventIndex(self.filename, b"E ").load()
+        default_cache = DiskCache("indices", directory=os.path.join(self.tmp_dir, "pythiaplotter"))
+        self.assertIsNotNone(EventIndex(self.filename, b"E ", cache=default_cache)._read_stored())
+
+    def test_stale_index(self):
+        EventIndex(self.filename, b"E ", cache=self.cache).load()
+        make_multi_event_hepmc(self.filename, [1, 2, 3, 4])
+        index = EventIndex(self.filename, b"E ", cache=self.cache)
+        self.assertEqual(len(index), 4)
+
+    def test_unwritable_cache(self):
+        """Failing to store the index is not fatal"""
+        cache = DiskCache("indices", directory=os.path.join(self.filename, "not_a_dir"))
+        index = EventIndex(self.filename, b"E ", cache=cache)
+        self.assertEqual(len(index), 3)
+
+    def test_parse_with_index(self):
+        for num in self.event_nums:
+            event, particles = HepMCParser(self.filename, num).parse()
+            event_ref, particles_ref = HepMCParser(self.filename, num, use_index=False).parse()
+            self.assertEqual(event.event_num, num)
+            self.assertEqual([p.barcode for p in particles],
+                             [p.barcode for p in particles_ref])
+
+    def test_parse_missing_event(self):
+        with self.assertRaises(IndexError):
+            HepMCParser(self.filename, 999).parse()
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Tests for selecting the part of the graph around some particles"""
+
+
+from __future__ import absolute_import
+import unittest
+from pythiaplotter.parsers.event_classes import Particle, NodeParticle
+from pythiaplotter.graphers.node_grapher import assign_particles_nodes
+from pythiaplotter.graphers.converters import node_to_edge
+from pythiaplotter.graphers.focus import focus_graph
+
+
+class Focus_Test(unittest.TestCase):
+
+    def setUp(self):
+        # 1 -> 2, 3; 2 -> 4, 5; 4 -> 6; 3 -> 7
+        pdgids = {1: 2212, 2: 5, 3: -5, 4: 5, 5: 21, 6: 511, 7: -511}
+        parents = {1: [], 2: [1], 3: [1], 4: [2], 5: [2], 6: [4], 7: [3]}
+        self.node_graph = assign_particles_nodes(
+            [NodeParticle(particle=Particle(barcode=b, pdgid=pdgids[b]), parent_barcodes=parents[b])
+             for b in sorted(pdgids)])
+        self.edge_graph = node_to_edge(self.node_graph.copy())
+
+    def get_barcodes(self, graph):
+        barcodes = [data['particle'].barcode for _, data in graph.nodes_iter(data=True)
+                    if 'particle' in data]
+        barcodes += [data['particle'].barcode for _, _, data in graph.edges_iter(data=True)
+                     if 'particle' in data]
+        return sorted(barcodes)
+
+    def check_focus(self, expected, **kwargs):
+        """Must get the same particles in both representations"""
+        for graph in [self.node_graph, self.edge_graph]:
+            self.assertEqual(self.get_barcodes(focus_graph(graph, **kwargs)), expected)
+
+    def test_barcode(self):
+        self.check_focus([1, 2, 4, 6], barcodes=[4])
+        self.check_focus([2, 4, 6], barcodes=[4], ancestors=1)
+        self.check_focus([2, 4], barcodes=[4], ancestors=1, descendants=0)
+
+    def test_siblings(self):
+        self.check_focus([2, 3, 4, 5, 6], barcodes=[4], ancestors=1, siblings=True)
+
+    def test_pdgid(self):
+        self.check_focus([2, 3, 4], pdgids=[5], ancestors=0, descendants=0)
+        self.check_focus([1, 2, 3, 4, 5, 6, 7], pdgids=[-5])
+
+    def test_no_seeds(self):
+        for graph in [self.node_graph, self.edge_graph]:
+            with self.assertRaises(ValueError):
+                focus_graph(graph, barcodes=[100], pdgids=[25])
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,7 @@ from pprint import pprint
 import pytest
 from pythiaplotter.parsers.event_classes import Particle, EdgeParticle, NodeParticle
 from pythiaplotter.graphers.converters import node_to_edge, edge_to_node, \
-    get_related_parents_children, duplication_needed
+    get_related_parents_children, get_parent_child_groups, duplication_needed
 from pythiaplotter.graphers.edge_grapher import assign_particles_edges
 from pythiaplotter.graphers.node_grapher import assign_particles_nodes
 import networkx as nx
@@ -182,6 +182,19 @@ class Converter_Tests(unittest.TestCase):
         self.compare_lists(parents, [4, 6])
         self.compare_lists(children, [5, 7])
 
+    def test_parent_child_groups(self):
+        """Test splitting the whole graph into parent/children subgraphs"""
+        g = nx.MultiDiGraph()
+        g.add_edges_from([(1, 2), (2, 3), (1, 4), (4, 5), (4, 7), (6, 7), (8, 9), (6, 9)])
+        groups = get_parent_child_groups(g)
+        self.assertEqual(len(groups), 3)
+        self.compare_lists(groups[0][0], [1])
+        self.compare_lists(groups[0][1], [2, 4])
+        self.compare_lists(groups[1][0], [2])
+        self.compare_lists(groups[1][1], [3])
+        self.compare_lists(groups[2][0], [4, 6, 8])
+        self.compare_lists(groups[2][1], [5, 7, 9])
+
     def test_duplicates_needed(self):
         """Test whether duplicate particles needed"""
         g = nx.MultiDiGraph()
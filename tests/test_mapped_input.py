@@ -0,0 +1,107 @@
+"""Tests for finding events in memory-mapped input files"""
+
+
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+from contextlib import closing
+from pythiaplotter.parsers.mapped_input import (map_input, find_marker, iter_marker_offsets,
+                                                get_line, decode_lines)
+from pythiaplotter.parsers.hepmc_parser import HepMCParser
+from pythiaplotter.parsers.pythia8_parser import Pythia8Parser
+from pythiaplotter.parsers.lhe_parser import LHEParser
+from test_event_index import make_multi_event_hepmc, use_temp_cache_dir
+from test_parsers import make_multi_event_pythia8, make_multi_event_lhe, particle_summary
+from test_compression import compress_file
+
+
+class MarkerSearch_Test(unittest.TestCase):
+
+    contents = b"E 1 a\nP 1\nP 2\r\nE 2 b\nP 3\nXE 3\nE 44 c"
+
+    def test_line_start(self):
+        self.assertEqual(list(iter_marker_offsets(self.contents, b"E ")), [0, 15, 30])
+        self.assertEqual(list(iter_marker_offsets(self.contents, b"E ", start=1)), [15, 30])
+        self.assertEqual(list(iter_marker_offsets(self.contents, b"E ", start=15)), [15, 30])
+        self.assertEqual(find_marker(self.contents, b"E ", 16), 30)
+        self.assertEqual(find_marker(self.contents, b"E ", 31), -1)
+
+    def test_anywhere(self):
+        self.assertEqual(list(iter_marker_offsets(self.contents, b"E ", line_start=False)),
+                         [0, 15, 26, 30])
+
+    def test_several_markers(self):
+        self.assertEqual(list(iter_marker_offsets(self.contents, (b"E 2", b"P "))),
+                         [6, 10, 15, 21])
+
+    def test_lines(self):
+        self.assertEqual(get_line(self.contents, 10), b"P 2")
+        self.assertEqual(get_line(self.contents, 30), b"E 44 c")
+        self.assertEqual(decode_lines(self.contents, 6, 15), ["P 1", "P 2"])
+        self.assertEqual(decode_lines(self.contents, 25, -1), ["XE 3", "E 44 c"])
+
+
+class MappedParsers_Test(unittest.TestCase):
+    """Parsing memory-mapped files should give the same as reading them line-by-line,
+    which happens for compressed files"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        use_temp_cache_dir(self, self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check_parser(self, filename, parser, event_nums):
+        with closing(map_input(filename)) as buf:
+            self.assertIsNotNone(buf)
+        gz_filename = compress_file(filename, "gzip")
+        self.assertIsNone(map_input(gz_filename))
+        for nums in [event_nums, None]:
+            events = list(parser(filename).iter_events(nums))
+            gz_events = list(parser(gz_filename).iter_events(nums))
+            self.assertEqual([(e.event_num, particle_summary(p)) for e, p in events],
+                             [(e.event_num, particle_summary(p)) for e, p in gz_events])
+        return events
+
+    def test_hepmc(self):
+        filename = os.path.join(self.tmp_dir, "multi.hepmc")
+        make_multi_event_hepmc(filename, [5, 6, 7, 8])
+        self.check_parser(filename, lambda f: HepMCParser(f, use_index=False), [8, 6])
+        _, particles = HepMCParser(filename, 7).parse()
+        self.assertEqual(particle_summary(particles),
+                         particle_summary(HepMCParser(filename, 5).parse()[1]))
+
+    def test_pythia8(self):
+        filename = os.path.join(self.tmp_dir, "multi.txt")
+        make_multi_event_pythia8(filename, 3)
+        events = self.check_parser(filename, Pythia8Parser, [2, 0])
+        self.assertEqual(len(events), 3)
+
+    def test_pythia8_block_starts(self):
+        """End strings must not be mistaken for the start of another block"""
+        filename = os.path.join(self.tmp_dir, "multi.txt")
+        make_multi_event_pythia8(filename, 2)
+        with closing(map_input(filename)) as buf:
+            names = [name for _, name in Pythia8Parser(filename).iter_block_starts(buf)]
+        self.assertEqual(names, ["Info", "HardEvent", "FullEvent"] * 2 + ["Stats"])
+
+    def test_lhe(self):
+        filename = os.path.join(self.tmp_dir, "multi.lhe")
+        make_multi_event_lhe(filename, 3)
+        self.check_parser(filename, lambda f: LHEParser(f, use_index=False), [3, 1])
+
+    def test_empty(self):
+        filename = os.path.join(self.tmp_dir, "empty.hepmc")
+        open(filename, "w").close()
+        self.assertIsNone(map_input(filename))
+        self.assertEqual(list(HepMCParser(filename, use_index=False).iter_events()), [])
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
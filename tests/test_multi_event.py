@@ -0,0 +1,90 @@
+"""Tests for plotting several events in one go, in one or several processes"""
+
+
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import logging
+import tempfile
+from pythiaplotter import PythiaPlotter
+from pythiaplotter.printers import printer_opts_checked
+from test_parsers import make_multi_event_pythia8, make_multi_event_lhe
+from test_event_index import use_temp_cache_dir
+
+
+class WarningRecorder(logging.Handler):
+    """Keep the messages of all warnings logged"""
+
+    def __init__(self):
+        super(WarningRecorder, self).__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@unittest.skipUnless("DOT" in printer_opts_checked, "Needs Graphviz for the DOT printer")
+class ParallelEvents_Test(unittest.TestCase):
+    """Plotting events using several processes should give the same as using one"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        use_temp_cache_dir(self, self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_graphviz_files(self, input_filename, input_format, events, jobs):
+        """Plot events, returning the contents of the Graphviz file for each"""
+        out_dir = os.path.join(self.tmp_dir, "jobs%d_events%s" % (jobs, events))
+        os.mkdir(out_dir)
+        PythiaPlotter.main([input_filename, "--inputFormat", input_format, "-p", "DOT",
+                            "-O", os.path.join(out_dir, "event.pdf"), "--events", events,
+                            "--jobs", str(jobs), "--noOutput", "--saveGraphviz", "--noCache"])
+        contents = {}
+        for filename in os.listdir(out_dir):
+            with open(os.path.join(out_dir, filename)) as f:
+                contents[filename] = f.read()
+        return contents
+
+    def check_parallel(self, input_filename, input_format, events, num_events):
+        serial = self.get_graphviz_files(input_filename, input_format, events, 1)
+        self.assertEqual(len(serial), num_events)
+        parallel = self.get_graphviz_files(input_filename, input_format, events, 2)
+        self.assertEqual(parallel, serial)
+
+    def test_pythia8(self):
+        """Parsed in the main process, plotted in the workers"""
+        filename = os.path.join(self.tmp_dir, "multi.txt")
+        make_multi_event_pythia8(filename, 3)
+        self.check_parallel(filename, "PYTHIA", "0-2", 3)
+
+    def test_lhe(self):
+        """Parsed & plotted in the workers, using the event index"""
+        filename = os.path.join(self.tmp_dir, "multi.lhe")
+        make_multi_event_lhe(filename, 1)
+        self.check_parallel(filename, "LHE", "1-2", 2)
+        # 0 is also the first event
+        self.check_parallel(filename, "LHE", "0-1", 2)
+
+    def test_missing_events(self):
+        """Must warn about the requested events that are not in the file"""
+        filename = os.path.join(self.tmp_dir, "multi.txt")
+        make_multi_event_pythia8(filename, 2)
+        recorder = WarningRecorder()
+        logger = logging.getLogger(PythiaPlotter.__name__)
+        logger.addHandler(recorder)
+        try:
+            for jobs in [1, 2]:
+                self.get_graphviz_files(filename, "PYTHIA", "0-3,7", jobs)
+        finally:
+            logger.removeHandler(recorder)
+        self.assertEqual(recorder.messages, ["Events 2-3,7 not found in %s" % filename] * 2)
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -99,6 +99,20 @@ class NodeGrapher_Test(unittest.TestCase):
         edges = [(1, 2), (1, 3), (2, 5), (3, 5)]
         self.check_graph_edges(edges, g)
 
+    def test_redundant_chain(self):
+        """A whole chain (1)->(2)->...->(n)->(n+1) of gluons collapses to (1)->(n+1),
+        whatever order the nodes are in."""
+        n = 500
+        particles = [NodeParticle(particle=Particle(barcode=i, pdgid=21),
+                                  parent_barcodes=[i - 1] if i > 1 else [])
+                     for i in range(n, 0, -1)]
+        particles.insert(0, NodeParticle(particle=Particle(barcode=n + 1, pdgid=1),
+                                         parent_barcodes=[n]))
+        g = ng.assign_particles_nodes(particles)
+        ng.remove_redundant_nodes(g)
+        self.check_graph_nodes([particles[0].particle, particles[-1].particle], g)
+        self.check_graph_edges([(1, n + 1)], g)
+
     def test_intial_final_state(self):
         """Test whether particles marked as initial/final state correctly
 
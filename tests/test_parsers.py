@@ -0,0 +1,229 @@
+"""Tests for parsing several events from input files"""
+
+
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+from argparse import ArgumentTypeError
+from pythiaplotter.parsers import parser_opts
+from pythiaplotter.utils import common
+from pythiaplotter.parsers.hepmc_parser import (HepMCParser, decode_columns, decode_block,
+                                                get_dangling_vertex_multiplier)
+from pythiaplotter.parsers.pythia8_parser import Pythia8Parser
+from pythiaplotter.parsers.lhe_parser import LHEParser
+from pythiaplotter.parsers.cmssw_particle_list_parser import CMSSWParticleListParser
+from pythiaplotter.cli import parse_event_range, parse_number_list, format_event_range
+from test_event_index import make_multi_event_hepmc, use_temp_cache_dir
+
+
+def make_multi_event_pythia8(filename, num_events):
+    """Write a Pythia8 log with several copies of the example event listings"""
+    with open("example/example_pythia8.txt") as f:
+        lines = f.readlines()
+    start = [i for i, l in enumerate(lines) if "PYTHIA Info Listing" in l][0]
+    end = [i for i, l in enumerate(lines) if "End PYTHIA Event Listing" in l][-1] + 1
+    with open(filename, "w") as f:
+        f.writelines(lines[:start])
+        for _ in range(num_events):
+            f.writelines(lines[start:end])
+        f.writelines(lines[end:])
+
+
+def make_multi_event_lhe(filename, num_events):
+    """Write a LHE file with several copies of the example events, plus a non-event block
+    whose tag starts with "event" to check it is not mistaken for one."""
+    with open("example/example_lhe.lhe") as f:
+        lines = f.readlines()
+    start = [i for i, l in enumerate(lines) if "<event>" in l][0]
+    end = [i for i, l in enumerate(lines) if "</event>" in l][-1] + 1
+    with open(filename, "w") as f:
+        f.writelines(lines[:start])
+        f.write("  <eventinfo>\n  </eventinfo>\n")
+        for _ in range(num_events):
+            f.writelines(lines[start:end])
+        f.writelines(lines[end:])
+
+
+def particle_summary(particles):
+    return [(p.barcode, p.particle.pdgid) for p in particles]
+
+
+class MultiEvent_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        use_temp_cache_dir(self, self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_hepmc_iter_events(self):
+        filename = os.path.join(self.tmp_dir, "multi.hepmc")
+        make_multi_event_hepmc(filename, [5, 6, 7, 8])
+        parser = HepMCParser(filename)
+        events = list(parser.iter_events())
+        self.assertEqual([e.event_num for e, _ in events], [5, 6, 7, 8])
+        events = list(parser.iter_events([8, 6, 100]))
+        self.assertEqual([e.event_num for e, _ in events], [6, 8])
+        _, single_particles = HepMCParser(filename, 6).parse()
+        self.assertEqual(particle_summary(events[0][1]), particle_summary(single_particles))
+
+    def test_pythia8_iter_events(self):
+        filename = os.path.join(self.tmp_dir, "multi.txt")
+        make_multi_event_pythia8(filename, 3)
+        events = list(Pythia8Parser(filename).iter_events())
+        self.assertEqual([e.event_num for e, _ in events], [0, 1, 2])
+        _, single_particles = Pythia8Parser("example/example_pythia8.txt", 0).parse()
+        for _, particles in events:
+            self.assertEqual(particle_summary(particles), particle_summary(single_particles))
+        events = list(Pythia8Parser(filename).iter_events([1, 5]))
+        self.assertEqual([e.event_num for e, _ in events], [1])
+
+    def test_lhe_iter_events(self):
+        parser = LHEParser("example/example_lhe.lhe")
+        events = list(parser.iter_events())
+        self.assertEqual([e.event_num for e, _ in events], [1, 2, 3])
+        for event_num in [1, 2, 3]:
+            _, single_particles = LHEParser("example/example_lhe.lhe", event_num).parse()
+            self.assertEqual(particle_summary(events[event_num - 1][1]),
+                             particle_summary(single_particles))
+        # 0 is also the first event, as for parse()
+        events = list(parser.iter_events([0, 1]))
+        self.assertEqual([e.event_num for e, _ in events], [0, 1])
+        self.assertEqual(particle_summary(events[0][1]), particle_summary(events[1][1]))
+        event, _ = LHEParser("example/example_lhe.lhe", 0).parse()
+        self.assertEqual(event.event_num, 0)
+
+    def test_lhe_index(self):
+        filename = os.path.join(self.tmp_dir, "multi.lhe")
+        make_multi_event_lhe(filename, 2)
+        parser = LHEParser(filename)
+        self.assertEqual(parser.index.keys(), [1, 2, 3, 4, 5, 6])
+        events = list(parser.iter_events([2, 6, 99]))
+        self.assertEqual([e.event_num for e, _ in events], [2, 6])
+        for event, particles in events:
+            indexed_event, indexed_particles = LHEParser(filename, event.event_num).parse()
+            self.assertEqual(indexed_event.event_num, event.event_num)
+            self.assertEqual(particle_summary(indexed_particles), particle_summary(particles))
+        with self.assertRaises(IndexError):
+            LHEParser(filename, 7).parse()
+        with self.assertRaises(IndexError):
+            LHEParser(filename, 7, use_index=False).parse()
+
+    def test_lhe_header_event(self):
+        """An <event> tag in the header must not count as an event, with or without an index"""
+        filename = os.path.join(self.tmp_dir, "header.lhe")
+        with open("example/example_lhe.lhe") as f:
+            contents = f.read()
+        with open(filename, "w") as f:
+            f.write(contents.replace("</header>", "<event>\nnot an event\n</event>\n</header>", 1))
+        parser = LHEParser(filename)
+        self.assertEqual(parser.index.keys(), [1, 2, 3])
+        events = list(parser.iter_events())
+        self.assertEqual([e.event_num for e, _ in events], [1, 2, 3])
+        for event_num in [1, 3]:
+            _, indexed_particles = LHEParser(filename, event_num).parse()
+            self.assertEqual(particle_summary(indexed_particles),
+                             particle_summary(events[event_num - 1][1]))
+
+    def test_cmssw_iter_events(self):
+        parser = CMSSWParticleListParser("example/example_cmssw.txt")
+        self.assertEqual(len(list(parser.iter_events())), 1)
+        self.assertEqual(len(list(parser.iter_events([1, 2]))), 0)
+
+
+class HepMCDecoder_Test(unittest.TestCase):
+
+    lines = ["V -1 0 0 0 0 0 0 1 0\n",
+             "P 1 2212 0 0 6.5e+06 6.5e+06 938.27 4 0 0 -1 0\n",
+             "P 2 21 3000 4000 0 5000 0 3 0 0 -2 2 1 101 2 102\n",
+             "V -2 0 0 0 0 0 0 1 0\n",
+             "P 3 11 1000 0 0 1000 0.511 1 0 0 0 0\n"]
+
+    def check_block(self):
+        edge_particles = decode_block(self.lines, energy_multiplier=1. / 1000)
+        self.assertEqual([(ep.barcode, ep.vtx_out_barcode, ep.vtx_in_barcode)
+                          for ep in edge_particles],
+                         [(1, 10001, 1), (2, 1, 2), (3, 2, 20003)])
+        self.assertEqual([(ep.particle.initial_state, ep.particle.final_state)
+                          for ep in edge_particles],
+                         [(True, False), (False, False), (False, True)])
+        p2 = edge_particles[1].particle
+        self.assertIs(p2.table, edge_particles[0].particle.table)
+        self.assertEqual((p2.pdgid, p2.status), (21, 3))
+        self.assertAlmostEqual(p2.energy, 5.)
+        self.assertAlmostEqual(p2.pt, 5.)
+        self.assertAlmostEqual(edge_particles[2].particle.mass, 0.000511)
+
+    def test_decode_block(self):
+        self.check_block()
+        self.assertEqual(decode_block([]), [])
+        self.assertEqual(list(decode_columns(self.lines)["vtx_out_barcode"]), [1, 1, 2])
+
+    def test_decode_block_no_numpy(self):
+        np = common.get_numpy()
+        common._numpy = None
+        try:
+            self.check_block()
+        finally:
+            common._numpy = np
+
+    def test_malformed(self):
+        with self.assertRaises(ValueError):
+            decode_columns(["V -1 0 0 0 0 0 0 1 0\n", "P 1 2212 0 0\n"])
+        with self.assertRaises(ValueError):
+            decode_columns(["P 1 2212 0 0 x 6.5e+06 938.27 4 0 0 -1 0\n"])
+
+    def test_dangling_vertex_multiplier(self):
+        """Barcodes made for dangling vertices must not clash in large events"""
+        self.assertEqual(get_dangling_vertex_multiplier(812), 10000)
+        self.assertEqual(get_dangling_vertex_multiplier(10000), 100000)
+        self.assertEqual(get_dangling_vertex_multiplier(123456), 1000000)
+
+
+class ParserOptions_Test(unittest.TestCase):
+
+    def test_parser_classes(self):
+        """Parser options import the same classes that the package exports"""
+        from pythiaplotter import parsers
+        for name in ["PYTHIA", "HEPMC", "LHE", "CMSSW"]:
+            popt = parser_opts[name]
+            self.assertIs(popt.parser, getattr(parsers, popt.parser_path.split(":")[1]))
+        for popt in parser_opts.values():
+            self.assertEqual(popt.parser.__name__, popt.parser_path.split(":")[1])
+
+
+class EventRange_Test(unittest.TestCase):
+
+    def test_range(self):
+        self.assertEqual(parse_event_range("1-3,7"), [1, 2, 3, 7])
+        self.assertEqual(parse_event_range("4"), [4])
+        self.assertEqual(parse_event_range("2-3,1-2"), [1, 2, 3])
+
+    def test_format_range(self):
+        self.assertEqual(format_event_range([7, 1, 2, 3]), "1-3,7")
+        self.assertEqual(format_event_range({4}), "4")
+        self.assertEqual(format_event_range([5, 3, 1, 2]), "1-3,5")
+        for event_nums in [[0, 2, 3, 4, 9, 10], [6]]:
+            self.assertEqual(parse_event_range(format_event_range(event_nums)), event_nums)
+
+    def test_bad_range(self):
+        for bad in ["a", "3-1", "1-", "-"]:
+            with self.assertRaises(ArgumentTypeError):
+                parse_event_range(bad)
+
+    def test_number_list(self):
+        self.assertEqual(parse_number_list("5,-5,10-12"), [-5, 5, 10, 11, 12])
+        self.assertEqual(parse_number_list("-2-1"), [-2, -1, 0, 1])
+        for bad in ["a", "3-1", "1-", "-", ""]:
+            with self.assertRaises(ArgumentTypeError):
+                parse_number_list(bad)
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
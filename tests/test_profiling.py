@@ -0,0 +1,104 @@
+"""Tests for profiling the stages of making a diagram"""
+
+
+from __future__ import absolute_import
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from pythiaplotter.utils.profiling import Profiler, profiler
+from pythiaplotter.parsers.pythia8_parser import Pythia8Parser
+from pythiaplotter.graphers import assign_particles_to_graph
+
+
+class Profiler_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = Profiler()
+        self.profiler.enabled = True
+
+    def test_disabled(self):
+        self.profiler.enabled = False
+        with self.profiler.stage("parse") as stage:
+            stage.counts["particles"] = 10
+        self.assertEqual(self.profiler.records, [])
+
+    def test_nested(self):
+        """Stages should be named by their path, and inherit the event number"""
+        with self.profiler.stage("plot", event_num=3):
+            with self.profiler.stage("graph") as stage:
+                stage.counts["nodes"] = 5
+            with self.profiler.stage("print", event_num=4):
+                pass
+        self.assertEqual([(r.stage, r.event_num, r.counts) for r in self.profiler.records],
+                         [("plot/graph", 3, {"nodes": 5}), ("plot/print", 4, {}),
+                          ("plot", 3, {})])
+        for record in self.profiler.records:
+            self.assertGreaterEqual(record.wall_time, 0)
+            self.assertGreaterEqual(record.cpu_time, 0)
+
+    def test_exception(self):
+        """Stages should still be recorded if they fail"""
+        with self.assertRaises(ValueError):
+            with self.profiler.stage("parse"):
+                raise ValueError
+        self.assertEqual([r.stage for r in self.profiler.records], ["parse"])
+
+    def test_summary(self):
+        for event_num in range(3):
+            with self.profiler.stage("parse", event_num):
+                pass
+        with self.profiler.stage("plot"):
+            pass
+        self.assertEqual([(total["stage"], total["calls"]) for total in self.profiler.summarise()],
+                         [("parse", 3), ("plot", 1)])
+        records = self.profiler.pop_records()
+        self.assertEqual(len(records), 4)
+        self.assertEqual(self.profiler.summarise(), [])
+
+    def test_json(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with self.profiler.stage("parse", 0) as stage:
+                stage.counts["particles"] = 2
+            filename = os.path.join(tmp_dir, "profile.json")
+            self.profiler.write_json(filename, info={"input": "event.txt"})
+            with open(filename) as f:
+                contents = json.load(f)
+        finally:
+            shutil.rmtree(tmp_dir)
+        self.assertEqual(contents["info"]["input"], "event.txt")
+        self.assertEqual(contents["summary"][0]["calls"], 1)
+        stage = contents["stages"][0]
+        self.assertEqual((stage["stage"], stage["event"], stage["counts"]),
+                         ("parse", 0, {"particles": 2}))
+        self.assertEqual(sorted(stage.keys()),
+                         ["children_cpu_time", "children_peak_rss", "counts", "cpu_time",
+                          "event", "peak_rss", "stage", "wall_time"])
+
+
+class GraphStages_Test(unittest.TestCase):
+
+    def setUp(self):
+        profiler.enabled = True
+        profiler.pop_records()
+
+    def tearDown(self):
+        profiler.enabled = False
+        profiler.pop_records()
+
+    def test_graph_stages(self):
+        _, particles = Pythia8Parser("example/example_pythia8.txt", 0).parse()
+        graph = assign_particles_to_graph(particles, "NODE", desired_repr="EDGE")
+        self.assertEqual([r.stage for r in profiler.records], ["graph", "convert", "redundants"])
+        self.assertEqual(profiler.records[0].counts["nodes"], len(particles))
+        self.assertEqual(profiler.records[-1].counts,
+                         {"nodes": graph.number_of_nodes(), "edges": graph.number_of_edges()})
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,9 @@
 from __future__ import absolute_import, division, print_function
 import unittest
 import math
-from pythiaplotter.parsers.event_classes import convert_px_py_pz
+from pythiaplotter.utils import common
+from pythiaplotter.parsers.event_classes import (convert_px_py_pz, convert_px_py_pz_batch,
+                                                 Particle, ParticleTable)
 
 
 class Converter_Test(unittest.TestCase):
@@ -52,6 +54,48 @@ class Converter_Test(unittest.TestCase):
         self.assertEqual(eta, 0)
 
 
+class BatchConverter_Test(unittest.TestCase):
+
+    momenta = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1),
+               (1, 1, 0), (3.5, -2.25, 17.), (-0.1, 0.3, -250.), (0, 0, 0)]
+
+    def check_batch(self):
+        px, py, pz = zip(*self.momenta)
+        batch = convert_px_py_pz_batch(px, py, pz)
+        for i, mom in enumerate(self.momenta):
+            for val, batch_val in zip(convert_px_py_pz(*mom), batch):
+                self.assertAlmostEqual(val, batch_val[i])
+
+    def test_batch(self):
+        self.check_batch()
+
+    def test_batch_no_numpy(self):
+        np = common.get_numpy()
+        common._numpy = None
+        try:
+            self.check_batch()
+        finally:
+            common._numpy = np
+
+    def test_batch_empty(self):
+        self.assertEqual([len(x) for x in convert_px_py_pz_batch([], [], [])], [0, 0, 0])
+
+    def test_table(self):
+        """pt, eta, phi are filled in for the whole table only when needed"""
+        table = ParticleTable()
+        particles = [Particle(barcode=i, px=px, py=py, pz=pz, table=table)
+                     for i, (px, py, pz) in enumerate(self.momenta)]
+        fixed = Particle(barcode=99, pt=7., eta=1., table=table)
+        self.assertEqual(list(table.pt), [0.] * len(self.momenta) + [7.])
+        self.assertEqual(particles[4].eta, float('inf'))
+        for p, mom in zip(particles, self.momenta):
+            self.assertAlmostEqual(table.pt[p._row], convert_px_py_pz(*mom)[0])
+        self.assertEqual((fixed.pt, fixed.eta), (7., 1.))
+        # Rows added afterwards still work
+        late = Particle(barcode=100, px=0, py=-2, pz=0, table=table)
+        self.assertAlmostEqual(late.phi, -math.pi/2)
+
+
 def main():
     unittest.main()
 
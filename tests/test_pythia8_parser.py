@@ -0,0 +1,130 @@
+"""Tests for parsing Pythia8 screen output, both memory-mapped and line-by-line"""
+
+
+from __future__ import absolute_import
+import unittest
+import os
+import shutil
+import tempfile
+from pythiaplotter.parsers.pythia8_parser import Pythia8Parser, parse_event_block
+from test_compression import compress_file
+
+
+with open("example/example_pythia8.txt") as f:
+    EXAMPLE_LINES = f.readlines()
+
+
+def get_block(start_str, end_str):
+    """Get the lines of the first block in the example file, including its start & end lines"""
+    start = [i for i, l in enumerate(EXAMPLE_LINES) if start_str in l][0]
+    end = [i for i, l in enumerate(EXAMPLE_LINES[start:]) if end_str in l][0] + start
+    return EXAMPLE_LINES[start:end + 1]
+
+
+HEADER = EXAMPLE_LINES[:[i for i, l in enumerate(EXAMPLE_LINES) if "Info Listing" in l][0]]
+INFO = get_block(Pythia8Parser.info_start, Pythia8Parser.info_end)
+HARD_EVENT = get_block(Pythia8Parser.hard_evt_start, Pythia8Parser.hard_evt_end)
+FULL_EVENT = get_block(Pythia8Parser.full_evt_start, Pythia8Parser.full_evt_end)
+STATS = get_block(Pythia8Parser.stats_start, Pythia8Parser.stats_end)
+
+
+def parse_like_old_parser():
+    """Parse the event in the example file as the original whole-file parser did:
+    take the stripped, non-empty lines between the start of the complete event listing
+    and the next end line."""
+    lines = [l.strip() for l in EXAMPLE_LINES]
+    lines = [l for l in lines if l]
+    start = [i for i, l in enumerate(lines) if Pythia8Parser.full_evt_start in l][0]
+    end = [i for i, l in enumerate(lines) if Pythia8Parser.full_evt_end in l and i > start][0]
+    return parse_event_block(lines[start + 1:end])
+
+
+def particle_data(node_particles):
+    return [(np.barcode, np.parent_barcodes, np.particle.pdgid, np.particle.status,
+             np.particle.px, np.particle.py, np.particle.pz, np.particle.energy,
+             np.particle.mass) for np in node_particles]
+
+
+class Pythia8Parser_Test(unittest.TestCase):
+    """Files are parsed both memory-mapped, and line-by-line by compressing them"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.expected = particle_data(parse_like_old_parser())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_file(self, *blocks):
+        """Write a file from blocks of lines, returning the plain & compressed filenames"""
+        filename = os.path.join(self.tmp_dir, "pythia8.txt")
+        with open(filename, "w") as f:
+            f.writelines(HEADER)
+            for block in blocks:
+                f.writelines(block)
+                f.write("\n")
+        return [filename, compress_file(filename, "gzip")]
+
+    def check_events(self, filenames, event_nums, expected_event_nums):
+        """Check the events parsed from each file are those expected, all with the same
+        particles as the example event"""
+        for filename in filenames:
+            events = list(Pythia8Parser(filename).iter_events(event_nums))
+            self.assertEqual([event.event_num for event, _ in events], expected_event_nums)
+            for event, node_particles in events:
+                self.assertEqual(event.source, filename)
+                self.assertEqual(particle_data(node_particles), self.expected)
+
+    def test_example(self):
+        """Must give the same as the original parser"""
+        event, node_particles = Pythia8Parser("example/example_pythia8.txt").parse()
+        self.assertEqual(event.event_num, 0)
+        self.assertEqual(particle_data(node_particles), self.expected)
+
+    def test_multi_event(self):
+        filenames = self.write_file(*([INFO, HARD_EVENT, FULL_EVENT] * 3 + [STATS]))
+        self.check_events(filenames, None, [0, 1, 2])
+        self.check_events(filenames, [2, 0], [0, 2])
+        for filename in filenames:
+            event, node_particles = Pythia8Parser(filename, 1).parse()
+            self.assertEqual(event.event_num, 1)
+            self.assertEqual(particle_data(node_particles), self.expected)
+
+    def test_info_between_events(self):
+        """Info blocks can come anywhere, and must not end up in the event"""
+        filenames = self.write_file(HARD_EVENT, FULL_EVENT, INFO, FULL_EVENT, INFO,
+                                    HARD_EVENT, INFO, FULL_EVENT, STATS)
+        self.check_events(filenames, None, [0, 1, 2])
+        for filename in filenames:
+            events = [event for event, _ in Pythia8Parser(filename).iter_events()]
+            # Events sharing an Info block must not share an Event object
+            self.assertEqual(len(set(id(event) for event in events)), 3)
+
+    def test_truncated_block(self):
+        """A block without an end is skipped, but still counts as an event"""
+        truncated = FULL_EVENT[:len(FULL_EVENT) // 2]
+        truncated_info = INFO[:len(INFO) // 2]
+        filenames = self.write_file(INFO, HARD_EVENT, truncated, truncated_info,
+                                    HARD_EVENT, FULL_EVENT, INFO, truncated)
+        self.check_events(filenames, None, [1])
+        self.check_events(filenames, [0, 1, 2], [1])
+        for filename in filenames:
+            with self.assertRaises(IndexError):
+                Pythia8Parser(filename, 0).parse()
+            with self.assertRaises(IndexError):
+                Pythia8Parser(filename, 2).parse()
+
+    def test_event_past_end(self):
+        filenames = self.write_file(INFO, HARD_EVENT, FULL_EVENT, STATS)
+        self.check_events(filenames, [0, 3], [0])
+        for filename in filenames:
+            with self.assertRaises(IndexError):
+                Pythia8Parser(filename, 1).parse()
+            self.assertEqual(list(Pythia8Parser(filename).iter_events([5])), [])
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
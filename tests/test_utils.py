@@ -7,7 +7,11 @@ import sys
 import os
 import os.path
 import shutil
+import pythiaplotter.utils.common
 from pythiaplotter.utils.common import *
+from pythiaplotter.utils import pdgid_converter
+from pythiaplotter.utils.cache import DiskCache, make_key
+import tempfile
 
 
 class Common_Test(unittest.TestCase):
@@ -41,6 +45,11 @@ class Common_Test(unittest.TestCase):
         os.rmdir(createDir)
         self.assertFalse(check_dir_exists(createDir))
 
+    def test_load_object(self):
+        self.assertIs(load_object("os.path:join"), os.path.join)
+        with self.assertRaises(AttributeError):
+            load_object("os.path:madeupFunction")
+
     def test_map_columns_to_dict(self):
         line = "123:police:999:Higgs"
         fields = ["id", "name", "phone"]
@@ -57,6 +66,10 @@ class RequisiteChecker_Test(unittest.TestCase):
     def test_fake_program(self):
         self.assertFalse(check_program_exists("fakeprog"))
 
+    def test_program_cached(self):
+        check_program_exists("fakeprog")
+        self.assertIn("fakeprog", pythiaplotter.utils.common._programs_found)
+
     def test_real_module(self):
         self.assertTrue(check_module_exists("argparse"))
 
@@ -64,6 +77,81 @@ class RequisiteChecker_Test(unittest.TestCase):
         self.assertFalse(check_module_exists("aaaaaaa"))
 
 
+class PDGIDConverter_Test(unittest.TestCase):
+    """Test fns in pdgid_converter.py"""
+
+    def test_table_up_to_date(self):
+        """Precompiled table must match the source files, otherwise run `make pdgid-table`"""
+        self.assertEqual(pdgid_converter.read_pdgid_table(check_sources=True),
+                         pdgid_converter.load_pdgid_dict())
+
+    def test_names(self):
+        self.assertEqual(pdgid_converter.pdgid_to_string(11), "e-")
+        self.assertEqual(pdgid_converter.pdgid_to_string("-11"), "e+")
+        self.assertEqual(pdgid_converter.pdgid_to_tex(-11), "e^+")
+        self.assertEqual(pdgid_converter.pdgid_to_tex(88), "junction")
+
+    def test_bad_pdgid(self):
+        with self.assertRaises(KeyError):
+            pdgid_converter.check_pdgid(123456789)
+
+    def test_name_dict_alias(self):
+        name_dict = pdgid_converter.PDGID_NAME_DICT
+        self.assertEqual(name_dict[11], pdgid_converter.get_pdgid_dict()[11])
+        self.assertEqual(len(name_dict), len(pdgid_converter.get_pdgid_dict()))
+        name_dict[999999] = dict(tex="I^0", raw="I0")
+        try:
+            self.assertEqual(pdgid_converter.pdgid_to_string(999999), "I0")
+        finally:
+            del name_dict[999999]
+        self.assertNotIn(999999, pdgid_converter.get_pdgid_dict())
+
+
+class DiskCache_Test(unittest.TestCase):
+    """Test fns in cache.py"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = DiskCache("test", directory=self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_keys(self):
+        self.assertEqual(make_key("a", "b"), make_key("a", "b"))
+        self.assertNotEqual(make_key("ab", "c"), make_key("a", "bc"))
+
+    def test_get_set(self):
+        key = make_key("test")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, {"a": [1, 2.5]})
+        self.assertEqual(self.cache.get(key), {"a": [1, 2.5]})
+        self.assertEqual(DiskCache("test", directory=self.tmp_dir).get(key), {"a": [1, 2.5]})
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(key))
+
+    def test_corrupt_entry(self):
+        key = make_key("test")
+        self.cache.set(key, [1])
+        with open(os.path.join(self.cache.directory, key + ".json"), "w") as f:
+            f.write("[1, ")
+        self.assertIsNone(self.cache.get(key))
+
+    def test_evict(self):
+        """Least recently used entries are removed first"""
+        self.cache.max_size = 25
+        keys = [make_key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.set(key, "1234567890")  # 12 bytes as JSON
+            # Make sure each entry has a distinct access time
+            os.utime(os.path.join(self.cache.directory, key + ".json"), (i, i))
+            if i == 1:
+                self.cache.get(keys[0])
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+
 def main():
     unittest.main()
 
@@ -0,0 +1,86 @@
+"""Tests for collapsing large graphs into clusters for the web printer"""
+
+
+from __future__ import absolute_import
+import unittest
+import networkx as nx
+from pythiaplotter.parsers.event_classes import Particle
+from pythiaplotter.printers.web_clustering import (find_clusters, get_hadronisation_clusters,
+                                                   get_chain_clusters, get_depth_clusters,
+                                                   merge_clusters, count_elements)
+from pythiaplotter.printers.web_printer import create_vis_data
+
+
+def make_node_graph(pdgids, edges):
+    """Make a NODE representation graph, with barcode: pdgid for each particle"""
+    graph = nx.MultiDiGraph()
+    for barcode, pdgid in pdgids.items():
+        graph.add_node(barcode, particle=Particle(barcode=barcode, pdgid=pdgid),
+                       pos=(barcode, barcode))
+    graph.add_edges_from(edges)
+    return graph
+
+
+class Clustering_Test(unittest.TestCase):
+
+    def setUp(self):
+        # 1 -> 2 -> 3 -> 4 -> 5 (same quark) -> string 6 -> hadrons 7, 8, 9 -> 10
+        self.graph = make_node_graph({1: 2212, 2: 1, 3: 1, 4: 1, 5: 1, 6: 92,
+                                      7: 211, 8: 211, 9: 111, 10: 22},
+                                     [(1, 2), (2, 3), (3, 4), (4, 5), (5, 6),
+                                      (6, 7), (6, 8), (6, 9), (9, 10)])
+
+    def test_under_budget(self):
+        self.assertEqual(find_clusters(self.graph, 100), [])
+
+    def test_hadronisation(self):
+        self.assertEqual(get_hadronisation_clusters(self.graph), [{7, 8, 9, 10}])
+
+    def test_hadronisation_edges(self):
+        """String as an edge in EDGE representation"""
+        graph = nx.MultiDiGraph()
+        graph.add_edge(0, 1, particle=Particle(barcode=1, pdgid=92))
+        graph.add_edge(1, 2, particle=Particle(barcode=2, pdgid=211))
+        graph.add_edge(1, 3, particle=Particle(barcode=3, pdgid=211))
+        self.assertEqual(get_hadronisation_clusters(graph), [{2, 3}])
+
+    def test_chains(self):
+        self.assertEqual(get_chain_clusters(self.graph, 3), [])
+        self.assertEqual(get_chain_clusters(self.graph, 2), [{3, 4}])
+
+    def test_budget(self):
+        """Clusters should be used in order until the graph fits"""
+        self.assertEqual(count_elements(self.graph, []), 19)
+        self.assertEqual(find_clusters(self.graph, 15), [{7, 8, 9, 10}])
+        self.assertEqual(count_elements(self.graph, [{7, 8, 9, 10}]), 13)
+        self.assertEqual(find_clusters(self.graph, 13, min_chain_length=2),
+                         [{7, 8, 9, 10}, {3, 4}])
+
+    def test_depth(self):
+        """Must fit any budget by collapsing deep enough, keeping existing clusters"""
+        for max_elements in range(1, 20):
+            clusters = get_depth_clusters(self.graph, [{7, 8, 9, 10}], max_elements)
+            self.assertTrue(any({7, 8, 9, 10} <= members for members in clusters))
+            if max_elements >= 3:  # node 1 + a cluster + edge
+                self.assertLessEqual(count_elements(self.graph, clusters), max_elements)
+        self.assertEqual(get_depth_clusters(self.graph, [], 3), [set(range(2, 11))])
+
+    def test_merge(self):
+        self.assertEqual(sorted(merge_clusters([{1, 2}, {3}, {4, 5}, {2, 4}]), key=min),
+                         [{1, 2, 4, 5}, {3}])
+
+    def test_vis_data(self):
+        vis_data = create_vis_data(self.graph, [{7, 8, 9, 10}])
+        self.assertEqual(vis_data["nodes"]["columns"]["id"], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(vis_data["clusterNodes"]["columns"]["id"], [7, 8, 9, 10])
+        self.assertEqual(vis_data["clusters"]["columns"]["particles"], [4])
+        self.assertEqual(vis_data["clusters"]["columns"]["x"], [8.5])
+        self.assertEqual(len(vis_data["edges"]["columns"]["from"]), 5)
+        self.assertEqual(len(vis_data["clusterEdges"]["columns"]["from"]), 4)
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Tests for the interactive web page printer"""
+
+
+from __future__ import absolute_import
+import unittest
+import shutil
+import tempfile
+from argparse import Namespace
+import networkx as nx
+from pythiaplotter.utils.cache import DiskCache, make_key
+from pythiaplotter.parsers.event_classes import Particle
+from pythiaplotter.printers.web_printer import (VisPrinter, get_node_positions, create_vis_data,
+                                                encode_vis_data, decode_vis_data)
+
+
+class Layout_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.printer = VisPrinter(self.make_opts())
+        self.printer.layout_cache = DiskCache("layouts", directory=self.tmp_dir)
+
+    @staticmethod
+    def make_opts(no_cache=False):
+        return Namespace(output="test.html", layout="madeupRenderer", GRAPH_OPTS={},
+                         webDataFile=False, webMaxElements=0, noCache=no_cache)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_node_positions(self):
+        raw_json = '{"objects": [{"name": "1", "pos": "10.5,20"}, {"name": "sub", "nodes": [1]},' \
+                   '{"name": "2", "pos": "0,1"}]}'
+        self.assertEqual(get_node_positions(raw_json), [[1, 10.5, 20.], [2, 0., 1.]])
+
+    def test_cached_layout(self):
+        """Must not need the renderer if the same graph has been laid out before"""
+        gv_str = "digraph g{1 -> 2;}"
+        with self.assertRaises(OSError):
+            self.printer.get_layout(gv_str)
+        positions = [[1, 0., 10.], [2, 0., 0.]]
+        self.printer.layout_cache.set(make_key("madeupRenderer", gv_str), positions)
+        self.assertEqual(self.printer.get_layout(gv_str), positions)
+
+    def test_no_cache(self):
+        """With --noCache, the renderer must always be run"""
+        printer = VisPrinter(self.make_opts(no_cache=True))
+        self.assertIsNone(printer.layout_cache)
+        with self.assertRaises(OSError):
+            printer.get_layout("digraph g{1 -> 2;}")
+
+
+def unpack_columns(table, strings):
+    """Python version of the webpage's unpackColumns()"""
+    rows = [{} for _ in range(table["length"])]
+    for field, column in table["columns"].items():
+        for row, value in zip(rows, column):
+            if value is not None:
+                row[field] = strings[value] if field in table["stringFields"] else value
+    return rows
+
+
+class VisData_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nx.MultiDiGraph()
+        self.p1 = Particle(barcode=1, pdgid=11, px=1234.5, pz=10., energy=20.)
+        self.p1.initial_state = True
+        self.p2 = Particle(barcode=2, pdgid=11, pt=1., eta=float("inf"))
+        self.graph.add_node(1, particle=self.p1, pos=(0., 1.))
+        self.graph.add_node(2, particle=self.p2, pos=(2., 3.))
+        self.graph.add_node(3, pos=(4., 5.))
+        self.graph.add_edge(1, 2)
+        self.graph.add_edge(2, 3)
+
+    def test_columns(self):
+        vis_data = create_vis_data(self.graph)
+        self.assertEqual(vis_data["nodes"]["length"], 3)
+        self.assertEqual(vis_data["strings"].count("e-"), 1)
+        nodes = {n["id"]: n for n in unpack_columns(vis_data["nodes"], vis_data["strings"])}
+        self.assertEqual(nodes[1]["name"], "e-")
+        self.assertEqual(nodes[1]["group"], "initial")
+        self.assertEqual(nodes[2]["group"], "default")
+        self.assertEqual(nodes[1]["px"], 1230.)
+        self.assertEqual(nodes[2]["eta"], "inf")
+        self.assertEqual(nodes[3], {"id": 3, "x": 4., "y": 5.})
+        edges = unpack_columns(vis_data["edges"], vis_data["strings"])
+        self.assertEqual(sorted((e["from"], e["to"]) for e in edges), [(1, 2), (2, 3)])
+        # the particles themselves must be left alone
+        self.assertEqual(self.p1.px, 1234.5)
+
+    def test_encoding(self):
+        vis_data = create_vis_data(self.graph)
+        encoded = encode_vis_data(vis_data)
+        self.assertEqual(encoded, encode_vis_data(vis_data))
+        self.assertEqual(decode_vis_data(encoded), vis_data)
+
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()